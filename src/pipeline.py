@@ -28,7 +28,17 @@
 # @see https://github.com/FilipeChagasDev/image-processing-pipeline
 
 from enum import Enum
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+import multiprocessing as mp
+import threading
+import queue
+import asyncio
+import os
+import hashlib
 import numpy as np
+import cv2 as cv
 
 '''
 @brief Image data format of a bus
@@ -50,7 +60,187 @@ bus_compatibility = {
     BusFormat.Universal: [BusFormat.Universal, BusFormat.Channel, BusFormat.Triple, BusFormat.BGR, BusFormat.RGB, BusFormat.HSV]
 }
 
-def fit_tuple(input_tuple: tuple, default_value, out_len: int) -> tuple:
+#data types that a bus can hold (uint8 is the default)
+bus_dtypes = (np.dtype(np.uint8), np.dtype(np.uint16), np.dtype(np.float16), np.dtype(np.float32))
+
+'''
+@brief Memory layout of multichannel image data. The data is always seen as a (height x width x channels) array,
+the layout only changes how the values are stored.
+'''
+class BusLayout(Enum):
+    Interleaved = 1 # [C0, C1, C2] for each pixel (C-contiguous height x width x channels array)
+    Planar = 2 # each channel is a contiguous plane (channels x height x width memory), so its slices are contiguous too
+
+#bytes of float32 data processed at once by fused chains (see Pipeline.compile_chain), small enough for the cache
+fusion_strip_bytes = 512 * 1024
+
+#data types that cv.split and cv.merge take
+cv_dtypes = (np.dtype(np.uint8), np.dtype(np.uint16), np.dtype(np.float32))
+
+'''
+@brief Get the array that owns the memory of data (data itself if it is not a view).
+'''
+def base_array(data):
+    while isinstance(data.base, np.ndarray):
+        data = data.base
+    return data
+
+'''
+@brief Feed a value to a hash with all of its data. Arrays are hashed by shape, data type and bytes
+(their repr is truncated), lists, tuples and dictionaries item by item, other values by their repr.
+@param digest hashlib object
+@param value Value to hash
+'''
+def hash_value(digest, value):
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        digest.update(repr(('ndarray', value.shape, value.dtype.str)).encode())
+        digest.update(np.ascontiguousarray(value).data)
+    elif isinstance(value, np.ndarray):
+        digest.update(repr(('ndarray', value.shape)).encode())
+        hash_value(digest, value.ravel().tolist())
+    elif isinstance(value, dict):
+        digest.update(repr(('dict', len(value))).encode())
+        for key in value:
+            hash_value(digest, key)
+            hash_value(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(repr((type(value).__name__, len(value))).encode())
+        for item in value:
+            hash_value(digest, item)
+    else:
+        digest.update(repr(value).encode())
+
+'''
+@brief Hash the arguments of a pipe (see hash_value).
+@param arguments Dictionary of arguments
+@return Digest of the arguments.
+'''
+def hash_arguments(arguments: dict) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    hash_value(digest, arguments)
+    return digest.digest()
+
+'''
+@brief Get the memory layout of an array (channels last).
+@return BusLayout, or None if the array is not contiguous in either layout.
+'''
+def get_layout(data):
+    if data.flags.c_contiguous:
+        return BusLayout.Interleaved
+    if data.ndim >= 3 and np.moveaxis(data, -1, 0).flags.c_contiguous:
+        return BusLayout.Planar
+    return None
+
+'''
+@brief Check if the strides of an array are those of a C-contiguous array. NumPy calls arrays with dimensions of
+size 1 contiguous whatever their strides are (e.g. a planar 1 x 1 image), but OpenCV can not write to them in place.
+'''
+def packed(data) -> bool:
+    expected = data.itemsize
+    for size, stride in zip(data.shape[::-1], data.strides[::-1]):
+        if stride != expected:
+            return False
+        expected *= size
+    return True
+
+'''
+@brief Check if an array meets a layout requirement (see Pipe.input_layout).
+@param data Array (channels last)
+@param layout BusLayout required for multichannel data, or None
+@param contiguous True if the data must be contiguous (in any layout)
+@param alignment Required alignment of the first value, in bytes (0 for none)
+@param batched (optional) True if data has a leading batch dimension.
+'''
+def fits_layout(data, layout: BusLayout, contiguous: bool, alignment: int, batched: bool = False) -> bool:
+    current = get_layout(data)
+    if layout != None and data.ndim - (1 if batched else 0) == 3 and current != layout:
+        return False
+    if contiguous and current == None:
+        return False
+    return alignment <= 1 or data.ctypes.data % alignment == 0
+
+'''
+@brief Get an array with undefined content, in the given memory layout.
+@param shape Shape of the array (channels last)
+@param dtype Data type of the array
+@param layout (optional) BusLayout of the array
+@param pool (optional) BufferPool for the memory of the array. The caller gives it back with pool.release(base_array(data)).
+@param alignment (optional) Alignment of the first value, in bytes. Aligned arrays do not come from the pool.
+'''
+def empty_array(shape: tuple, dtype, layout: BusLayout = BusLayout.Interleaved, pool = None, alignment: int = 0):
+    shape = tuple(shape)
+    if layout == BusLayout.Planar:
+        shape = shape[-1:] + shape[:-1]
+
+    if alignment > 1:
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        raw = np.empty(nbytes + alignment, np.uint8)
+        offset = -raw.ctypes.data % alignment
+        data = raw[offset:offset + nbytes].view(dtype).reshape(shape)
+    else:
+        data = pool.acquire(shape, dtype) if pool != None else np.empty(shape, dtype)
+    return np.moveaxis(data, 0, -1) if layout == BusLayout.Planar else data
+
+'''
+@brief Copy an array into a new array with the given memory layout (with cv.split or cv.merge when possible).
+@param data Array (channels last)
+@param layout BusLayout of the new array
+@param dtype (optional) Data type of the new array. Default: data type of data.
+@param alignment (optional) Alignment of the new array, in bytes.
+@return New array with the same values.
+'''
+def convert_layout(data, layout: BusLayout, dtype = None, alignment: int = 0):
+    out = empty_array(data.shape, dtype if dtype != None else data.dtype, layout, None, alignment)
+    if data.ndim == 3 and data.shape[-1] <= 4 and data.dtype == out.dtype and data.dtype in cv_dtypes:
+        if layout == BusLayout.Planar and data.flags.c_contiguous:
+            cv.split(data, list(np.moveaxis(out, -1, 0)))
+            return out
+        if layout == BusLayout.Interleaved and get_layout(data) == BusLayout.Planar:
+            cv.merge(list(np.moveaxis(data, -1, 0)), dst=out)
+            return out
+
+    np.copyto(out, data, casting='unsafe')
+    return out
+
+'''
+@brief Get a (pixels x 1) view of the memory of a contiguous array, in the order of its layout.
+'''
+def flat_view(data):
+    layout = get_layout(data)
+    if layout == BusLayout.Planar:
+        return np.moveaxis(data, -1, 0).reshape(-1, 1)
+    return data.reshape(-1, 1) if layout == BusLayout.Interleaved else None
+
+'''
+@brief Apply a 256-entry lookup table to uint8 data, with cv.LUT when possible (NumPy indexing otherwise).
+Without out, the result has the memory layout of data.
+@param lut Lookup table
+@param data uint8 array
+@param out (optional) Array for the result
+'''
+def apply_lut(lut, data, out = None):
+    layout = get_layout(data)
+    if data.size > 0 and layout != None and lut.dtype != np.float16 and (out is None or get_layout(out) == layout):
+        if out is None:
+            out = np.empty_like(data, lut.dtype) #same strides as data
+        cv.LUT(flat_view(data), lut, dst=flat_view(out))
+        return out
+
+    if out is None:
+        return lut[data]
+    out[...] = lut[data]
+    return out
+
+'''
+@brief Fit a tuple (e.g. an array shape) to a given length, cutting it or completing it with a default value.
+@param input_tuple Input tuple
+@param default_value Value for the missing entries
+@param out_len Length of the output tuple
+@param skip (optional) Number of leading entries to drop before fitting (1 for the batch dimension of batched shapes)
+'''
+def fit_tuple(input_tuple: tuple, default_value, out_len: int, skip: int = 0) -> tuple:
+    input_tuple = tuple(input_tuple)[skip:]
     in_len = len(input_tuple)
 
     out = [default_value] * out_len
@@ -64,6 +254,25 @@ def fit_tuple(input_tuple: tuple, default_value, out_len: int) -> tuple:
             
     return tuple(out)
 
+'''
+@brief Open a raw image file as a memory-mapped array. Pixels are read from the disk only when they are used.
+@param filename Path of the file
+@param shape Shape of the image: (height, width) or (height, width, channels)
+@param dtype (optional) Data type of the pixels
+@param planar (optional) If True, the channels are stored one after the other in the file (channels x height x width).
+The returned array is still a height x width x channels view of the file.
+@param mode (optional) np.memmap mode: 'r' (read only), 'r+' (read and write), 'w+' (create or overwrite) or 'c' (copy on write)
+@param offset (optional) Position of the first pixel in the file, in bytes.
+@return np.memmap array backed by the file.
+'''
+def open_raw_image(filename, shape: tuple, dtype = np.uint8, planar: bool = False, mode: str = 'r', offset: int = 0):
+    shape = tuple(shape)
+    if planar and len(shape) == 3:
+        data = np.memmap(filename, dtype, mode, offset, (shape[2], shape[0], shape[1]))
+        return np.moveaxis(data, 0, -1)
+
+    return np.memmap(filename, dtype, mode, offset, shape)
+
 '''
 @brief Bus perform the connection between the pipes of the pipeline
 '''
@@ -71,12 +280,25 @@ class Bus(object):
     '''
     @param name Unique name across the pipeline for the bus.
     @param format BusFormat of the bus.
+    @param dtype (optional) Data type of the bus (one of bus_dtypes). Intermediate buses can use float32 to avoid quantization between arithmetic pipes.
     '''
-    def __init__(self, name: str, format: BusFormat):
+    def __init__(self, name: str, format: BusFormat, dtype = np.uint8):
         self.name = name
         self.format = format
+        self.dtype = np.dtype(dtype)
         self.data = None
         self.empty = True
+        self.buffer = None #pooled array behind data
+        self.pool = None #BufferPool that owns buffer
+        self.batched = False #True if data has a leading batch dimension (N x H x W x C)
+        self.file = None #format: (filename, planar) for buses stored in a raw file (see Pipeline.set_bus_file)
+        self.mapped = None #np.memmap array of the file, while the bus holds data
+        self.layout = None #BusLayout of the multichannel data of the bus, or None to keep the layout of the written data
+        self.requirement = None #format: (layout, contiguous, alignment) negotiated from the pipes that read the bus
+        self.layout_stats = LayoutStats() #conversions of the written data
+
+        if self.dtype not in bus_dtypes:
+            self.raise_fault('Unsupported data type ' + str(self.dtype))
 
     '''
     @brief Reset attributes to a new feed-foward process. 
@@ -84,17 +306,115 @@ class Bus(object):
     def reset(self):
         self.data = None
         self.empty = True
+        self.batched = False
+        self.mapped = None
+
+        if self.pool != None:
+            self.pool.release(self.buffer)
+            self.buffer = None
+            self.pool = None
+
+    '''
+    @brief Drop the image data after its last reader (see Pipeline.set_early_release).
+    The bus stays written until the next reset, so it still can not receive another input.
+    '''
+    def release(self):
+        self.data = None
+
+        if self.pool != None:
+            self.pool.release(self.buffer)
+            self.buffer = None
+            self.pool = None
 
     '''
     @brief Put an image data into the bus
+
+    Data that already has the bus dtype (and layout, if the bus has one) is not copied: the bus keeps a read-only
+    view of it, so the caller must not change the array while it is in the bus. Other data is converted.
+    @param data Image data
+    @param pool (optional) BufferPool that may own data. If so, the bus holds a reference to the pool array until it is reset.
+    @param batched (optional) True if data is a batch of images, with the batch dimension first.
     '''
-    def set_data(self, data):
+    def set_data(self, data, pool = None, batched: bool = False):
         if self.empty == True:
-            self.data = np.array(data, np.uint8)
+            data = np.asarray(data)
+            if self.file != None:
+                if self.mapped is None or base_array(data) is not base_array(self.mapped):
+                    self.map_file(data.shape)[...] = data
+                self.mapped.flush()
+                data = np.asarray(self.mapped)
+            else:
+                data = self.fit_layout(data, batched)
+
+            if data.dtype == self.dtype:
+                if pool != None and pool.retain(base_array(data)):
+                    self.buffer = base_array(data)
+                    self.pool = pool
+                data = data.view()
+            else:
+                data = np.array(data, self.dtype)
+            data.flags.writeable = False
+            self.data = data
             self.empty = False
+            self.batched = batched
         else:
             self.raise_fault('A bus cannot have more than one input')
 
+    '''
+    @brief Create (or overwrite) the file of a bus stored in a raw file, with room for an image of the given shape.
+    Pipes can write their outputs straight into the returned array (see Pipe.acquire_outputs).
+    @param shape Shape of the image
+    @return Writable np.memmap array backed by the file.
+    '''
+    def map_file(self, shape: tuple):
+        filename, planar = self.file
+        self.mapped = open_raw_image(filename, shape, self.dtype, planar, 'w+')
+        return self.mapped
+
+    '''
+    @brief Get the layout requirement of the bus: the layout set by Pipeline.set_bus_layout, or else the layout
+    negotiated from the pipes that read the bus (see Pipeline.set_layout_negotiation).
+    @return (layout, contiguous, alignment) tuple.
+    '''
+    def get_requirement(self) -> tuple:
+        layout, contiguous, alignment = self.requirement if self.requirement != None else (None, False, 0)
+        return (self.layout if self.layout != None else layout, contiguous, alignment)
+
+    '''
+    @brief Convert data that does not meet the layout requirement of the bus, and count the conversion.
+    Data backed by a np.memmap is never converted, the pipes that read it count hidden conversions instead.
+    @return data, or its converted copy.
+    '''
+    def fit_layout(self, data, batched: bool):
+        if isinstance(base_array(data), np.memmap):
+            self.layout_stats.count(0)
+            return data
+
+        layout, contiguous, alignment = self.get_requirement()
+        fits = fits_layout(data, layout, contiguous, alignment, batched)
+        #data of another dtype is copied anyway, the copy is not counted as a conversion
+        self.layout_stats.count(0 if fits or data.dtype != self.dtype else 1)
+        if fits and (data.dtype == self.dtype or alignment <= 1):
+            return data
+
+        if layout == None or data.ndim - (1 if batched else 0) != 3:
+            layout = get_layout(data) if get_layout(data) != None else BusLayout.Interleaved
+        return convert_layout(data, layout, self.dtype, alignment)
+
+    '''
+    @brief Get an array for the next data of the bus: the file of the bus, or an array that meets the layout requirement of the bus.
+    @param shape Shape of the image
+    @param pool (optional) BufferPool for the memory of the array (it is given back when the bus is reset).
+    @param batched (optional) True if the shape has a leading batch dimension.
+    '''
+    def allocate(self, shape: tuple, pool = None, batched: bool = False):
+        if self.file != None:
+            return self.map_file(shape)
+
+        layout, contiguous, alignment = self.get_requirement()
+        layout = layout if layout != None and len(shape) - (1 if batched else 0) == 3 else BusLayout.Interleaved
+        return empty_array(shape, self.dtype, layout, pool, alignment)
+
     '''
     @brief Get image data from the bus
     '''
@@ -102,17 +422,227 @@ class Bus(object):
         if self.empty == True:
             self.raise_fault('Empty bus')
 
+        if self.data is None:
+            self.raise_fault('Data released after the last reader of the bus')
+
         return self.data
 
+    '''
+    @brief Create a new empty bus with the same settings of this one.
+    '''
+    def clone(self):
+        bus = Bus(self.name, self.format, self.dtype)
+        bus.file = self.file
+        bus.layout = self.layout
+        bus.requirement = self.requirement
+        bus.layout_stats = self.layout_stats
+        return bus
+
     def raise_fault(self, msg: str):
         raise Exception( str(self.name) + ' BUS FAULT: ' + msg)
 
+'''
+@brief Pool of reusable arrays, keyed by shape and data type.
+
+Pipes that declare their output shapes get their output arrays from the pool of the pipeline, and
+these arrays come back to the pool when their buses are reset. Pipes can also borrow scratch arrays.
+'''
+class BufferPool(object):
+    def __init__(self):
+        self.free = {} #format: {(shape, dtype_str): [array0, array1, ...], ...}
+        self.in_use = {} #format: {id(array): [array, number_of_references], ...}
+        self.lock = threading.Lock()
+        self.allocations = 0 #number of arrays allocated by the pool
+        self.reuses = 0 #number of arrays served from the pool
+
+    '''
+    @brief Get an array (with undefined content) from the pool, allocating it if there is no free one.
+    The caller holds one reference to the array and must give it back with release.
+    '''
+    def acquire(self, shape: tuple, dtype):
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self.lock:
+            free_list = self.free.get(key)
+            if free_list:
+                self.reuses += 1
+                data = free_list.pop()
+            else:
+                self.allocations += 1
+                data = np.empty(shape, dtype)
+
+            self.in_use[id(data)] = [data, 1]
+            return data
+
+    '''
+    @brief Add a reference to an array of the pool (a bus holding it or a view of it).
+    @return False if the array does not belong to the pool.
+    '''
+    def retain(self, data) -> bool:
+        with self.lock:
+            entry = self.in_use.get(id(data))
+            if entry == None or entry[0] is not data:
+                return False
+            entry[1] += 1
+            return True
+
+    '''
+    @brief Check if an array of the pool is in use.
+    '''
+    def tracks(self, data) -> bool:
+        with self.lock:
+            entry = self.in_use.get(id(data))
+            return entry != None and entry[0] is data
+
+    '''
+    @brief Remove a reference to an array of the pool. The array is free again when it has no references.
+    '''
+    def release(self, data):
+        with self.lock:
+            entry = self.in_use.get(id(data))
+            if entry == None or entry[0] is not data:
+                return
+
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.in_use[id(data)]
+                self.free.setdefault((data.shape, data.dtype.str), []).append(data)
+
+    '''
+    @brief Drop all the free arrays.
+    '''
+    def clear(self):
+        with self.lock:
+            self.free = {}
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+'''
+@brief Cache of the results of a pipe (see Pipe.enable_cache), with least recently used eviction.
+
+Results are kept by key (a hash of the inputs and of the pipe arguments) until the byte budget is exceeded,
+then the least recently used ones are dropped.
+'''
+class ResultCache(object):
+    '''
+    @param max_bytes Byte budget of the cache. Results bigger than it are not kept.
+    '''
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict() #format: {key: [output_image0, output_image1, ...], ...}, least recently used first
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    '''
+    @brief Get the results kept for a key, counting a hit or a miss.
+    @return List of read-only output images, or None.
+    '''
+    def get(self, key: bytes) -> list:
+        with self.lock:
+            outputs = self.entries.get(key)
+            if outputs == None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return outputs
+
+    '''
+    @brief Keep copies of the results for a key, evicting the least recently used results to stay within the budget.
+    @param outputs List of output images
+    '''
+    def put(self, key: bytes, outputs: list):
+        size = sum([data.nbytes for data in outputs])
+        if size > self.max_bytes:
+            return
+
+        outputs = [np.array(data) for data in outputs]
+        for data in outputs:
+            data.flags.writeable = False
+
+        with self.lock:
+            if key in self.entries:
+                return
+
+            self.entries[key] = outputs
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                key, evicted = self.entries.popitem(last=False)
+                self.bytes -= sum([data.nbytes for data in evicted])
+
+    '''
+    @brief Drop all the results.
+    '''
+    def clear(self):
+        with self.lock:
+            self.entries = OrderedDict()
+            self.bytes = 0
+
+    '''
+    @brief Get the counters of the cache.
+    @return Dictionary with the number of hits ('hits'), misses ('misses'), kept results ('entries') and their bytes ('bytes').
+    '''
+    def stats(self) -> dict:
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries), 'bytes': self.bytes}
+
+    def __getstate__(self):
+        return {'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state['max_bytes'])
+
+'''
+@brief Counters of the layout conversions of a bus, or of the hidden conversions of a pipe (see Pipeline.get_layout_report).
+The clones of a bus share its counters.
+'''
+class LayoutStats(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.uses = 0 #images written to the bus, or processed by the pipe
+        self.conversions = 0
+
+    '''
+    @brief Count one use with the given number of conversions.
+    '''
+    def count(self, conversions: int):
+        with self.lock:
+            self.uses += 1
+            self.conversions += conversions
+
+    '''
+    @brief Set the counters to zero.
+    '''
+    def clear(self):
+        with self.lock:
+            self.uses = 0
+            self.conversions = 0
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
 '''
 @brief The Pipe class corresponds to a processing unit in the pipeline. The methods of this class perform image processing and bus connection tasks.
 '''
 class Pipe(object):
     auto_counter = -1 #global
     undefined_arg = None #constant
+    mutates_input = False #pipes that change their input arrays in place must set it to True to receive copies
+    elementwise = False #pipes with one output computed value by value from their first input implement elementwise_step
+    pointwise = False #elementwise pipes whose output value depends only on the input value (no side inputs), see get_lut
+    batch_callback = None #pipes that process a whole batch of images in one call implement batch_callback (see Pipeline.run_batch)
+    input_layout = None #BusLayout preferred for the multichannel inputs, or None for any layout (see Pipeline.set_layout_negotiation)
+    contiguous_input = False #pipes that are slower with strided inputs (or whose OpenCV calls copy them) set it to True
+    input_alignment = 0 #alignment of the inputs required by the pipe, in bytes (0 for none)
    
     '''
     @param in_formats List of the input buses formats
@@ -129,6 +659,10 @@ class Pipe(object):
         self.params = params #format: {'param_name':type, ...}
         self.param_changed_callbacks = {} #format: {'param_name':function, ...}
         self.arguments = {} #format: {'param_name':value, ...}
+        self.param_version = 0 #incremented on every set_param call
+        self.lut_cache = None #format: ((param_version, dtype_str), lut)
+        self.cache = None #ResultCache of the pipe (see enable_cache)
+        self.layout_stats = LayoutStats() #inputs that did not meet the layout requirement of the pipe
         for param in params:
             if type(param) != str:
                 self.raise_fault('Param name must be a string. Error in param ' + str(param))
@@ -141,9 +675,13 @@ class Pipe(object):
 
     def set_in_formats(self, in_formats: list):
         self.in_formats = in_formats
+        if self.parent_pipeline != None:
+            self.parent_pipeline.invalidate_plan()
 
     def set_out_formats(self, out_formats: list):
         self.out_formats = out_formats
+        if self.parent_pipeline != None:
+            self.parent_pipeline.invalidate_plan()
 
     '''
     @brief Set a callback method to be called after the param argument changes
@@ -174,6 +712,10 @@ class Pipe(object):
         if param_name in self.param_changed_callbacks:
             callback_method = self.param_changed_callbacks[param_name]
             callback_method(self, old_argument, argument)
+
+        self.param_version += 1
+        if self.parent_pipeline != None:
+            self.parent_pipeline.pipe_changed(self.name)
             
     
     '''
@@ -191,6 +733,59 @@ class Pipe(object):
 
         return argument
 
+    '''
+    @brief Keep the results of the pipe, so that inputs and arguments already seen are not processed again.
+    Results are looked up by a hash of the content of the input images and of the pipe arguments.
+    @param max_bytes Byte budget of the cache. The least recently used results are dropped when it is exceeded.
+    '''
+    def enable_cache(self, max_bytes: int):
+        self.cache = ResultCache(max_bytes)
+        if self.parent_pipeline != None:
+            self.parent_pipeline.invalidate_plan() #cached pipes are not fused
+
+    '''
+    @brief Drop the cache of the pipe (see enable_cache).
+    '''
+    def disable_cache(self):
+        self.cache = None
+        if self.parent_pipeline != None:
+            self.parent_pipeline.invalidate_plan()
+
+    '''
+    @brief Get the counters of the cache of the pipe (see ResultCache.stats).
+    @return Dictionary with the counters, or None if the pipe has no cache.
+    '''
+    def get_cache_stats(self) -> dict:
+        return self.cache.stats() if self.cache != None else None
+
+    '''
+    @brief Hash the input images and the arguments of the pipe, to look up its results in the cache.
+    @param input_list List of input images.
+    @param out_buses List of the output bus objects.
+    @param batched True if the inputs are batches of images.
+    @return Key for the cache.
+    '''
+    def cache_key(self, input_list: list, out_buses: list, batched: bool) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        hash_value(digest, self.arguments)
+        digest.update(repr(([bus.dtype.str for bus in out_buses], batched)).encode())
+        for data in input_list:
+            digest.update(repr((data.shape, data.dtype.str)).encode())
+            digest.update(np.ascontiguousarray(data).data)
+        return digest.digest()
+
+    '''
+    @brief Send the results kept in the cache for a key to the output buses.
+    @return True on a cache hit, False otherwise.
+    '''
+    def send_cached_outputs(self, key: bytes, out_buses: list, batched: bool) -> bool:
+        outputs = self.cache.get(key)
+        if outputs == None:
+            return False
+
+        self.send_outputs(outputs, None, out_buses, batched)
+        return True
+
     '''
     @brief Set the reference to the Pipeline object where this Pipe is nested.
     @param parent_pipeline Pipeline object where this Pipe is nested.
@@ -220,36 +815,287 @@ class Pipe(object):
     @brief Get all the input images from buses, apply the filtering, get the output images and send to de buses.
     @param in_bus_names List of the input buses names.
     @param out_bus_names List of the output buses names.
+    @param buses (optional) Bus set to use instead of the buses of the parent pipeline. Format: {'bus_name': bus_object, ...}
     '''
-    def process(self, in_bus_names: list, out_bus_names: list):
+    def process(self, in_bus_names: list, out_bus_names: list, buses: dict = None):
+        buses = buses if buses != None else self.parent_pipeline.buses
         self.check_buses(in_bus_names, out_bus_names)
         input_list = []
         
-        #Get data from buses
-        for n in in_bus_names:
-            current_bus = self.parent_pipeline.buses[n]
-            input_list.append( np.copy(current_bus.get_data()) )
+        #Get data from buses (read-only views, unless the pipe mutates its input)
+        in_buses = [buses[n] for n in in_bus_names]
+        for current_bus in in_buses:
+            input_list.append(current_bus.get_data())
 
-        output_list = self.callback(input_list)
+        batched = self.batch_inputs(input_list, in_buses)
+        self.count_hidden_conversions(input_list, batched)
+        if self.mutates_input:
+            input_list = [np.copy(data) for data in input_list]
+
+        out_buses = [buses[n] for n in out_bus_names]
+        key = self.cache_key(input_list, out_buses, batched) if self.cache != None else None
+        if key != None and self.send_cached_outputs(key, out_buses, batched):
+            return
+
+        out = self.acquire_outputs(input_list, out_buses, batched)
+        output_list = self.run_callback(input_list, out, out_buses, batched)
 
         # Check output data validity by len
         if len(output_list) != len(out_bus_names):
             raise Exception(str(self.name) + ' PIPE FAULT: Pipe.callback returning invalid data. Internal error.')
 
+        skip = 1 if batched else 0 #the batch dimension is not part of the image shape
         for i in range(len(output_list)):
             #Check output data format by shape
             if self.out_formats[i] == BusFormat.Channel:
-                if fit_tuple(output_list[i].shape,1,3)[2] != 1:
+                if fit_tuple(output_list[i].shape,1,3,skip)[2] != 1:
                     raise Exception(str(self.name) + ' PIPE FAULT: Pipe.callback returning invalid data format. Internal error.')
             elif self.out_formats[i] != BusFormat.Universal:
-                if fit_tuple(output_list[i].shape,1,3)[2] != 3:
+                if fit_tuple(output_list[i].shape,1,3,skip)[2] != 3:
                     raise Exception(str(self.name) + ' PIPE FAULT: Pipe.callback returning invalid data format. Internal error.')
 
-            #Send data to bus
-            self.parent_pipeline.buses[out_bus_names[i]].set_data(output_list[i])
-        
+            if batched and (output_list[i].ndim == 0 or output_list[i].shape[0] != input_list[0].shape[0]):
+                raise Exception(str(self.name) + ' PIPE FAULT: Pipe.batch_callback returning a batch of invalid size. Internal error.')
+
+        #Send data to buses
+        self.send_outputs(output_list, out, out_buses, batched)
+        if key != None:
+            self.cache.put(key, [bus.data for bus in out_buses])
+
+    '''
+    @brief Give the same batch dimension to all the inputs of the pipe (see Pipeline.run_batch).
+    Unbatched inputs (e.g. one mask for the whole batch) are broadcast to the batch size, without copies.
+    @param input_list List of input images. Changed in place.
+    @param in_buses List of the input bus objects.
+    @return True if the inputs are batched.
+    '''
+    def batch_inputs(self, input_list: list, in_buses: list) -> bool:
+        sizes = set([input_list[i].shape[0] for i in range(len(in_buses)) if in_buses[i].batched])
+        if len(sizes) == 0:
+            return False
+
+        if len(sizes) > 1:
+            self.raise_fault('Input batches with different sizes: ' + str(sorted(sizes)))
+
+        size = sizes.pop()
+        for i in range(len(in_buses)):
+            if not in_buses[i].batched:
+                input_list[i] = np.broadcast_to(input_list[i], (size,) + input_list[i].shape)
+
+        return True
+
+    '''
+    @brief Count the inputs that do not meet the layout requirement of the pipe (input_layout, contiguous_input
+    and input_alignment). The pipe, or the OpenCV functions it calls, have to copy them or work slower on them.
+    '''
+    def count_hidden_conversions(self, input_list: list, batched: bool):
+        if self.input_layout == None and not self.contiguous_input and self.input_alignment <= 1:
+            return
+
+        unfit = [data for data in input_list if not fits_layout(data, self.input_layout, self.contiguous_input, self.input_alignment, batched)]
+        self.layout_stats.count(len(unfit))
+
+    '''
+    @brief Call the callback, or apply the lookup table of pointwise pipes to uint8 input.
+    @param input_list List of input images.
+    @param out List of arrays for the outputs, or None.
+    @param out_buses List of the output bus objects.
+    @param batched (optional) True if the inputs are batches of images.
+    @return List of output images.
+    '''
+    def run_callback(self, input_list: list, out: list, out_buses: list, batched: bool = False) -> list:
+        if self.pointwise and input_list[0].dtype == np.uint8:
+            lut = self.get_lut(out_buses[0].dtype)
+            return [apply_lut(lut, input_list[0], out[0] if out != None else None)]
+
+        if batched:
+            if self.batch_callback == None:
+                return self.per_image_callback(input_list)
+            return self.batch_callback(input_list) if out == None else self.batch_callback(input_list, out)
+
+        return self.callback(input_list) if out == None else self.callback(input_list, out)
+
+    '''
+    @brief Run the callback once per image of the batch and stack the outputs.
+    Used for the pipes that do not implement batch_callback.
+    @param input_list List of input batches.
+    @return List of output batches.
+    '''
+    def per_image_callback(self, input_list: list) -> list:
+        results = [self.callback([data[n] for data in input_list]) for n in range(input_list[0].shape[0])]
+        return [np.stack([result[i] for result in results]) for i in range(len(results[0]))]
+
+    '''
+    @brief Get the 256-entry lookup table of a pointwise pipe for uint8 input.
+    The table is rebuilt only after a set_param call.
+    @param dtype Data type of the output bus.
+    @return Array with the output value (in dtype) for each uint8 input value.
+    '''
+    def get_lut(self, dtype):
+        key = (self.param_version, np.dtype(dtype).str)
+        cache = self.lut_cache
+        if cache == None or cache[0] != key:
+            values = self.elementwise_step(np.arange(256, dtype=np.float32), [])
+            cache = (key, np.array(values, dtype))
+            self.lut_cache = cache
+
+        return cache[1]
+
+    '''
+    @brief Get the output arrays for the callback from the buffer pool of the parent pipeline, or from the
+    files of the buses stored in files (see Pipeline.set_bus_file). The arrays meet the layout requirements of the buses (see Bus.get_requirement).
+    @param input_list List of input images.
+    @param out_buses List of the output bus objects.
+    @param batched (optional) True if the inputs are batches of images. The batch dimension is added to the shapes given by output_shapes.
+    @return List of arrays, or None if the pipe does not declare output shapes or the buses can not be pooled.
+    '''
+    def acquire_outputs(self, input_list: list, out_buses: list, batched: bool = False) -> list:
+        pool = self.parent_pipeline.buffer_pool
+        pooled_buses = self.parent_pipeline.pooled_buses
+        for bus in out_buses:
+            layout, contiguous, alignment = bus.get_requirement()
+            if bus.file == None and layout != BusLayout.Planar and alignment <= 1 and (pool == None or bus.name not in pooled_buses):
+                return None
+
+        if batched:
+            if self.batch_callback == None and not (self.pointwise and input_list[0].dtype == np.uint8):
+                return None
+            shapes = self.output_shapes([data[0] for data in input_list])
+            if shapes != None:
+                shapes = [(input_list[0].shape[0],) + tuple(shape) for shape in shapes]
+        else:
+            shapes = self.output_shapes(input_list)
+
+        if shapes == None:
+            return None
+
+        return [bus.allocate(shape, pool if bus.name in pooled_buses else None, batched) for bus, shape in zip(out_buses, shapes)]
+
+    '''
+    @brief Send the output images of the callback to the output buses.
+    @param output_list List of output images.
+    @param out List of arrays given to the callback, or None.
+    @param out_buses List of the output bus objects.
+    @param batched (optional) True if the outputs are batches of images.
+    '''
+    def send_outputs(self, output_list: list, out: list, out_buses: list, batched: bool = False):
+        pool = self.parent_pipeline.buffer_pool
+        copies = {} #format: {id(output_image): copy, ...} (outputs repeated in the list are copied once)
+        for i in range(len(out_buses)):
+            data = output_list[i]
+            if pool != None and out_buses[i].file == None and out_buses[i].name not in self.parent_pipeline.pooled_buses and pool.tracks(base_array(np.asarray(data))):
+                if id(data) not in copies:
+                    copies[id(data)] = np.copy(data) #buses that are not pooled never hold pool memory
+                data = copies[id(data)]
+            out_buses[i].set_data(data, pool, batched)
+
+        if out != None and pool != None:
+            for buffer in out:
+                pool.release(base_array(buffer))
+
+    '''
+    @brief Elementwise form of the callback, used by operator fusion (see Pipeline.compile).
+    Applies the pipe in place to a float32 array with the data of the first input (including clipping, if
+    the pipe clips). Quantization to the output bus data type is done by the caller.
+    @param data float32 array with the data of the first input
+    @param side_inputs List with the other input images
+    @return data
+    '''
+    def elementwise_step(self, data, side_inputs: list):
+        self.raise_fault('elementwise_step is not implemented')
+
+    '''
+    @brief Prepare the side inputs of the pipe for a fused chain processed in row strips (see Pipeline.compile_chain).
+    The returned arrays must have the height of the image, so they can be cut in the same strips.
+    Pipes with side inputs that are not used row by row (as images of the same size) must not be processed in strips.
+    @param side_inputs List with the side input images
+    @param shape Shape of the image (first input)
+    @return List of arrays with the height of the image, or None if the pipe can not be processed in strips.
+    '''
+    def strip_side_inputs(self, side_inputs: list, shape: tuple) -> list:
+        return [] if len(side_inputs) == 0 else None
+
+    '''
+    @brief Apply elementwise_step to a row strip of the image, in place.
+    @param data float32 strip of the image
+    @param side_strips Same rows of the side inputs given by strip_side_inputs
+    @return data
+    '''
+    def strip_step(self, data, side_strips: list):
+        return self.elementwise_step(data, side_strips)
+
+    '''
+    @brief Shapes of the output images for the given input images. Pipes that know them in advance
+    should overwrite this method and accept an 'out' list of arrays in their callback.
+    For batches of images (see Pipeline.run_batch) it is called with the first image of each input batch.
+    @param input List of input images
+    @return List of shapes, or None if unknown.
+    '''
+    def output_shapes(self, input: list) -> list:
+        return None
+
+    '''
+    @brief Footprint of the pipe, for tiled processing (see Pipeline.process_tiled): how many pixels around
+    an output pixel (in every direction) its value depends on. Pipes must keep the image size to be tiled.
+    @return Radius in pixels (0 for pipes that work pixel by pixel), or None if an output pixel can depend on the whole image.
+    '''
+    def footprint(self):
+        return 0 if self.pointwise else None
+
+    '''
+    @brief Get a scratch array, from the buffer pool of the parent pipeline if it has one.
+    It must be given back with release_buffer, so it can not be returned by the callback.
+    '''
+    def acquire_buffer(self, shape: tuple, dtype):
+        pool = self.parent_pipeline.buffer_pool if self.parent_pipeline != None else None
+        return pool.acquire(shape, dtype) if pool != None else np.empty(shape, dtype)
+
+    '''
+    @brief Give back a scratch array obtained with acquire_buffer.
+    '''
+    def release_buffer(self, data):
+        pool = self.parent_pipeline.buffer_pool if self.parent_pipeline != None else None
+        if pool != None:
+            pool.release(data)
+
+    '''
+    @brief Create a processing function with the buses resolved in advance.
+    Unless debug is True, the checks of the process method are skipped, so the buses must have been checked before (see Pipeline.compile).
+    @param in_bus_names List of the input buses names.
+    @param out_bus_names List of the output buses names.
+    @param buses Bus set. Format: {'bus_name': bus_object, ...}
+    @param debug If True, the function calls the process method, with all its checks.
+    @return Function without arguments that processes the pipe.
+    '''
+    def compile_step(self, in_bus_names: list, out_bus_names: list, buses: dict, debug: bool = False):
+        if debug:
+            return lambda: self.process(in_bus_names, out_bus_names, buses)
+
+        in_buses = [buses[n] for n in in_bus_names]
+        out_buses = [buses[n] for n in out_bus_names]
+
+        def step():
+            input_list = [bus.get_data() for bus in in_buses]
+            batched = self.batch_inputs(input_list, in_buses)
+            self.count_hidden_conversions(input_list, batched)
+            key = self.cache_key(input_list, out_buses, batched) if self.cache != None else None
+            if key != None and self.send_cached_outputs(key, out_buses, batched):
+                return
+
+            if self.mutates_input:
+                input_list = [np.copy(data) for data in input_list]
+            out = self.acquire_outputs(input_list, out_buses, batched)
+            output_list = self.run_callback(input_list, out, out_buses, batched)
+            self.send_outputs(output_list, out, out_buses, batched)
+            if key != None:
+                self.cache.put(key, [bus.data for bus in out_buses])
+
+        return step
+
     '''
     @brief Method that will be called to apply the filtering. It must be overwrited.
+    Pipes that overwrite output_shapes must also accept an optional 'out' argument: a list of arrays
+    (one per output, with the declared shapes and the output bus data types) where the results can be written.
     @param input List of input images
     @return List of output images
     '''
@@ -257,6 +1103,10 @@ class Pipe(object):
         self.raise_fault('It is not possible to use the Pipe class without overwriting callback')
         return []
 
+    #batch_callback(self, input: list, out: list = None) -> list
+    #Same as callback, but every input and output image has a leading batch dimension (N x H x W x C).
+    #Pipes without it process batches image by image (see per_image_callback).
+
     def raise_fault(self, msg: str):
         raise Exception(str(self.name) + ' PIPE FAULT: ' + msg)
 
@@ -271,12 +1121,113 @@ class BypassPipe(Pipe):
     def callback(self, input: list) -> list:
         return input
 
+    def batch_callback(self, input: list) -> list:
+        return input
+
+    def footprint(self):
+        return 0
+
+
+'''
+@brief Bookkeeping of one run of a pipeline with early release of buses (see Pipeline.set_early_release).
+
+Counts the readers of each bus that are still to run, releases the bus after its last reader and
+measures the memory held by the buses. Views of the same array are counted once.
+'''
+class LifetimeRun(object):
+    def __init__(self, pipeline, buses: dict, unfused: set = set()):
+        self.pipeline = pipeline
+        self.buses = buses
+        self.unfused = unfused #pipes that run without the step of their fused chain
+        self.remaining = dict(pipeline.bus_reader_counts) #format: {'bus_name': readers_to_run, ...}
+        self.sizes = {} #format: {'bus_name': nbytes, ...}
+        self.owners = {} #format: {id(base_array): [nbytes, number_of_buses], ...}
+        self.live_bytes = 0
+        self.peak_bytes = 0
+
+        #the input buses, and the buses computed before the run (see Pipeline.get_output)
+        self.written = [bus_name for bus_name in buses if not buses[bus_name].empty]
+        for bus_name in self.written:
+            self.add(bus_name)
+        self.peak_bytes = self.live_bytes
+
+    def add(self, bus_name: str):
+        data = self.buses[bus_name].data
+        if data is None:
+            return
+
+        self.sizes[bus_name] = data.nbytes
+        base = base_array(data)
+        if id(base) in self.owners:
+            self.owners[id(base)][1] += 1
+        else:
+            self.owners[id(base)] = [base.nbytes, 1]
+            self.live_bytes += base.nbytes
+
+    def remove(self, bus_name: str):
+        data = self.buses[bus_name].data
+        if data is None:
+            return
+
+        owner = self.owners[id(base_array(data))]
+        owner[1] -= 1
+        if owner[1] == 0:
+            del self.owners[id(base_array(data))]
+            self.live_bytes -= owner[0]
+
+    '''
+    @brief Account the outputs of a pipe that has just run, then release the input buses it was the last reader of.
+    The buses read by a fused chain (see Pipeline.compile) are read by the step of its last pipe, so they are
+    released only when the last pipe of the chain is done.
+    '''
+    def pipe_done(self, pipe_name: str):
+        for bus_name in self.pipeline.pipe_outputs[pipe_name]:
+            self.add(bus_name)
+        self.peak_bytes = max(self.peak_bytes, self.live_bytes)
+
+        chain = self.pipeline.compiled_chains.get(pipe_name) if pipe_name not in self.unfused else None
+        if chain != None and pipe_name != chain[-1]:
+            return
+
+        reads = sum([self.pipeline.pipe_reads[member] for member in chain], []) if chain != None else self.pipeline.pipe_reads[pipe_name]
+        for bus_name in reads:
+            if bus_name in self.remaining:
+                self.remaining[bus_name] -= 1
+                if self.remaining[bus_name] == 0:
+                    self.remove(bus_name)
+                    self.buses[bus_name].release()
+
+    '''
+    @brief Memory report of the run.
+    @return Dictionary with the bytes of all the bus data ('total_bytes'), the peak expected from the plan with
+    release after the last reader ('theoretical_peak_bytes') and the measured peak ('actual_peak_bytes').
+    '''
+    def report(self) -> dict:
+        sizes = self.sizes
+        remaining = dict(self.pipeline.bus_reader_counts)
+        live = sum([sizes.get(b, 0) for b in self.written])
+        peak = live
+        for level in self.pipeline.plan:
+            for pipe_name in level:
+                live += sum([sizes.get(b, 0) for b in self.pipeline.pipe_outputs[pipe_name] if b not in self.written])
+                peak = max(peak, live)
+                for bus_name in self.pipeline.pipe_reads[pipe_name]:
+                    if bus_name in remaining:
+                        remaining[bus_name] -= 1
+                        if remaining[bus_name] == 0:
+                            live -= sizes.get(bus_name, 0)
+
+        return {'total_bytes': sum(sizes.values()), 'theoretical_peak_bytes': peak, 'actual_peak_bytes': self.peak_bytes}
 
 '''
 @brief The pipeline is a graph of pipes separated by layers and interconnected by buses.
 
 The image must be inserted into an input bus. When processing is done, this image will be
 processed by a pipe circuit and the final result will be deposited on an output bus.
+
+The execution order is derived from the bus wiring: a pipe runs after every pipe that writes
+one of its input buses. Buses without a writer are the input buses of the pipeline and buses
+without a reader are its output buses. Manual layers are still accepted, but are not needed.
 '''
 class Pipeline(object):
     def __init__(self):
@@ -287,18 +1238,59 @@ class Pipeline(object):
         self.layers = {} #format: {layer_index: ['pipe_name0', 'pipe_name1',...], ...}
         self.sequence = [] #format: [layer_index0, layer_index1, layer_index2, ...]
 
+        #execution plan (built from the wiring, cached until the graph changes)
+        self.plan = None #format: [['pipe_name0', 'pipe_name1',...], ['pipe_name2',...], ...]
+        self.pipe_dependencies = {} #format: {'pipe_name': {'pipe_name0', 'pipe_name1',...}, ...}
+        self.pipe_dependents = {} #format: {'pipe_name': ['pipe_name0', 'pipe_name1',...], ...}
+        self.bus_writer = {} #format: {'bus_name': 'pipe_name', ...}
+        self.bus_readers = {} #format: {'bus_name': ['pipe_name0', 'pipe_name1',...], ...}
+        self.input_buses = [] #format: ['bus_name0', 'bus_name1', ...]
+        self.output_buses = [] #format: ['bus_name0', 'bus_name1', ...]
+        self.pooled_buses = set() #format: {'bus_name0', 'bus_name1', ...}
+        self.bus_reader_counts = {} #format: {'bus_name': number_of_readers, ...} (buses that can be released)
+        self.pipe_reads = {} #format: {'pipe_name': ['bus_name0', ...], ...} (buses each pipe actually reads, see merge_common_pipes)
+
+        #common pipes
+        self.merge_common = False
+        self.pipe_aliases = {} #format: {'merged_pipe_name': 'kept_pipe_name', ...}
+        self.layout_negotiation = True #see set_layout_negotiation
+
+        #memory
+        self.buffer_pool = None #BufferPool or None
+        self.early_release = False
+        self.retained_buses = set() #format: {'bus_name0', 'bus_name1', ...} (buses marked as outputs)
+        self.memory_report = None #report of the last run with early release (see LifetimeRun.report)
+
+        #parallel execution
+        self.executor = None #ThreadPoolExecutor or None for sequential processing
+
+        #compiled mode
+        self.compiled_mode = None #None (not compiled), 'fused', 'lean' or 'debug'
+        self.compiled_steps = None #format: {'pipe_name': step_function, ...}
+        self.compiled_sequence = None #format: [step_function0, step_function1, ...]
+        self.compiled_chains = {} #format: {'pipe_name': ['pipe_name0', 'pipe_name1', ...], ...} (fused chain of each fused pipe)
+
+        #incremental processing
+        self.incremental = False
+        self.dirty_pipes = set() #format: {'pipe_name0', 'pipe_name1', ...} (pipes whose outputs are stale)
+
     '''
     @brief Create a new bus in the pipeline.
     @param name Unique name across the pipeline for the bus
     @param format BusFormat of the bus
+    @param dtype (optional) Data type of the bus (one of bus_dtypes)
     '''
-    def create_bus(self, name: str, format: BusFormat):
+    def create_bus(self, name: str, format: BusFormat, dtype = np.uint8):
         if type(name) != str:
             raise Exception('PIPELINE FAULT on create_bus call: name argument is not str: name=' + str(name))
         
+        if np.dtype(dtype) not in bus_dtypes:
+            raise Exception('PIPELINE FAULT on create_bus call: unsupported data type ' + str(dtype) + ' for bus ' + name)
+
         if name not in self.buses:
-            new_bus = Bus(name, format)
+            new_bus = Bus(name, format, dtype)
             self.buses[name] = new_bus
+            self.invalidate_plan()
         else:
             raise Exception('PIPELINE FAULT on create_bus call: There is already a bus with the name ' + name)
              
@@ -336,12 +1328,14 @@ class Pipeline(object):
             self.pipes[name] = pipe
             self.pipe_inputs[name] = input_buses
             self.pipe_outputs[name] = output_buses
+            self.invalidate_plan()
         else:
             raise Exception('PIPELINE FAULT on insert_pipe call: There is already a pipe with the name ' + name)
 
     '''
     @brief Define the order witch the layers will be processed.
     @param sequence Tuple or list of layers names in order of the first to the last that will be processed.
+    @note Kept for compatibility. The execution order is derived from the bus wiring by build_plan.
     '''
     def set_layers_sequence(self, sequence: tuple):
         for i in sequence:
@@ -351,18 +1345,1226 @@ class Pipeline(object):
         self.sequence = sequence
 
     '''
-    @brief Removes images from all buses and prepares the pipeline for further processing.
+    @brief Pickling support (used to ship the pipeline definition to worker processes).
+    The thread pool is not copied, the receiving pipeline processes its pipes sequentially.
     '''
-    def reset_buses(self):
-        for bus_name in self.buses:
-            bus = self.buses[bus_name]
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['executor'] = None
+        state['compiled_steps'] = None #closures are rebuilt by the receiving pipeline
+        state['compiled_sequence'] = None
+        return state
+
+    '''
+    @brief Mark the execution plan as outdated. It will be rebuilt by the next get_plan call.
+    '''
+    def invalidate_plan(self):
+        self.plan = None
+        self.compiled_steps = None
+        self.compiled_sequence = None
+        self.dirty_pipes = set(self.pipes)
+
+    '''
+    @brief Derive the execution plan from the bus wiring.
+
+    The plan is a list of levels. Each level contains pipes whose input buses are all written by
+    pipes of previous levels, so the pipes of a level do not depend on each other.
+    Raises a fault for undefined buses, buses with more than one writer, unconnected buses,
+    incompatible bus formats and cycles.
+    @return Execution plan. Format: [['pipe_name0', 'pipe_name1',...], ['pipe_name2',...], ...]
+    '''
+    def build_plan(self) -> list:
+        bus_writer = {}
+        bus_readers = {bus_name: [] for bus_name in self.buses}
+
+        for pipe_name in self.pipes:
+            for bus_name in list(self.pipe_inputs[pipe_name]) + list(self.pipe_outputs[pipe_name]):
+                if bus_name not in self.buses:
+                    raise Exception('PIPELINE FAULT on build_plan call: pipe ' + pipe_name + ' uses the undefined bus ' + str(bus_name))
+
+            for bus_name in self.pipe_inputs[pipe_name]:
+                bus_readers[bus_name].append(pipe_name)
+
+            for bus_name in self.pipe_outputs[pipe_name]:
+                if bus_name in bus_writer:
+                    raise Exception('PIPELINE FAULT on build_plan call: bus ' + bus_name + ' is written by ' + bus_writer[bus_name] + ' and ' + pipe_name)
+                bus_writer[bus_name] = pipe_name
+
+            self.pipes[pipe_name].check_buses(self.pipe_inputs[pipe_name], self.pipe_outputs[pipe_name])
+
+        for bus_name in self.buses:
+            if bus_name not in bus_writer and len(bus_readers[bus_name]) == 0:
+                raise Exception('PIPELINE FAULT on build_plan call: bus ' + bus_name + ' is not connected to any pipe')
+
+        reads = {pipe_name: list(self.pipe_inputs[pipe_name]) for pipe_name in self.pipes}
+        dependencies, dependents, plan = self.order_pipes(reads, bus_writer)
+
+        #merged pipes read the outputs of the pipe they are merged into, instead of their inputs
+        aliases = self.find_common_pipes(plan) if self.merge_common else {}
+        if len(aliases) > 0:
+            for pipe_name in aliases:
+                reads[pipe_name] = list(self.pipe_outputs[aliases[pipe_name]])
+            dependencies, dependents, plan = self.order_pipes(reads, bus_writer)
+
+        self.bus_writer = bus_writer
+        self.bus_readers = bus_readers
+        self.pipe_dependencies = dependencies
+        self.pipe_dependents = dependents
+        self.input_buses = [b for b in self.buses if b not in bus_writer]
+        self.output_buses = [b for b in self.buses if len(bus_readers[b]) == 0 or b in self.retained_buses]
+        self.pooled_buses = set([b for b in self.buses if b in bus_writer and len(bus_readers[b]) > 0 and b not in self.retained_buses and self.buses[b].file == None])
+        self.bus_reader_counts = {b: sum([reads[p].count(b) for p in self.pipes]) for b in self.buses if len(bus_readers[b]) > 0 and b not in self.retained_buses}
+        self.pipe_reads = reads
+        self.pipe_aliases = aliases
+        self.negotiate_layouts(reads)
+        self.plan = plan
+        return plan
+
+    '''
+    @brief Give every bus the layout requirement of the pipes that read it (see Pipe.input_layout, Pipe.contiguous_input
+    and Pipe.input_alignment). When the readers prefer different layouts, the layout preferred by most of them is used
+    (interleaved on ties). The input buses get no requirement. The counters of the layout report are set to zero.
+    @param reads Buses read by each pipe. Format: {'pipe_name': ['bus_name0', 'bus_name1', ...], ...}
+    '''
+    def negotiate_layouts(self, reads: dict):
+        for bus_name in self.buses:
+            bus = self.buses[bus_name]
+            bus.layout_stats.clear()
+            readers = [self.pipes[pipe_name] for pipe_name in self.pipes if bus_name in reads[pipe_name]]
+            #the data of the input buses belongs to the user (e.g. a zero-copy view of a file), it is not converted
+            if not self.layout_negotiation or len(readers) == 0 or bus_name in self.input_buses:
+                bus.requirement = None
+                continue
+
+            layouts = [pipe.input_layout for pipe in readers if pipe.input_layout != None]
+            layout = max([BusLayout.Interleaved, BusLayout.Planar], key=layouts.count) if len(layouts) > 0 else None
+            contiguous = any([pipe.contiguous_input for pipe in readers])
+            alignment = max([pipe.input_alignment for pipe in readers])
+            bus.requirement = (layout, contiguous, alignment)
+
+        for pipe in self.pipes.values():
+            pipe.layout_stats.clear()
+
+    '''
+    @brief Order the pipes level by level (Kahn's algorithm).
+    @param reads Buses read by each pipe. Format: {'pipe_name': ['bus_name0', 'bus_name1', ...], ...}
+    @param bus_writer Writer of each bus. Format: {'bus_name': 'pipe_name', ...}
+    @return (dependencies, dependents, plan) tuple.
+    '''
+    def order_pipes(self, reads: dict, bus_writer: dict) -> tuple:
+        dependencies = {}
+        dependents = {pipe_name: [] for pipe_name in self.pipes}
+        for pipe_name in self.pipes:
+            dependencies[pipe_name] = set([bus_writer[b] for b in reads[pipe_name] if b in bus_writer])
+            for dependency in dependencies[pipe_name]:
+                dependents[dependency].append(pipe_name)
+
+        plan = []
+        done = set()
+        pending = list(self.pipes)
+        while len(pending) > 0:
+            level = [p for p in pending if dependencies[p] <= done]
+            if len(level) == 0:
+                raise Exception('PIPELINE FAULT on build_plan call: cycle between the pipes ' + str(pending))
+
+            plan.append(level)
+            done.update(level)
+            pending = [p for p in pending if p not in done]
+
+        return dependencies, dependents, plan
+
+    '''
+    @brief Find the pipes that compute the same thing as another pipe: same class, equal arguments and the same
+    input buses (or buses with the same data, from pipes found before). Their output buses must have the same
+    formats and data types.
+    @param plan Execution plan
+    @return Format: {'merged_pipe_name': 'kept_pipe_name', ...}
+    '''
+    def find_common_pipes(self, plan: list) -> dict:
+        aliases = {}
+        same_data = {} #format: {'bus_name': 'bus_name_with_the_same_data', ...}
+        kept = {} #format: {signature: 'pipe_name', ...}
+
+        for level in plan:
+            for pipe_name in level:
+                pipe = self.pipes[pipe_name]
+                inputs = tuple([same_data.get(b, b) for b in self.pipe_inputs[pipe_name]])
+                outputs = tuple([(self.buses[b].format, self.buses[b].dtype.str) for b in self.pipe_outputs[pipe_name]])
+                signature = (type(pipe), hash_arguments(pipe.arguments), inputs, outputs)
+
+                if signature not in kept:
+                    kept[signature] = pipe_name
+                    continue
+
+                aliases[pipe_name] = kept[signature]
+                for bus_name, kept_bus_name in zip(self.pipe_outputs[pipe_name], self.pipe_outputs[kept[signature]]):
+                    same_data[bus_name] = same_data.get(kept_bus_name, kept_bus_name)
+
+        return aliases
+
+    '''
+    @brief Get the cached execution plan, building it if the graph changed.
+    @return Execution plan. Format: [['pipe_name0', 'pipe_name1',...], ['pipe_name2',...], ...]
+    '''
+    def get_plan(self) -> list:
+        if self.plan == None:
+            self.build_plan()
+
+        return self.plan
+
+    '''
+    @brief Removes images from all buses and prepares the pipeline for further processing.
+    '''
+    def reset_buses(self):
+        for bus_name in self.buses:
+            bus = self.buses[bus_name]
             bus.reset()
+        self.dirty_pipes = set(self.pipes)
+
+    '''
+    @brief Removes images from all buses of a bus set (see create_bus_set).
+    '''
+    def reset_bus_set(self, buses: dict):
+        for bus_name in buses:
+            buses[bus_name].reset()
+
+    '''
+    @brief Enable or disable the buffer pool of the pipeline.
+
+    With the pool, intermediate buses (buses that are read by some pipe) get their arrays from the pool and
+    give them back on reset, so a steady stream of same-sized images runs with almost no allocations.
+    Output buses are never pooled, so their images remain valid after the reset.
+    Data of intermediate buses must not be kept after the reset.
+    @param enabled True to enable the pool.
+    '''
+    def set_buffer_pool(self, enabled: bool):
+        self.buffer_pool = BufferPool() if enabled else None
 
     '''
-    @brief Run the sequential processing of the pipes.
+    @brief Enable or disable the early release of buses.
+
+    With early release, the data of a bus is dropped (or given back to the buffer pool) as soon as the last
+    pipe reading it has run, instead of living until reset_buses. The peak memory of the last run is then
+    reported in memory_report. Buses without readers and buses marked with mark_output_bus are retained.
+    @param enabled True to enable early release.
+    '''
+    def set_early_release(self, enabled: bool):
+        self.early_release = enabled
+
+    '''
+    @brief Mark a bus as an output of the pipeline, so that its data is retained until reset_buses even if some pipe reads it.
+    @param name Name of the bus
+    '''
+    def mark_output_bus(self, name: str):
+        if name not in self.buses:
+            raise Exception('PIPELINE FAULT on mark_output_bus call: bus ' + str(name) + ' not found')
+
+        self.retained_buses.add(name)
+        self.invalidate_plan()
+
+    '''
+    @brief Store the data of a bus in a raw file instead of the memory (see open_raw_image).
+
+    Pipes that declare their output shapes write straight into the file, the others have their output copied into it.
+    The file is overwritten by every image written to the bus, and it stays on the disk after reset_buses.
+    Bus sets share the file, so the bus should be an output bus, for the images processed one at a time.
+    Large inputs do not need this: memory-mapped arrays (see open_raw_image) are put into the buses without copies.
+    @param name Name of the bus
+    @param filename Path of the file, or None to store the data of the bus in the memory again.
+    @param planar (optional) If True, the channels are stored one after the other in the file (channels x height x width).
+    '''
+    def set_bus_file(self, name: str, filename, planar: bool = False):
+        if name not in self.buses:
+            raise Exception('PIPELINE FAULT on set_bus_file call: bus ' + str(name) + ' not found')
+
+        self.buses[name].file = (filename, planar) if filename != None else None
+        self.invalidate_plan()
+
     '''
-    def process(self):
-        for layer in self.sequence:
-            for pipe_name in self.layers[layer]:
-                current_pipe = self.pipes[pipe_name]
-                current_pipe.process(self.pipe_inputs[pipe_name], self.pipe_outputs[pipe_name])
\ No newline at end of file
+    @brief Set the memory layout of the multichannel data of a bus.
+
+    With BusLayout.Planar every channel is a contiguous plane, so the channels given by a SplitPipe are contiguous
+    views, and a MergePipe writes whole planes into its output array. The bus data is still a (height x width x channels)
+    array for the pipes. Data of another layout written to the bus is converted once, when it is put into the bus.
+    @param name Name of the bus
+    @param layout BusLayout, or None to keep the layout of the data written to the bus (default).
+    '''
+    def set_bus_layout(self, name: str, layout: BusLayout):
+        if name not in self.buses:
+            raise Exception('PIPELINE FAULT on set_bus_layout call: bus ' + str(name) + ' not found')
+
+        if layout != None and not isinstance(layout, BusLayout):
+            raise Exception('PIPELINE FAULT on set_bus_layout call: invalid layout ' + str(layout))
+
+        self.buses[name].layout = layout
+        self.invalidate_plan()
+
+    '''
+    @brief Enable or disable the layout negotiation (enabled by default).
+
+    Pipes declare the memory layout they work best with (see Pipe.input_layout, Pipe.contiguous_input and
+    Pipe.input_alignment), and the plan gives every bus the requirement of the pipes that read it. Data that does
+    not meet the requirement is converted once, when it is written to the bus, and pipes writing to pooled or planar
+    buses get output arrays that already meet it. So data is converted only where producer and consumer disagree.
+    The data of the input buses and data backed by a np.memmap are never converted, so inputs stay zero-copy; pipes
+    that get them in another layout count hidden conversions. Layouts set with set_bus_layout take precedence.
+    See get_layout_report for the conversions.
+    @param enabled True to enable the negotiation.
+    '''
+    def set_layout_negotiation(self, enabled: bool):
+        self.layout_negotiation = enabled
+        self.invalidate_plan()
+
+    '''
+    @brief Get the layout conversions since the plan was built.
+    Conversions are done by the buses (see set_layout_negotiation). Hidden conversions are inputs that do not meet
+    the layout requirement of a pipe, so the pipe (or the OpenCV functions it calls) copies them or works slower on them.
+    @return Dictionary with the counters of every bus ('buses'), of every pipe with a layout requirement ('pipes'),
+    and the average number of conversions ('conversions_per_frame') and of hidden conversions ('hidden_per_frame') per image.
+    Format: {'buses': {'bus_name': {'requirement': (layout, contiguous, alignment), 'writes': n, 'conversions': n}, ...},
+    'pipes': {'pipe_name': {'runs': n, 'hidden_conversions': n}, ...}, 'conversions_per_frame': x, 'hidden_per_frame': y}
+    '''
+    def get_layout_report(self) -> dict:
+        self.get_plan()
+        buses = {}
+        for bus_name in self.buses:
+            stats = self.buses[bus_name].layout_stats
+            buses[bus_name] = {'requirement': self.buses[bus_name].get_requirement(), 'writes': stats.uses, 'conversions': stats.conversions}
+
+        pipes = {}
+        for pipe_name in self.pipes:
+            stats = self.pipes[pipe_name].layout_stats
+            if stats.uses > 0:
+                pipes[pipe_name] = {'runs': stats.uses, 'hidden_conversions': stats.conversions}
+
+        return {
+            'buses': buses,
+            'pipes': pipes,
+            'conversions_per_frame': sum([b['conversions'] / b['writes'] for b in buses.values() if b['writes'] > 0]),
+            'hidden_per_frame': sum([p['hidden_conversions'] / p['runs'] for p in pipes.values()])
+        }
+
+    '''
+    @brief Enable or disable the merging of common pipes, a graph optimization.
+
+    Pipes of the same class, with equal arguments, that read the same buses (or buses with the same data, from
+    pipes merged before) compute the same thing. With merging, only the first of them runs and the output buses
+    of the others get its data, without copies. The bus names do not change. A parameter change on a merged
+    pipe builds the plan again, so pipes whose arguments became different are not merged anymore.
+    @param enabled (optional) True to enable the merging.
+    @return Report of the merged pipes (see get_merge_report).
+    '''
+    def merge_common_pipes(self, enabled: bool = True) -> list:
+        self.merge_common = enabled
+        self.invalidate_plan()
+        return self.get_merge_report()
+
+    '''
+    @brief Get the report of the pipes merged by merge_common_pipes.
+    @return Format: [{'pipe': 'merged_pipe_name', 'merged_into': 'kept_pipe_name', 'buses': {'merged_bus_name': 'kept_bus_name', ...}}, ...]
+    '''
+    def get_merge_report(self) -> list:
+        self.get_plan()
+        report = []
+        for level in self.plan:
+            for pipe_name in level:
+                if pipe_name in self.pipe_aliases:
+                    kept = self.pipe_aliases[pipe_name]
+                    report.append({'pipe': pipe_name, 'merged_into': kept, 'buses': dict(zip(self.pipe_outputs[pipe_name], self.pipe_outputs[kept]))})
+
+        return report
+
+    '''
+    @brief Enable or disable incremental processing.
+
+    In incremental mode, the buses keep their data between process calls. A parameter change marks the pipe
+    as stale and a new image on an input bus (see set_inputs) marks the pipes reading it as stale. Then process
+    runs only the stale pipes and the pipes downstream of them, and every other bus keeps its data.
+    Buses are not released early in this mode.
+    @param enabled True to enable incremental processing.
+    '''
+    def set_incremental(self, enabled: bool):
+        self.incremental = enabled
+        self.dirty_pipes = set(self.pipes)
+
+    '''
+    @brief Mark a pipe as stale, after a change of its parameters (called by Pipe.set_param).
+    @param pipe_name Name of the pipe
+    '''
+    def pipe_changed(self, pipe_name: str):
+        if pipe_name in self.pipe_aliases or pipe_name in self.pipe_aliases.values():
+            self.invalidate_plan() #the pipes may not compute the same thing anymore
+        elif pipe_name in self.pipes:
+            self.dirty_pipes.add(pipe_name)
+
+    '''
+    @brief Get the pipes that process must run in incremental mode: the stale pipes and the pipes downstream of them.
+    @return Set of pipe names.
+    '''
+    def get_stale_pipes(self) -> set:
+        self.get_plan()
+        stale = set()
+        pending = list(self.dirty_pipes)
+        while len(pending) > 0:
+            pipe_name = pending.pop()
+            if pipe_name not in stale:
+                stale.add(pipe_name)
+                pending += self.pipe_dependents[pipe_name]
+
+        return stale
+
+    '''
+    @brief Get the counters of the caches of the pipes (see Pipe.enable_cache).
+    @return Dictionary with {'pipe_name': {'hits': ..., 'misses': ..., 'entries': ..., 'bytes': ...}, ...} relation for each pipe with a cache.
+    '''
+    def get_cache_stats(self) -> dict:
+        return {pipe_name: self.pipes[pipe_name].get_cache_stats() for pipe_name in self.pipes if self.pipes[pipe_name].cache != None}
+
+    '''
+    @brief Set the number of threads used to run independent pipes at the same time.
+    @param max_workers Number of threads. With None, 0 or 1 the pipes are processed sequentially.
+    '''
+    def set_max_workers(self, max_workers: int):
+        if self.executor != None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+        if max_workers != None and max_workers > 1:
+            self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ipp')
+
+    '''
+    @brief Validate the pipeline once and turn it into a flat list of processing steps.
+
+    In lean mode, bus objects and callbacks are resolved in advance and the per-call checks of
+    Pipe.process (bus formats and output shapes) are skipped. In debug mode, the steps keep all
+    the checks. The pipeline stays compiled (and is recompiled after graph changes) until
+    decompile is called.
+
+    In lean mode, chains of elementwise pipes (see Pipe.elementwise) are also fused into a single step
+    that works on one float32 array and quantizes only once, into the last bus of the chain. Chains of
+    pointwise pipes on uint8 input are applied as a single 256-entry lookup table. The buses
+    inside a chain stay empty. Fused results can differ from the unfused ones because the buses inside the
+    chain are not quantized: by less than 1 per fused bus, multiplied by the gain of the pipes after it
+    (the value of a product pipe, the mask of a hadamard pipe), for results inside the range of the bus type.
+    @param debug If True, keep the per-call checks (and do not fuse).
+    @param fuse If True, fuse chains of elementwise pipes.
+    '''
+    def compile(self, debug: bool = False, fuse: bool = True):
+        self.compiled_mode = 'debug' if debug else ('fused' if fuse else 'lean')
+        self.compiled_steps = None
+        self.compiled_sequence = None
+
+        plan = self.get_plan()
+        chains = self.find_fusion_chains() if self.compiled_mode == 'fused' else []
+        fused = {} #format: {'pipe_name': chain, ...}
+        for chain in chains:
+            for pipe_name in chain:
+                fused[pipe_name] = chain
+
+        steps = {}
+        for level in plan:
+            for pipe_name in level:
+                if pipe_name in self.pipe_aliases:
+                    steps[pipe_name] = (lambda pipe_name=pipe_name: self.process_alias(pipe_name, self.buses))
+                elif pipe_name not in fused:
+                    steps[pipe_name] = self.pipes[pipe_name].compile_step(self.pipe_inputs[pipe_name], self.pipe_outputs[pipe_name], self.buses, debug)
+                elif pipe_name == fused[pipe_name][-1]:
+                    steps[pipe_name] = self.compile_chain(fused[pipe_name], self.buses)
+                else:
+                    steps[pipe_name] = lambda: None #done by the step of the last pipe of the chain
+
+        self.compiled_steps = steps
+        self.compiled_chains = fused
+        self.compiled_sequence = [steps[pipe_name] for level in plan for pipe_name in level if pipe_name not in fused or pipe_name == fused[pipe_name][-1]]
+
+    '''
+    @brief Find the chains of elementwise pipes that can be fused.
+    A pipe joins the chain of the pipe before it if it reads, as its first input, the single output of that pipe,
+    and nobody else reads that bus (which must not be marked as output).
+    @return Format: [['pipe_name0', 'pipe_name1',...], ...] (chains of at least two pipes, in processing order)
+    '''
+    def find_fusion_chains(self) -> list:
+        plan = self.get_plan()
+        chains = []
+        chain_of = {} #format: {'pipe_name': chain, ...}
+
+        for level in plan:
+            for pipe_name in level:
+                pipe = self.pipes[pipe_name]
+                if not pipe.elementwise or len(self.pipe_outputs[pipe_name]) != 1 or pipe.cache != None:
+                    continue
+
+                if pipe_name in self.pipe_aliases or pipe_name in self.pipe_aliases.values():
+                    continue #the buses of merged pipes must be written
+
+                stream_bus = self.pipe_inputs[pipe_name][0]
+                previous = self.bus_writer.get(stream_bus)
+                fusible = previous in chain_of and chain_of[previous][-1] == previous \
+                    and self.bus_readers[stream_bus] == [pipe_name] and stream_bus not in self.retained_buses
+
+                if fusible:
+                    chain_of[previous].append(pipe_name)
+                    chain_of[pipe_name] = chain_of[previous]
+                else:
+                    chain_of[pipe_name] = [pipe_name]
+                    chains.append(chain_of[pipe_name])
+
+        return [chain for chain in chains if len(chain) > 1]
+
+    '''
+    @brief Create the processing function of a fused chain of elementwise pipes.
+    @param chain List of pipe names, in processing order.
+    @param buses Bus set. Format: {'bus_name': bus_object, ...}
+    @return Function without arguments that processes the chain.
+    '''
+    def compile_chain(self, chain: list, buses: dict):
+        pipes = [self.pipes[pipe_name] for pipe_name in chain]
+        head_bus = buses[self.pipe_inputs[chain[0]][0]]
+        side_buses = [[buses[b] for b in self.pipe_inputs[pipe_name][1:]] for pipe_name in chain]
+        all_side_buses = sum(side_buses, [])
+        out_bus = buses[self.pipe_outputs[chain[-1]][0]]
+        last_pipe = pipes[-1]
+        pointwise = all([pipe.pointwise for pipe in pipes])
+        lut_cache = [None] #format: [((param_version0, param_version1, ...), lut)]
+        prefix = 0 #number of pointwise pipes at the start of the chain
+        while prefix < len(pipes) and pipes[prefix].pointwise:
+            prefix += 1
+        prefix_lut_cache = [None] #format: [((param_version0, param_version1, ...), float32 lut)]
+
+        '''
+        @brief Lookup table of the pointwise pipes at the start of the chain, from uint8 to float32.
+        '''
+        def prefix_lut():
+            key = tuple([pipe.param_version for pipe in pipes[:prefix]])
+            if prefix_lut_cache[0] == None or prefix_lut_cache[0][0] != key:
+                values = np.arange(256, dtype=np.float32)
+                for pipe in pipes[:prefix]:
+                    pipe.elementwise_step(values, [])
+                prefix_lut_cache[0] = (key, values)
+            return prefix_lut_cache[0][1]
+
+        '''
+        @brief Process the chain in row strips small enough to stay in the cache: every strip goes through all the
+        pipes before the next one is read, so the image is read and the output is written once.
+        '''
+        def strip_step(in_data, strips: list):
+            height = in_data.shape[0]
+            out = last_pipe.acquire_outputs([in_data], [out_bus], False)
+            out_data = out[0] if out != None else np.empty(in_data.shape, out_bus.dtype)
+            row_bytes = max(1, int(np.prod(in_data.shape[1:])) * 4)
+            rows = max(1, min(height, fusion_strip_bytes // row_bytes))
+            lut = prefix_lut() if prefix > 0 and in_data.dtype == np.uint8 else None
+            start = prefix if lut is not None else 0
+
+            #float32 outputs are computed in place, other types go through a scratch strip
+            work = last_pipe.acquire_buffer((rows,) + in_data.shape[1:], np.float32) if out_data.dtype != np.float32 else None
+            for y in range(0, height, rows):
+                h = min(rows, height - y)
+                strip = out_data[y:y+h] if work is None else work[:h]
+                if lut is not None:
+                    apply_lut(lut, in_data[y:y+h], strip)
+                else:
+                    np.copyto(strip, in_data[y:y+h], casting='unsafe')
+
+                for i in range(start, len(pipes)):
+                    pipes[i].strip_step(strip, [side[y:y+h] for side in strips[i]])
+
+                if work is not None:
+                    np.copyto(out_data[y:y+h], strip, casting='unsafe')
+
+            if work is not None:
+                last_pipe.release_buffer(work)
+            last_pipe.send_outputs([out_data], out, [out_bus], False)
+
+        def step():
+            in_data = head_bus.get_data()
+            batched = head_bus.batched
+
+            if len(all_side_buses) > 0 and (batched or any([bus.batched for bus in all_side_buses])):
+                #side inputs are per image, so batches go through the pipes of the chain one by one
+                for pipe_name in chain:
+                    self.pipes[pipe_name].process(self.pipe_inputs[pipe_name], self.pipe_outputs[pipe_name], buses)
+                return
+
+            if pointwise and in_data.dtype == np.uint8:
+                #the whole chain is one lookup table, rebuilt when a parameter of the chain changes
+                key = tuple([pipe.param_version for pipe in pipes])
+                if lut_cache[0] == None or lut_cache[0][0] != key:
+                    values = np.arange(256, dtype=np.float32)
+                    for pipe in pipes:
+                        pipe.elementwise_step(values, [])
+                    lut_cache[0] = (key, np.array(values, out_bus.dtype))
+
+                out = last_pipe.acquire_outputs([in_data], [out_bus], batched)
+                out_data = apply_lut(lut_cache[0][1], in_data, out[0] if out != None else None)
+                last_pipe.send_outputs([out_data], out, [out_bus], batched)
+                return
+
+            if not batched and in_data.ndim >= 2:
+                strips = [pipes[i].strip_side_inputs([bus.get_data() for bus in side_buses[i]], in_data.shape) for i in range(len(pipes))]
+                if all([strip != None for strip in strips]):
+                    strip_step(in_data, strips)
+                    return
+
+            #batches and pipes that can not be processed in strips: one pass over the whole image per pipe
+            work = last_pipe.acquire_buffer(in_data.shape, np.float32)
+            np.copyto(work, in_data, casting='unsafe')
+
+            for i in range(len(pipes)):
+                pipes[i].elementwise_step(work, [bus.get_data() for bus in side_buses[i]])
+
+            if out_bus.dtype == work.dtype:
+                last_pipe.send_outputs([work], None, [out_bus], batched)
+            else:
+                out = last_pipe.acquire_outputs([in_data], [out_bus], batched)
+                out_data = out[0] if out != None else np.empty(work.shape, out_bus.dtype)
+                np.copyto(out_data, work, casting='unsafe')
+                last_pipe.send_outputs([out_data], out, [out_bus], batched)
+
+            last_pipe.release_buffer(work)
+
+        return step
+
+    '''
+    @brief Go back to the regular (not compiled) processing.
+    '''
+    def decompile(self):
+        self.compiled_mode = None
+        self.compiled_steps = None
+        self.compiled_sequence = None
+        self.compiled_chains = {}
+
+    '''
+    @brief Get the compiled steps, compiling again if the graph changed.
+    @return Format: {'pipe_name': step_function, ...} or None if the pipeline is not compiled.
+    '''
+    def get_compiled_steps(self) -> dict:
+        if self.compiled_mode != None and self.compiled_steps == None:
+            self.compile(self.compiled_mode == 'debug', self.compiled_mode == 'fused')
+
+        return self.compiled_steps
+
+    '''
+    @brief Create a set of empty buses with the same names and settings of the pipeline buses.
+    Independent bus sets allow several images to be in flight through the same pipeline.
+    @return Format: {'bus_name': bus_object, ...}
+    '''
+    def create_bus_set(self) -> dict:
+        return {bus_name: self.buses[bus_name].clone() for bus_name in self.buses}
+
+    '''
+    @brief Process a single pipe of the pipeline.
+    @param pipe_name Name of the pipe
+    @param buses (optional) Bus set to use instead of the pipeline buses.
+    '''
+    def process_pipe(self, pipe_name: str, buses: dict = None):
+        if buses == None and self.compiled_steps != None:
+            self.compiled_steps[pipe_name]()
+        elif pipe_name in self.pipe_aliases:
+            self.process_alias(pipe_name, buses)
+        else:
+            self.pipes[pipe_name].process(self.pipe_inputs[pipe_name], self.pipe_outputs[pipe_name], buses)
+
+    '''
+    @brief Get the pipes needed to compute some buses: the writers of the buses and, recursively, the writers of their inputs.
+    The set can hold only a part of a fused chain (see compile), whose pipes then run one by one (see get_unfused_pipes).
+    @param bus_names List of bus names
+    @param skip_written If True, buses that already hold data are not computed again, so their writers are left out.
+    @return Set of pipe names.
+    '''
+    def get_upstream_pipes(self, bus_names: list, skip_written: bool = False) -> set:
+        self.get_plan()
+        pipes = set()
+        pending = list(bus_names)
+        while len(pending) > 0:
+            bus_name = pending.pop()
+            if bus_name not in self.buses:
+                raise Exception('PIPELINE FAULT on get_upstream_pipes call: bus ' + str(bus_name) + ' not found')
+
+            pipe_name = self.bus_writer.get(bus_name)
+            if pipe_name == None or pipe_name in pipes or (skip_written and not self.buses[bus_name].empty):
+                continue
+
+            pipes.add(pipe_name)
+            pending += self.pipe_reads[pipe_name]
+
+        return pipes
+
+    '''
+    @brief Get the pipes of a set that can not run as part of their fused chain, because the set holds only a part of
+    the chain (e.g. a bus inside the chain is requested, or the output of the chain already holds data).
+    They run one by one, without the compiled steps.
+    @param pipe_names Set of pipe names
+    @return Set of pipe names.
+    '''
+    def get_unfused_pipes(self, pipe_names: set) -> set:
+        unfused = set()
+        for pipe_name in pipe_names:
+            chain = self.compiled_chains.get(pipe_name)
+            if chain != None and not set(chain) <= pipe_names:
+                unfused.add(pipe_name)
+        return unfused
+
+    '''
+    @brief Process a merged pipe (see merge_common_pipes): its output buses get the data of the output buses of the pipe it is merged into.
+    @param pipe_name Name of the merged pipe
+    @param buses (optional) Bus set to use instead of the pipeline buses.
+    '''
+    def process_alias(self, pipe_name: str, buses: dict = None):
+        buses = buses if buses != None else self.buses
+        kept_buses = [buses[b] for b in self.pipe_outputs[self.pipe_aliases[pipe_name]]]
+        out_buses = [buses[b] for b in self.pipe_outputs[pipe_name]]
+        batched = any([bus.batched for bus in kept_buses])
+        self.pipes[pipe_name].send_outputs([bus.get_data() for bus in kept_buses], None, out_buses, batched)
+
+    '''
+    @brief Run the processing of the pipes, following the execution plan.
+
+    A compiled pipeline (see compile) runs its flat list of steps. Without a thread pool (see set_max_workers) the pipes run sequentially, level by level.
+    With a thread pool, every pipe is dispatched as soon as the pipes it depends on are done.
+    @param outputs (optional) List of the buses to compute. Only the pipes upstream of them run (see get_upstream_pipes),
+    and buses that already hold data are not computed again. Default: all the pipes run.
+    '''
+    def process(self, outputs: list = None):
+        plan = self.get_plan()
+        self.get_compiled_steps()
+        if self.incremental:
+            self.process_incremental(outputs)
+            return
+
+        pipe_names = self.get_upstream_pipes(outputs, skip_written=True) if outputs != None else None
+        unfused = self.get_unfused_pipes(pipe_names) if pipe_names != None else set()
+        run = LifetimeRun(self, self.buses, unfused) if self.early_release else None
+
+        if self.executor == None and self.compiled_sequence != None and run == None and pipe_names == None:
+            for step in self.compiled_sequence:
+                step()
+        elif self.executor == None:
+            for level in plan:
+                for pipe_name in level:
+                    if pipe_names == None or pipe_name in pipe_names:
+                        self.process_pipe(pipe_name, self.buses if pipe_name in unfused else None)
+                        if run != None:
+                            run.pipe_done(pipe_name)
+        else:
+            self.process_parallel(run, pipe_names)
+
+        if run != None:
+            self.memory_report = run.report()
+
+    '''
+    @brief Run only the stale pipes (see set_incremental), keeping the data of the other buses.
+    @param outputs (optional) List of the buses to compute. The stale pipes that are not upstream of them stay stale.
+    '''
+    def process_incremental(self, outputs: list = None):
+        stale = self.get_stale_pipes()
+        if outputs != None:
+            stale_left = stale - self.get_upstream_pipes(outputs)
+            #buses skipped by a fused chain are empty but not stale
+            stale = (stale - stale_left) | self.get_upstream_pipes(outputs, skip_written=True)
+        else:
+            stale_left = set()
+
+        #a stale part of a fused chain reads buses that the chain skipped, their writers run again
+        skipped = [bus_name for pipe_name in stale for bus_name in self.pipe_reads[pipe_name] if self.buses[bus_name].empty]
+        stale = stale | self.get_upstream_pipes(skipped, skip_written=True)
+
+        for pipe_name in stale:
+            for bus_name in self.pipe_outputs[pipe_name]:
+                self.buses[bus_name].reset()
+
+        unfused = self.get_unfused_pipes(stale)
+        if self.executor == None:
+            for level in self.plan:
+                for pipe_name in level:
+                    if pipe_name in stale:
+                        self.process_pipe(pipe_name, self.buses if pipe_name in unfused else None)
+        else:
+            self.process_parallel(pipe_names=stale)
+
+        self.dirty_pipes = stale_left
+
+    '''
+    @brief Run the pipes in the thread pool, joining only at dependency boundaries.
+    @param run (optional) LifetimeRun for early release of buses.
+    @param pipe_names (optional) Set of the pipes to run (default: all). Their dependencies outside the set must have run.
+    '''
+    def process_parallel(self, run: LifetimeRun = None, pipe_names: set = None):
+        unfused = self.get_unfused_pipes(pipe_names) if pipe_names != None else set()
+        pipe_names = pipe_names if pipe_names != None else set(self.pipes)
+        missing = {p: set(self.pipe_dependencies[p]) & pipe_names for p in pipe_names} #format: {'pipe_name': {'dependency_name', ...}, ...}
+        ready = [p for level in self.plan for p in level if p in pipe_names and len(missing[p]) == 0]
+        running = {} #format: {future: 'pipe_name', ...}
+
+        while len(ready) > 0 or len(running) > 0:
+            for pipe_name in ready:
+                running[self.executor.submit(self.process_pipe, pipe_name, self.buses if pipe_name in unfused else None)] = pipe_name
+            ready = []
+
+            done, not_done = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                pipe_name = running.pop(future)
+                if future.exception() != None:
+                    wait(running) #do not leave pipes running behind the fault
+                    raise future.exception()
+
+                if run != None:
+                    run.pipe_done(pipe_name)
+
+                for dependent in self.pipe_dependents[pipe_name]:
+                    if dependent in missing:
+                        missing[dependent].discard(pipe_name)
+                        if len(missing[dependent]) == 0:
+                            ready.append(dependent)
+
+    '''
+    @brief Put images into the input buses of the pipeline.
+    @param inputs Dictionary with {'bus_name': image, ...} relation, or a single image if the pipeline has only one input bus.
+    @param buses (optional) Bus set to use instead of the pipeline buses.
+    @param batched (optional) True if the images are batches (arrays with the batch dimension first, or lists of images with the same shape).
+    In incremental mode (see set_incremental), the images replace the ones in the pipeline buses, and the input buses not given keep their images.
+    '''
+    def set_inputs(self, inputs, buses: dict = None, batched: bool = False):
+        buses = buses if buses != None else self.buses
+        self.get_plan()
+
+        if not isinstance(inputs, dict):
+            if len(self.input_buses) != 1:
+                raise Exception('PIPELINE FAULT on set_inputs call: the pipeline has ' + str(len(self.input_buses)) + ' input buses, a dictionary is required')
+            inputs = {self.input_buses[0]: inputs}
+
+        for bus_name in inputs:
+            if bus_name not in self.input_buses:
+                raise Exception('PIPELINE FAULT on set_inputs call: ' + str(bus_name) + ' is not an input bus')
+
+            if self.incremental and buses is self.buses:
+                #a new image replaces the old one and only the pipes reading it become stale
+                buses[bus_name].reset()
+                self.dirty_pipes.update(self.bus_readers[bus_name])
+
+            if batched:
+                data = inputs[bus_name]
+                data = np.stack(data) if isinstance(data, (list, tuple)) and len(data) > 0 else np.asarray(data)
+                if data.ndim < 3 or data.shape[0] == 0:
+                    raise Exception('PIPELINE FAULT on set_inputs call: ' + str(bus_name) + ' does not receive a batch of images')
+                buses[bus_name].set_data(data, batched=True)
+            else:
+                buses[bus_name].set_data(inputs[bus_name])
+
+    '''
+    @brief Get the images from the output buses of the pipeline.
+    @param buses (optional) Bus set to use instead of the pipeline buses.
+    @return Dictionary with {'bus_name': image, ...} relation for each output bus.
+    '''
+    def get_outputs(self, buses: dict = None) -> dict:
+        buses = buses if buses != None else self.buses
+        self.get_plan()
+        return {bus_name: buses[bus_name].get_data() for bus_name in self.output_buses}
+
+    '''
+    @brief Get the image of a bus, running only the pipes needed to compute it (see process) if it is not computed yet,
+    or if it is stale in incremental mode (see set_incremental). The input buses must have been set.
+    @param bus_name Name of the bus
+    @return Image data of the bus.
+    '''
+    def get_output(self, bus_name: str):
+        if bus_name not in self.buses:
+            raise Exception('PIPELINE FAULT on get_output call: bus ' + str(bus_name) + ' not found')
+
+        if self.incremental or self.buses[bus_name].empty:
+            self.process(outputs=[bus_name])
+
+        return self.buses[bus_name].get_data()
+
+    '''
+    @brief Process one set of images: set the input buses, process, get the output buses and reset the buses.
+    @param inputs Dictionary with {'bus_name': image, ...} relation, or a single image if the pipeline has only one input bus.
+    @return Dictionary with {'bus_name': image, ...} relation for each output bus.
+    '''
+    def run(self, inputs) -> dict:
+        try:
+            self.set_inputs(inputs)
+            self.process()
+            return self.get_outputs()
+        finally:
+            self.reset_buses()
+
+    '''
+    @brief Process a batch of images in one pass: every bus carries the whole batch (N x H x W x C) and
+    every pipe is called once per batch. Small images that arrive in bursts should be processed this way.
+
+    Inputs that are not batched (e.g. one mask for all the images) can be set on the buses before the call.
+    Pipes that do not implement batch_callback process the batch image by image.
+    @param inputs Dictionary with {'bus_name': batch, ...} relation, or a single batch if the pipeline has only one input bus.
+    A batch is an array with the batch dimension first, or a list of images with the same shape.
+    @return Dictionary with {'bus_name': batch, ...} relation for each output bus.
+    '''
+    def run_batch(self, inputs) -> dict:
+        try:
+            self.set_inputs(inputs, batched=True)
+            self.process()
+            return self.get_outputs()
+        finally:
+            self.reset_buses()
+
+    '''
+    @brief Get the halo of the tiles for tiled processing: the context (in pixels, in every direction) that the
+    input tiles need so that the output tiles do not depend on the tile borders. The footprints of the pipes
+    (see Pipe.footprint) are summed along every path of the graph.
+    @return Halo in pixels.
+    '''
+    def get_halo(self) -> int:
+        plan = self.get_plan()
+        margins = {bus_name: 0 for bus_name in self.buses} #format: {'bus_name': context_needed_by_the_readers, ...}
+
+        for level in reversed(plan):
+            for pipe_name in level:
+                footprint = self.pipes[pipe_name].footprint()
+                if footprint == None:
+                    raise Exception('PIPELINE FAULT on get_halo call: ' + str(pipe_name) + ' can not be processed in tiles')
+
+                margin = max([margins[bus_name] for bus_name in self.pipe_outputs[pipe_name]]) + footprint
+                for bus_name in self.pipe_inputs[pipe_name]:
+                    margins[bus_name] = max(margins[bus_name], margin)
+
+        return max([margins[bus_name] for bus_name in self.input_buses] + [0])
+
+    '''
+    @brief Process large images tile by tile, so that the memory used by the buses depends on the tile size
+    instead of the image size.
+
+    Every tile is read from the inputs with a halo (see get_halo), processed on its own bus set and cropped into the
+    outputs. Tiles are independent, so they can run in parallel. The inputs can be memory-mapped files (np.memmap),
+    of which only the tiles are read, and the outputs can be given as memory-mapped files too. Outputs of buses
+    stored in files (see set_bus_file) are written into their files.
+    All the pipes must support tiling (see Pipe.footprint) and all the inputs must have the same height and width.
+    @param inputs Dictionary with {'bus_name': image, ...} relation, or a single image if the pipeline has only one input bus.
+    @param tile_size Height and width of the tiles: an int or an (height, width) tuple.
+    @param out (optional) Dictionary with {'bus_name': array, ...} relation, with arrays for the output images. Missing arrays are allocated.
+    @param workers (optional) Number of threads processing tiles. Default: one.
+    @return Dictionary with {'bus_name': image, ...} relation for each output bus.
+    '''
+    def process_tiled(self, inputs, tile_size, out: dict = None, workers: int = None) -> dict:
+        plan = self.get_plan()
+        halo = self.get_halo()
+
+        if not isinstance(inputs, dict):
+            if len(self.input_buses) != 1:
+                raise Exception('PIPELINE FAULT on process_tiled call: the pipeline has ' + str(len(self.input_buses)) + ' input buses, a dictionary is required')
+            inputs = {self.input_buses[0]: inputs}
+
+        sizes = set([tuple(inputs[bus_name].shape[:2]) for bus_name in inputs])
+        if len(sizes) != 1:
+            raise Exception('PIPELINE FAULT on process_tiled call: the input images must have the same height and width')
+        height, width = sizes.pop()
+        tile_height, tile_width = (tile_size, tile_size) if isinstance(tile_size, int) else tuple(tile_size)
+        if tile_height < 1 or tile_width < 1:
+            raise Exception('PIPELINE FAULT on process_tiled call: invalid tile size ' + str(tile_size))
+
+        out = dict(out) if out != None else {}
+        lock = threading.Lock()
+
+        def process_tile(y: int, x: int):
+            y0, y1 = max(0, y - halo), min(height, y + tile_height + halo)
+            x0, x1 = max(0, x - halo), min(width, x + tile_width + halo)
+            h, w = min(tile_height, height - y), min(tile_width, width - x)
+
+            buses = self.create_bus_set()
+            for bus in buses.values():
+                bus.file = None #the tiles are written into the whole image
+
+            try:
+                self.set_inputs({bus_name: inputs[bus_name][y0:y1, x0:x1] for bus_name in inputs}, buses)
+                for level in plan:
+                    for pipe_name in level:
+                        self.process_pipe(pipe_name, buses)
+
+                results = self.get_outputs(buses)
+                for bus_name in results:
+                    data = results[bus_name]
+                    if tuple(data.shape[:2]) != (y1 - y0, x1 - x0):
+                        raise Exception('PIPELINE FAULT on process_tiled call: ' + str(bus_name) + ' does not keep the size of the input images')
+
+                    with lock:
+                        if bus_name not in out:
+                            shape = (height, width) + data.shape[2:]
+                            out[bus_name] = self.buses[bus_name].clone().allocate(shape)
+                    out[bus_name][y:y+h, x:x+w] = data[y-y0:y-y0+h, x-x0:x-x0+w]
+            finally:
+                self.reset_bus_set(buses)
+
+        tiles = [(y, x) for y in range(0, height, tile_height) for x in range(0, width, tile_width)]
+        if workers == None or workers <= 1:
+            for y, x in tiles:
+                process_tile(y, x)
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ipp-tile') as executor:
+                futures = [executor.submit(process_tile, y, x) for y, x in tiles]
+                for future in futures:
+                    future.result()
+
+        for bus_name in out:
+            if isinstance(out[bus_name], np.memmap):
+                out[bus_name].flush()
+
+        return {bus_name: out[bus_name] for bus_name in self.output_buses}
+
+    '''
+    @brief Process one set of images without blocking the asyncio event loop.
+
+    Pipe callbacks run in an executor and every pipe is awaited only by the pipes that depend on it.
+    Each call uses its own bus set, so many calls can be in flight on the same pipeline.
+    @param inputs Dictionary with {'bus_name': image, ...} relation, or a single image if the pipeline has only one input bus.
+    @param executor (optional) Executor for the pipe callbacks. Default: the pipeline thread pool (see set_max_workers) or the event loop default executor.
+    @return Dictionary with {'bus_name': image, ...} relation for each output bus.
+    '''
+    async def process_async(self, inputs, executor = None) -> dict:
+        plan = self.get_plan()
+        loop = asyncio.get_running_loop()
+        executor = executor if executor != None else self.executor
+        buses = self.create_bus_set()
+        try:
+            self.set_inputs(inputs, buses)
+            run = LifetimeRun(self, buses, set(self.pipes)) if self.early_release else None
+            tasks = {} #format: {'pipe_name': task, ...}
+            running = [] #callbacks sent to the executor
+
+            async def process_pipe(pipe_name: str):
+                await asyncio.gather(*[tasks[d] for d in self.pipe_dependencies[pipe_name]])
+                future = loop.run_in_executor(executor, self.process_pipe, pipe_name, buses)
+                running.append(future)
+                await asyncio.shield(future) #a running callback can not be cancelled
+                if run != None:
+                    run.pipe_done(pipe_name)
+
+            #plan order guarantees that the tasks of the dependencies already exist
+            for level in plan:
+                for pipe_name in level:
+                    tasks[pipe_name] = asyncio.ensure_future(process_pipe(pipe_name))
+
+            try:
+                await asyncio.gather(*tasks.values())
+            except BaseException:
+                for task in tasks.values():
+                    task.cancel()
+                #the buses are reset only after the callbacks that still use them
+                if len(running) > 0:
+                    await asyncio.wait(running)
+                raise
+
+            return self.get_outputs(buses)
+        finally:
+            self.reset_bus_set(buses)
+
+    '''
+    @brief Process a stream of images with stage-level pipelining.
+
+    Each level of the execution plan is a stage running in its own thread, and every frame gets its
+    own bus set. While a stage processes frame N, the previous stage can already process frame N+1.
+    Stages are connected by bounded queues, so a slow stage holds back the feeding of new frames.
+    Results are yielded in the order of the frames.
+    @param frames Iterable of inputs (same format of the run method inputs).
+    @param queue_size Maximum number of frames waiting between two stages.
+    @return Generator of results (same format of the run method output).
+    '''
+    def stream(self, frames, queue_size: int = 2):
+        plan = list(self.get_plan())
+        queues = [queue.Queue(maxsize=queue_size) for i in range(len(plan) + 1)]
+        stop = threading.Event()
+        end = object() #end of stream mark
+
+        def put(q: queue.Queue, item) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(q: queue.Queue):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return end
+
+        def feed():
+            try:
+                for frame in frames:
+                    buses = self.create_bus_set()
+                    self.set_inputs(frame, buses)
+                    if not put(queues[0], buses):
+                        return
+            except Exception as e:
+                put(queues[0], e)
+                return
+            put(queues[0], end)
+
+        def stage(index: int):
+            while True:
+                item = get(queues[index])
+                if isinstance(item, dict):
+                    try:
+                        for pipe_name in plan[index]:
+                            self.process_pipe(pipe_name, item)
+                    except Exception as e:
+                        item = e
+                if not put(queues[index + 1], item) or not isinstance(item, dict):
+                    return
+
+        threads = [threading.Thread(target=feed, name='ipp-feed', daemon=True)]
+        threads += [threading.Thread(target=stage, args=(i,), name='ipp-stage' + str(i), daemon=True) for i in range(len(plan))]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = get(queues[-1])
+                if item is end:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                outputs = self.get_outputs(item)
+                self.reset_bus_set(item)
+                yield outputs
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    '''
+    @brief Process many images in worker processes.
+
+    Each worker receives a copy of the pipeline definition once, when it starts. Pixel data is shipped
+    between processes through multiprocessing.shared_memory blocks instead of being pickled.
+    @param images Iterable of inputs (same format of the run method inputs).
+    @param workers Number of worker processes (default: number of CPUs).
+    @param ordered If True, results are yielded in the order of the images. Otherwise, (index, result) tuples are yielded as they complete.
+    @return Generator of results (same format of the run method output).
+    '''
+    def map(self, images, workers: int = None, ordered: bool = True):
+        self.get_plan()
+        workers = workers if workers != None else os.cpu_count()
+        context = mp.get_context('fork') if 'fork' in mp.get_all_start_methods() else mp.get_context()
+        max_in_flight = 2 * workers
+
+        pending = {} #format: {future: (index, [input_shared_memory, ...]), ...}
+        finished = {} #format: {index: result, ...}
+        next_index = 0
+        images = enumerate(images)
+        exhausted = False
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=map_worker_init, initargs=(self,)) as pool:
+            try:
+                while not exhausted or len(pending) > 0:
+                    while not exhausted and len(pending) < max_in_flight:
+                        try:
+                            index, inputs = next(images)
+                        except StopIteration:
+                            exhausted = True
+                            break
+
+                        if not isinstance(inputs, dict):
+                            if len(self.input_buses) != 1:
+                                raise Exception('PIPELINE FAULT on map call: the pipeline has ' + str(len(self.input_buses)) + ' input buses, a dictionary is required')
+                            inputs = {self.input_buses[0]: inputs}
+
+                        blocks = []
+                        refs = {}
+                        for bus_name in inputs:
+                            block, refs[bus_name] = array_to_shared_memory(inputs[bus_name])
+                            blocks.append(block)
+
+                        pending[pool.submit(map_worker_process, refs)] = (index, blocks)
+
+                    done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index, blocks = pending.pop(future)
+                        for block in blocks:
+                            block.close()
+                            block.unlink()
+
+                        result = {bus_name: shared_memory_to_array(ref) for bus_name, ref in future.result().items()}
+                        if ordered:
+                            finished[index] = result
+                        else:
+                            yield (index, result)
+
+                    while next_index in finished:
+                        yield finished.pop(next_index)
+                        next_index += 1
+            finally:
+                for future in pending:
+                    future.cancel()
+                wait(pending)
+                for future in pending:
+                    for block in pending[future][1]:
+                        block.close()
+                        block.unlink()
+
+
+'''
+@brief Copy an image into a new shared memory block.
+@return (shared_memory, reference) where reference is a (block_name, shape, dtype_str) tuple.
+'''
+def array_to_shared_memory(data) -> tuple:
+    data = np.asarray(data)
+    block = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+    np.ndarray(data.shape, data.dtype, buffer=block.buf)[...] = data
+    return (block, (block.name, data.shape, data.dtype.str))
+
+'''
+@brief Copy an image out of a shared memory block created by another process, then release the block.
+@param ref (block_name, shape, dtype_str) tuple
+'''
+def shared_memory_to_array(ref: tuple):
+    name, shape, dtype = ref
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        data = np.array(np.ndarray(shape, np.dtype(dtype), buffer=block.buf))
+    finally:
+        block.close()
+        block.unlink()
+    return data
+
+#global pipeline of a Pipeline.map worker process
+worker_pipeline = None
+
+'''
+@brief Pipeline.map worker initializer.
+'''
+def map_worker_init(pipeline: Pipeline):
+    global worker_pipeline
+    pipeline.executor = None #threads are not inherited by the worker process
+    worker_pipeline = pipeline
+
+'''
+@brief Pipeline.map worker task: process the images referenced by refs and return references to the outputs.
+@param refs Dictionary with {'bus_name': (block_name, shape, dtype_str), ...} relation
+@return Dictionary with {'bus_name': (block_name, shape, dtype_str), ...} relation
+'''
+def map_worker_process(refs: dict) -> dict:
+    blocks = [shared_memory.SharedMemory(name=refs[bus_name][0]) for bus_name in refs]
+    inputs = {}
+    outputs = {}
+    try:
+        for bus_name, block in zip(refs, blocks):
+            name, shape, dtype = refs[bus_name]
+            inputs[bus_name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+
+        outputs = worker_pipeline.run(inputs)
+
+        out_refs = {}
+        for bus_name in outputs:
+            out_block, out_refs[bus_name] = array_to_shared_memory(outputs[bus_name])
+            out_block.close()
+    finally:
+        #the views must be dropped before the blocks are closed
+        inputs = None
+        outputs = None
+        for block in blocks:
+            block.close()
+
+    return out_refs
@@ -51,12 +51,16 @@ def get_classes():
     return x
 
 class AdditionPipe(pl.Pipe):
+    elementwise = True
+    pointwise = True
+    contiguous_input = True #cv.LUT runs on contiguous data only
+
     #constants
     my_params = {'value':int, 'clipping': bool}
     my_default_args = {'value':0, 'clipping': True}
     
     #static functions
-    clip = np.vectorize(lambda x: 255 if x > 255 else (0 if x < 0 else (x)))
+    clip = staticmethod(lambda x, out=None: np.clip(x, 0, 255, out=out))
     
     def __init__(self):
         self.value = 0
@@ -76,8 +80,27 @@ class AdditionPipe(pl.Pipe):
     def clipping_changed(self, old_value, new_value):
         self.clipping = new_value
 
-    def callback(self, input: list):
-        in_data = input[0].astype(np.float)
-        add_data = in_data + self.value
-        out_data = AdditionPipe.clip(add_data) if self.clipping == True else add_data
-        return [out_data]
\ No newline at end of file
+    def elementwise_step(self, data, side_inputs: list):
+        data += self.value
+        if self.clipping == True:
+            AdditionPipe.clip(data, out=data)
+        return data
+
+    def output_shapes(self, input: list) -> list:
+        return [input[0].shape]
+
+    def callback(self, input: list, out: list = None):
+        add_data = np.empty(input[0].shape, np.float32) if out == None else self.acquire_buffer(input[0].shape, np.float32)
+        np.add(input[0], self.value, out=add_data, dtype=np.float32)
+        if self.clipping == True:
+            AdditionPipe.clip(add_data, out=add_data)
+
+        if out == None:
+            return [add_data]
+
+        np.copyto(out[0], add_data, casting='unsafe')
+        self.release_buffer(add_data)
+        return out
+
+    def batch_callback(self, input: list, out: list = None):
+        return self.callback(input, out) #the callback does not depend on the image shape
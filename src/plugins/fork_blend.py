@@ -31,6 +31,7 @@ import sys
 sys.path.append('../')
 
 import numpy as np
+import cv2 as cv
 import pipeline as pl
 
 def get_info():
@@ -55,7 +56,7 @@ def get_classes():
 
 # ---- BASE FORK & BLEND PIPES ----
 '''
-@brief Copy input data to any outputs
+@brief Send the input data to any outputs (without copies)
 [format] => <fork> => [format]*number_of_outputs
 '''
 class BaseForkPipe(pl.Pipe):
@@ -79,18 +80,62 @@ class BaseForkPipe(pl.Pipe):
         self.set_out_formats( [self.bus_format] * new_arg )
         self.n_outs = new_arg
 
+    #All the outputs are the input buffer itself. Buses hold read-only views, so the buffer can not be changed
+    #through them, and pipes that change their input in place get their own copy (see Pipe.mutates_input).
     def callback(self, input: list):
-        in_data = input[0]
-        output = [np.copy(in_data) for x in [0]*self.n_outs]
-        return output
+        return [input[0]] * self.n_outs
+
+    def batch_callback(self, input: list):
+        return self.callback(input) #the callback does not depend on the image shape
+
+    def footprint(self):
+        return 0
+
+
+'''
+@brief Convert weights that sum 1 into integers that sum 2^bits (largest remainder rounding).
+@param weights List of normalized weights.
+@param bits Number of fractional bits.
+@return (integer weights, largest error of a uint8 result caused by the conversion)
+'''
+def quantize_weights(weights: list, bits: int) -> tuple:
+    scale = 1 << bits
+    scaled = [w * scale for w in weights]
+    int_weights = [int(np.floor(x)) for x in scaled]
+    remainders = sorted(range(len(scaled)), key=lambda i: scaled[i] - int_weights[i], reverse=True)
+    for i in remainders[:scale - sum(int_weights)]:
+        int_weights[i] += 1
+    error = 255 * sum([abs(int_weights[i] - scaled[i]) for i in range(len(scaled))]) / scale
+    return int_weights, error
+
+'''
+@brief Check if cv.addWeighted can take the array directly.
+'''
+def cv_compatible(data: np.ndarray) -> bool:
+    return data.ndim <= 3 and data.dtype in (np.uint8, np.uint16, np.float32)
+
+'''
+@brief Split images into strips of rows, of about pl.fusion_strip_bytes of float32 data each.
+@param shape Shape of the image, or of the batch
+@param batched True if the shape has a leading batch dimension.
+@return List with the index of each strip.
+'''
+def row_strips(shape: tuple, batched: bool) -> list:
+    images = [(n,) for n in range(shape[0])] if batched else [()]
+    image_shape = shape[1:] if batched else shape
+    rows = max(1, pl.fusion_strip_bytes // (4 * max(1, int(np.prod(image_shape[1:])))))
+    return [image + (slice(r, r + rows),) for image in images for r in range(0, image_shape[0], rows)]
 
 '''
 @brief Outputs a weighted sum of the input images
 [format]*number_of_inputs => <blend> => [format]
+The weights are normalized once, when they are changed. The sum is accumulated row strip by row strip, in float32,
+or, with the fixed_point param and uint8 inputs, in uint16/uint32 with integer weights.
 '''
 class BaseBlendPipe(pl.Pipe):
-    my_params = {'number_of_inputs':int, 'weights':list}
-    my_default_args = {'number_of_inputs':2, 'weights':[1,1]}
+    contiguous_input = True #cv.addWeighted copies strided inputs
+    my_params = {'number_of_inputs':int, 'weights':list, 'fixed_point':bool}
+    my_default_args = {'number_of_inputs':2, 'weights':[1,1], 'fixed_point':False}
 
     def __init__(self, bus_format: pl.BusFormat):
         self.n_ins = 2
@@ -104,22 +149,122 @@ class BaseBlendPipe(pl.Pipe):
             self.arguments[p] = BaseBlendPipe.my_default_args[p]
 
         self.param_changed_callback('number_of_inputs', BaseBlendPipe.n_ins_changed)
+        self.param_changed_callback('weights', BaseBlendPipe.weights_changed)
+        self.weights_changed(None, self.arguments['weights'])
 
     def n_ins_changed(self, old_arg: int, new_arg: int):
         self.set_in_formats( [self.bus_format] * new_arg )
         self.n_ins = new_arg
 
-    def callback(self, input: list):
-        weights = self.get_param('weights')
-        weights = [float(w) for w in weights] #convert weights to float
+    def weights_changed(self, old_arg: list, new_arg: list):
+        weights = [float(w) for w in new_arg] #convert weights to float
         w_sum = sum(weights)
-        normalized_weights = [w/w_sum for w in weights]
+        self.normalized_weights = [w/w_sum for w in weights]
+        self.fixed_weights = None #format: (accumulator dtype, bits, [int weight, ...])
+
+        if min(self.normalized_weights) >= 0:
+            #with 8 fractional bits the sum fits in uint16 (255 * 256 < 2^16), if they are precise enough
+            int_weights, error = quantize_weights(self.normalized_weights, 8)
+            if error <= 0.5:
+                self.fixed_weights = (np.uint16, 8, int_weights)
+            else:
+                self.fixed_weights = (np.uint32, 16, quantize_weights(self.normalized_weights, 16)[0])
+
+    def output_shapes(self, input: list) -> list:
+        return [input[0].shape]
+
+    '''
+    @brief Weighted sum in integer arithmetic, one row strip at a time: the result is rounded to the nearest integer.
+    @param input List of uint8 input images (or batches).
+    @param out_data Array for the result.
+    @param batched True if the inputs are batches of images.
+    '''
+    def fixed_point_blend(self, input: list, out_data: np.ndarray, batched: bool):
+        acc_dtype, bits, int_weights = self.fixed_weights
+        strips = row_strips(out_data.shape, batched)
+        if len(strips) == 0:
+            return
+
+        acc_strip = self.acquire_buffer(out_data[strips[0]].shape, acc_dtype)
+        product_strip = self.acquire_buffer(out_data[strips[0]].shape, acc_dtype)
+        for index in strips:
+            target = out_data[index]
+            acc = acc_strip[:target.shape[0]]
+            product = product_strip[:target.shape[0]]
+            np.multiply(input[0][index], int_weights[0], out=acc, dtype=acc_dtype)
+            for i in range(1, len(input)):
+                np.multiply(input[i][index], int_weights[i], out=product, dtype=acc_dtype)
+                acc += product
+            acc += 1 << (bits - 1)
+            acc >>= bits
+            np.copyto(target, acc, casting='unsafe')
+        self.release_buffer(acc_strip)
+        self.release_buffer(product_strip)
+
+    '''
+    @brief Weighted sum in float32, one row strip at a time: each input is read once and the float32 accumulator
+    of the strip stays in the cache. The strip is accumulated in out_data itself if it is a packed float32 array (see pl.packed).
+    @param input List of input images (or batches).
+    @param out_data Array for the result (cast unsafely to its dtype).
+    @param batched True if the inputs are batches of images.
+    '''
+    def float_blend(self, input: list, out_data: np.ndarray, batched: bool):
+        weights = self.normalized_weights
+        strips = row_strips(out_data.shape, batched)
+        if len(strips) == 0:
+            return
+
+        use_cv = all([cv_compatible(data[strips[0]]) for data in input])
+        in_place = out_data.dtype == np.float32 and pl.packed(out_data)
+        acc_strip = None if in_place else self.acquire_buffer(out_data[strips[0]].shape, np.float32)
+        product_strip = None if use_cv else self.acquire_buffer(out_data[strips[0]].shape, np.float32)
+        for index in strips:
+            target = out_data[index]
+            acc = target if in_place else acc_strip[:target.shape[0]]
+            if use_cv and len(input) == 2:
+                cv.addWeighted(input[0][index], weights[0], input[1][index], weights[1], 0.0, dst=acc, dtype=cv.CV_32F)
+            else:
+                np.multiply(input[0][index], weights[0], out=acc, dtype=np.float32)
+                for i in range(1, len(input)):
+                    if use_cv:
+                        cv.addWeighted(acc, 1.0, input[i][index], weights[i], 0.0, dst=acc, dtype=cv.CV_32F)
+                    else:
+                        #dtypes that OpenCV does not take
+                        product = product_strip[:target.shape[0]]
+                        np.multiply(input[i][index], weights[i], out=product, dtype=np.float32)
+                        acc += product
+
+            if not in_place:
+                np.copyto(target, acc, casting='unsafe')
+
+        if acc_strip is not None:
+            self.release_buffer(acc_strip)
+        if product_strip is not None:
+            self.release_buffer(product_strip)
+
+    '''
+    @brief Blend the inputs into the output array, or into a new array (float32, or uint8 in fixed point).
+    '''
+    def blend(self, input: list, out: list, batched: bool) -> list:
+        fixed_point = self.get_param('fixed_point') and self.fixed_weights != None and all([data.dtype == np.uint8 for data in input])
+        if out == None:
+            out = [np.empty(input[0].shape, np.uint8 if fixed_point else np.float32)]
+
+        if fixed_point:
+            self.fixed_point_blend(input, out[0], batched)
+        else:
+            self.float_blend(input, out[0], batched)
+        return out
+
+    def callback(self, input: list, out: list = None):
+        return self.blend(input, out, False)
+
+    def batch_callback(self, input: list, out: list = None):
+        return self.blend(input, out, True)
 
-        out_data = np.zeros(input[0].shape)
-        for i in range(len(input)):
-            out_data += input[i] * normalized_weights[i]
+    def footprint(self):
+        return 0
 
-        return [out_data]
 
 
 # ---- SUB FORK & BLEND PIPES ----
@@ -30,6 +30,7 @@
 import sys
 sys.path.append('../')
 
+import hashlib
 import numpy as np
 import cv2 as cv
 import pipeline as pl
@@ -54,8 +55,14 @@ def get_classes():
 
 
 class BaseHadamardPipe(pl.Pipe):
-    my_params = {'normalize_mask': bool, 'uniform_normalization': bool, 'clipping': bool}
-    my_default_args = {'normalize_mask': True, 'uniform_normalization': True, 'clipping': False}
+    elementwise = True #elementwise on the image, the mask is a side input
+    contiguous_input = True #cv.resize copies strided masks
+    mask_cache_bytes = 256 * 2**20 #default byte budget of the prepared masks cache
+
+    interpolations = {'nearest': cv.INTER_NEAREST, 'linear': cv.INTER_LINEAR, 'area': cv.INTER_AREA, 'cubic': cv.INTER_CUBIC, 'lanczos': cv.INTER_LANCZOS4}
+
+    my_params = {'normalize_mask': bool, 'uniform_normalization': bool, 'clipping': bool, 'interpolation': str}
+    my_default_args = {'normalize_mask': True, 'uniform_normalization': True, 'clipping': False, 'interpolation': 'linear'}
     
     def __init__(self, format: pl.BusFormat):
         self.format = format
@@ -68,11 +75,15 @@ class BaseHadamardPipe(pl.Pipe):
 
         self.norm_mask = True
         self.unfrm_norm = True
-        self.clip = np.vectorize(lambda x : x)
+        self.clipping = False
+        self.interpolation = cv.INTER_LINEAR
+        self.mask_cache = pl.ResultCache(BaseHadamardPipe.mask_cache_bytes) #resized and normalized masks
+        self.last_mask = None #format: (mask, base array of the mask, signature, cache key)
 
         self.param_changed_callback('normalize_mask', BaseHadamardPipe.norm_mask_changed)
         self.param_changed_callback('clipping', BaseHadamardPipe.clipping_changed)
         self.param_changed_callback('uniform_normalization', BaseHadamardPipe.unfrm_norm_changed)
+        self.param_changed_callback('interpolation', BaseHadamardPipe.interpolation_changed)
 
     def norm_mask_changed(self, old_arg, new_arg):
         self.norm_mask = new_arg
@@ -81,14 +92,70 @@ class BaseHadamardPipe(pl.Pipe):
         self.unfrm_norm = new_arg
 
     def clipping_changed(self, old_arg, new_arg):
-        if new_arg == True:
-            self.clip = np.vectorize(lambda x : 255 if x > 255 else (0 if x < 0 else (x)))
-        else:
-            self.clip = np.vectorize(lambda x : x)
-
-    def callback(self, input: list) -> list:
-        in_img, mask = (input[0].astype(np.float), input[1])
-        mask = cv.resize(mask, (in_img.shape[1], in_img.shape[0]) ).astype(np.float)
+        self.clipping = new_arg
+
+    def interpolation_changed(self, old_arg, new_arg):
+        if new_arg not in BaseHadamardPipe.interpolations:
+            self.arguments['interpolation'] = old_arg
+            self.raise_fault('Invalid interpolation ' + str(new_arg) + '. Use one of ' + str(list(BaseHadamardPipe.interpolations)))
+        self.interpolation = BaseHadamardPipe.interpolations[new_arg]
+
+    '''
+    @brief Set the byte budget of the prepared masks cache. The masks kept so far are dropped.
+    '''
+    def set_mask_cache_size(self, max_bytes: int):
+        self.mask_cache = pl.ResultCache(max_bytes)
+        self.last_mask = None
+
+    #the last mask is not shipped to worker processes, the cache is emptied anyway (see ResultCache)
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['last_mask'] = None
+        return state
+
+    '''
+    @brief Get the counters of the prepared masks cache (see ResultCache.stats).
+    '''
+    def get_mask_cache_stats(self) -> dict:
+        return self.mask_cache.stats()
+
+    '''
+    @brief Get the mask resized to the image shape and normalized, from the cache when the same mask was prepared before
+    for the same shape and arguments.
+    The mask is hashed only when it changes: the same bus array as in the last call, or a view of the same read-only
+    array (e.g. a mask set with flags.writeable = False), is taken as unchanged.
+    @return Read-only float32 array.
+    '''
+    def prepare_mask(self, mask, shape: tuple):
+        base = pl.base_array(mask)
+        signature = (mask.__array_interface__['data'][0], mask.shape, mask.strides, mask.dtype.str, tuple(shape[:2]), self.norm_mask, self.unfrm_norm, self.interpolation)
+        last = self.last_mask
+        if last != None and last[2] == signature and (mask is last[0] or (base is last[1] and not base.flags.writeable)):
+            prepared = self.mask_cache.get(last[3])
+            if prepared != None:
+                return prepared[0]
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((mask.shape, mask.dtype.str, tuple(shape[:2]), self.norm_mask, self.unfrm_norm, self.interpolation)).encode())
+        digest.update(np.ascontiguousarray(mask).data)
+        key = digest.digest()
+        self.last_mask = (mask, base, signature, key)
+
+        prepared = self.mask_cache.get(key)
+        if prepared != None:
+            return prepared[0]
+
+        prepared = self.resize_mask(mask, shape)
+        self.mask_cache.put(key, [prepared])
+        prepared.flags.writeable = False
+        return prepared
+
+    '''
+    @brief Resize the mask to the image shape and normalize it.
+    '''
+    def resize_mask(self, mask, shape: tuple):
+        mask = mask.astype(np.float32) if mask.dtype == np.float16 else mask #cv.resize does not support float16
+        mask = cv.resize(mask, (shape[1], shape[0]), interpolation=self.interpolation).astype(np.float32)
         
         if self.norm_mask == True:
             if self.format in pl.bus_compatibility[pl.BusFormat.Triple]: #triple channel image
@@ -100,8 +167,64 @@ class BaseHadamardPipe(pl.Pipe):
             else: #simple channel image
                 mask = mask / np.max(mask)
 
-        out_data = self.clip(in_img * mask)
-        return [out_data]
+        return mask
+
+    def elementwise_step(self, data, side_inputs: list):
+        return self.strip_step(data, self.strip_side_inputs(side_inputs, data.shape))
+
+    #the mask is prepared for the whole image, then cut in the strips of the image
+    def strip_side_inputs(self, side_inputs: list, shape: tuple) -> list:
+        return [self.prepare_mask(side_inputs[0], shape)]
+
+    def strip_step(self, data, side_strips: list):
+        data *= side_strips[0]
+        if self.clipping == True:
+            np.clip(data, 0, 255, out=data)
+        return data
+
+    def output_shapes(self, input: list) -> list:
+        return [input[0].shape]
+
+    '''
+    @brief Without normalization, an output pixel depends only on the same pixel of the image and of the mask (for tiled
+    processing, the mask must have the size of the image). With normalization, it depends on the whole mask.
+    '''
+    def footprint(self):
+        return None if self.norm_mask == True else 0
+
+    def callback(self, input: list, out: list = None) -> list:
+        in_img = input[0]
+        mask = self.prepare_mask(input[1], in_img.shape)
+
+        mul_data = np.empty(in_img.shape, np.float32) if out == None else self.acquire_buffer(in_img.shape, np.float32)
+        np.multiply(in_img, mask, out=mul_data, dtype=np.float32)
+        return self.send_product(mul_data, out)
+
+    def batch_callback(self, input: list, out: list = None) -> list:
+        in_img, mask = input
+        shape = in_img.shape[1:]
+
+        mul_data = np.empty(in_img.shape, np.float32) if out == None else self.acquire_buffer(in_img.shape, np.float32)
+        if mask.strides[0] == 0: #the same mask for the whole batch (broadcast by the pipeline)
+            np.multiply(in_img, self.prepare_mask(mask[0], shape), out=mul_data, dtype=np.float32)
+        else: #masks are resized and normalized image by image
+            for n in range(in_img.shape[0]):
+                np.multiply(in_img[n], self.prepare_mask(mask[n], shape), out=mul_data[n], dtype=np.float32)
+        return self.send_product(mul_data, out)
+
+    '''
+    @brief Clip the product (if clipping is on) and write it into the output array.
+    '''
+    def send_product(self, mul_data, out: list) -> list:
+        if self.clipping == True:
+            np.clip(mul_data, 0, 255, out=mul_data)
+
+        if out == None:
+            return [mul_data]
+
+        np.copyto(out[0], mul_data, casting='unsafe')
+        self.release_buffer(mul_data)
+        return out
 
 class ChannelHadamardPipe(BaseHadamardPipe):
     def __init__(self):
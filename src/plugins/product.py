@@ -51,12 +51,16 @@ def get_classes():
     return x
 
 class ProductPipe(pl.Pipe):
+    elementwise = True
+    pointwise = True
+    contiguous_input = True #cv.LUT runs on contiguous data only
+
     #constants
     my_params = {'value':float, 'offset':float,'clipping': bool}
     my_default_args = {'value':0, 'offset':127, 'clipping': True}
     
     #static functions
-    clip = np.vectorize(lambda x: 255 if x > 255 else (0 if x < 0 else (x)))
+    clip = staticmethod(lambda x, out=None: np.clip(x, 0, 255, out=out))
     
     def __init__(self):
         self.value = 0
@@ -81,8 +85,31 @@ class ProductPipe(pl.Pipe):
     def offset_changed(self, old_value, new_value):
         self.offset = new_value
 
-    def callback(self, input: list):
-        in_data = input[0].astype(np.float)
-        mul_data = ((in_data - self.offset) * self.value) + self.offset
-        out_data = ProductPipe.clip(mul_data) if self.clipping == True else mul_data
-        return [out_data]
\ No newline at end of file
+    def elementwise_step(self, data, side_inputs: list):
+        data -= self.offset
+        data *= self.value
+        data += self.offset
+        if self.clipping == True:
+            ProductPipe.clip(data, out=data)
+        return data
+
+    def output_shapes(self, input: list) -> list:
+        return [input[0].shape]
+
+    def callback(self, input: list, out: list = None):
+        mul_data = np.empty(input[0].shape, np.float32) if out == None else self.acquire_buffer(input[0].shape, np.float32)
+        np.subtract(input[0], self.offset, out=mul_data, dtype=np.float32)
+        mul_data *= self.value
+        mul_data += self.offset
+        if self.clipping == True:
+            ProductPipe.clip(mul_data, out=mul_data)
+
+        if out == None:
+            return [mul_data]
+
+        np.copyto(out[0], mul_data, casting='unsafe')
+        self.release_buffer(mul_data)
+        return out
+
+    def batch_callback(self, input: list, out: list = None):
+        return self.callback(input, out) #the callback does not depend on the image shape
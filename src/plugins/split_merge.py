@@ -31,6 +31,7 @@ import sys
 sys.path.append('../')
 
 import numpy as np
+import cv2 as cv
 import pipeline as pl
 
 def get_info():
@@ -53,10 +54,12 @@ def get_classes():
 
 '''
 @brief Splits the 3 channels of the input image for 3 single channel buses.
+The channels are views of the input (without copies). The pipe prefers planar input, where they are contiguous (see Pipeline.set_layout_negotiation).
 
 [Triple] => <Split> => [Channel, Channel, Channel]
 '''
 class SplitPipe(pl.Pipe):
+    input_layout = pl.BusLayout.Planar #the channels of planar images are contiguous
     my_params = {}
     my_default_args = {}
 
@@ -67,10 +70,17 @@ class SplitPipe(pl.Pipe):
 
     def callback(self, input: list) -> list:
         data = input[0]
-        return [data[:,:,0],data[:,:,1],data[:,:,2]]
+        return [data[...,0],data[...,1],data[...,2]]
+
+    def batch_callback(self, input: list) -> list:
+        return self.callback(input) #the channels are the last dimension of batches too
+
+    def footprint(self):
+        return 0
 
 '''
 @brief Merge the 3 input buses for the output triple bus.
+The channels are written in one cv.merge call, or plane by plane if the output bus is planar (see Pipeline.set_bus_layout).
 
 [Channel, Channel, Channel] => <Merge> => [Triple]
 '''
@@ -83,15 +93,33 @@ class MergePipe(pl.Pipe):
         out_formats = [pl.BusFormat.Triple]
         super(MergePipe, self).__init__(in_formats, out_formats)
 
-    def callback(self, input: list) -> list:
+    def output_shapes(self, input: list) -> list:
+        return [(input[0].shape[0], input[0].shape[1], 3)]
+
+    def callback(self, input: list, out: list = None) -> list:
         in_data0, in_data1, in_data2 = input
         
-        shape = [in_data0.shape[0],in_data0.shape[1],1] #[W,H,Channels]
-        shape[2] = 3 # 3 Channels
-        output_data = np.zeros(shape, np.uint8)
+        if out == None:
+            shape = [in_data0.shape[0],in_data0.shape[1],1] #[W,H,Channels]
+            shape[2] = 3 # 3 Channels
+            output_data = np.empty(shape, np.result_type(in_data0, in_data1, in_data2))
+        else:
+            output_data = out[0]
 
-        output_data[:,:,0] = in_data0
-        output_data[:,:,1] = in_data1
-        output_data[:,:,2] = in_data2
+        if output_data.ndim == 3 and pl.packed(output_data) and output_data.dtype in pl.cv_dtypes and all([data.dtype == output_data.dtype and data.shape == output_data.shape[:2] for data in input]):
+            cv.merge(input, dst=output_data)
+        else: #planar output, batches and mixed data types
+            output_data[...,0] = in_data0
+            output_data[...,1] = in_data1
+            output_data[...,2] = in_data2
 
         return [output_data]
+
+    def batch_callback(self, input: list, out: list = None) -> list:
+        if out == None:
+            out = [np.empty(input[0].shape[:3] + (3,), np.result_type(*input))] #[N,H,W,Channels]
+
+        return self.callback(input, out)
+
+    def footprint(self):
+        return 0
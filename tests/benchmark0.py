@@ -0,0 +1,60 @@
+'''
+BENCHMARK SCRIPT FOR FUSION OF ELEMENTWISE PIPES (4K FRAMES)
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import addition as add
+import product as prod
+import hadamard as hd
+import numpy as np
+import time
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+for bus_name in ('input', 'mask', 'added', 'multiplied', 'output'):
+    my_pipeline.create_bus(bus_name, pl.BusFormat.Triple)
+
+#pipes
+my_add = add.AdditionPipe()
+my_add.set_param('value', 20)
+my_prod = prod.ProductPipe()
+my_prod.set_param('value', 1.1)
+my_had = hd.TripleHadamardPipe()
+
+#build
+my_pipeline.insert_pipe('my_add', my_add, ['input'], ['added'])
+my_pipeline.insert_pipe('my_prod', my_prod, ['added'], ['multiplied'])
+my_pipeline.insert_pipe('my_had', my_had, ['multiplied', 'mask'], ['output'])
+
+'''
+@brief Average processing time of a frame, in seconds.
+'''
+def measure(inputs: dict, repetitions: int) -> float:
+    my_pipeline.run(inputs) #warm-up
+    t0 = time.perf_counter()
+    for n in range(repetitions):
+        my_pipeline.run(inputs)
+    return (time.perf_counter() - t0) / repetitions
+
+if __name__ == '__main__':
+    inputs = {
+        'input': np.array(np.random.rand(2160, 3840, 3)*255, np.uint8),
+        'mask': np.array(np.random.rand(2160, 3840, 3)*255, np.uint8)
+    }
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    my_pipeline.compile(fuse=False)
+    unfused = measure(inputs, repetitions)
+    my_pipeline.compile(fuse=True)
+    fused = measure(inputs, repetitions)
+
+    print('unfused: ' + str(round(unfused * 1000, 1)) + ' ms/frame')
+    print('fused:   ' + str(round(fused * 1000, 1)) + ' ms/frame')
+    print('speedup: ' + str(round(unfused / fused, 2)) + 'x')
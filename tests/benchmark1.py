@@ -0,0 +1,59 @@
+'''
+BENCHMARK SCRIPT FOR CLIPPING IN THE ARITHMETIC PIPES (COST PER MEGAPIXEL)
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import addition as add
+import product as prod
+import hadamard as hd
+import numpy as np
+import time
+
+#previous implementation of the clipping (a Python call per pixel)
+vectorized_clip = np.vectorize(lambda x: 255 if x > 255 else (0 if x < 0 else (x)))
+
+'''
+@brief Average time of f(), in seconds.
+'''
+def measure(f, repetitions: int) -> float:
+    t0 = time.perf_counter()
+    for n in range(repetitions):
+        f()
+    return (time.perf_counter() - t0) / repetitions
+
+if __name__ == '__main__':
+    height, width = (1000, 1000)
+    megapixels = height * width / 1e6
+    in_data = np.array(np.random.rand(height, width, 3)*255, np.uint8)
+    mask = np.array(np.random.rand(height, width, 3)*255, np.uint8)
+
+    my_add = add.AdditionPipe()
+    my_add.set_param('value', 30)
+    my_prod = prod.ProductPipe()
+    my_prod.set_param('value', 1.5)
+    my_had = hd.TripleHadamardPipe()
+    my_had.set_param('clipping', True)
+
+    results = [
+        ('addition (before)', measure(lambda: vectorized_clip(in_data.astype(np.float64) + 30), 1)),
+        ('addition (after, float path)', measure(lambda: my_add.callback([in_data]), 20)),
+        ('product (before)', measure(lambda: vectorized_clip((in_data.astype(np.float64) - 127) * 1.5 + 127), 1)),
+        ('product (after, float path)', measure(lambda: my_prod.callback([in_data]), 20)),
+        ('hadamard (before)', measure(lambda: vectorized_clip(in_data.astype(np.float64) * my_had.prepare_mask(mask, in_data.shape)), 1)),
+        ('hadamard (after)', measure(lambda: my_had.callback([in_data, mask]), 20)),
+    ]
+
+    #uint8 pipeline path (lookup table, see Pipe.get_lut)
+    my_pipeline = pl.Pipeline()
+    my_pipeline.create_bus('input', pl.BusFormat.Triple)
+    my_pipeline.create_bus('output', pl.BusFormat.Triple)
+    my_pipeline.insert_pipe('my_add', my_add, ['input'], ['output'])
+    results.append(('addition (after, uint8 pipeline)', measure(lambda: my_pipeline.run(in_data), 20)))
+
+    for name, seconds in results:
+        print(name + ': ' + str(round(seconds * 1000 / megapixels, 2)) + ' ms/MP')
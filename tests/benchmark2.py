@@ -0,0 +1,50 @@
+'''
+BENCHMARK SCRIPT FOR FORK PIPES (COST BY NUMBER OF OUTPUTS)
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import fork_blend as fb
+import numpy as np
+import time
+
+'''
+@brief Previous implementation of the fork: one copy of the input per output.
+'''
+class CopyForkPipe(fb.TripleForkPipe):
+    def callback(self, input: list):
+        return [np.copy(input[0]) for x in [0]*self.n_outs]
+
+'''
+@brief Average time of f(), in seconds.
+'''
+def measure(f, repetitions: int) -> float:
+    t0 = time.perf_counter()
+    for n in range(repetitions):
+        f()
+    return (time.perf_counter() - t0) / repetitions
+
+'''
+@brief Pipeline with a single fork of n_outs outputs.
+'''
+def fork_pipeline(fork: pl.Pipe, n_outs: int) -> pl.Pipeline:
+    fork.set_param('number_of_outputs', n_outs)
+    pipeline = pl.Pipeline()
+    pipeline.create_bus('input', pl.BusFormat.Triple)
+    for n in range(n_outs):
+        pipeline.create_bus('f' + str(n), pl.BusFormat.Triple)
+    pipeline.insert_pipe('my_fork', fork, ['input'], ['f' + str(n) for n in range(n_outs)])
+    return pipeline
+
+if __name__ == '__main__':
+    height, width = (4000, 3000)
+    in_data = np.array(np.random.rand(height, width, 3)*255, np.uint8)
+
+    for n_outs in (2, 4, 8):
+        before = measure(lambda: fork_pipeline(CopyForkPipe(), n_outs).run(in_data), 3)
+        after = measure(lambda: fork_pipeline(fb.TripleForkPipe(), n_outs).run(in_data), 3)
+        print(str(n_outs) + ' outputs: ' + str(round(before * 1000, 2)) + ' ms (before), ' + str(round(after * 1000, 2)) + ' ms (after)')
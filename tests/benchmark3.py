@@ -0,0 +1,61 @@
+'''
+BENCHMARK SCRIPT FOR BLEND PIPES (16 INPUTS)
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import fork_blend as fb
+import numpy as np
+import time
+
+'''
+@brief Previous implementation of the blend: weights normalized on every call, one multiply and one add per input.
+'''
+class LoopBlendPipe(fb.TripleBlendPipe):
+    def callback(self, input: list, out: list = None):
+        weights = [float(w) for w in self.get_param('weights')]
+        w_sum = sum(weights)
+        normalized_weights = [w/w_sum for w in weights]
+        out_data = np.zeros(input[0].shape, np.float32)
+        product = np.empty(input[0].shape, np.float32)
+        for i in range(len(input)):
+            np.multiply(input[i], normalized_weights[i], out=product, dtype=np.float32)
+            out_data += product
+        return [out_data]
+
+'''
+@brief Average time of f(), in seconds.
+'''
+def measure(f, repetitions: int) -> float:
+    t0 = time.perf_counter()
+    for n in range(repetitions):
+        f()
+    return (time.perf_counter() - t0) / repetitions
+
+'''
+@brief Pipeline with a single blend of n_ins inputs.
+'''
+def blend_pipeline(blend: pl.Pipe, n_ins: int) -> pl.Pipeline:
+    blend.set_param('number_of_inputs', n_ins)
+    blend.set_param('weights', [1] * n_ins)
+    pipeline = pl.Pipeline()
+    for n in range(n_ins):
+        pipeline.create_bus('in' + str(n), pl.BusFormat.Triple)
+    pipeline.create_bus('output', pl.BusFormat.Triple)
+    pipeline.insert_pipe('my_blend', blend, ['in' + str(n) for n in range(n_ins)], ['output'])
+    return pipeline
+
+if __name__ == '__main__':
+    height, width = (2000, 3000)
+
+    for n_ins in (2, 16):
+        in_data = dict([('in' + str(n), np.array(np.random.rand(height, width, 3)*255, np.uint8)) for n in range(n_ins)])
+        fixed = fb.TripleBlendPipe()
+        fixed.set_param('fixed_point', True)
+        pipelines = [('before', blend_pipeline(LoopBlendPipe(), n_ins)), ('float32', blend_pipeline(fb.TripleBlendPipe(), n_ins)), ('fixed point', blend_pipeline(fixed, n_ins))]
+        results = [name + ' ' + str(round(measure(lambda: pipeline.run(in_data), 3) * 1000, 2)) + ' ms' for name, pipeline in pipelines]
+        print(str(n_ins) + ' inputs: ' + ', '.join(results))
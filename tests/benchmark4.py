@@ -0,0 +1,58 @@
+'''
+BENCHMARK SCRIPT FOR PER-CHANNEL GRAPHS (INTERLEAVED, PLANAR AND NEGOTIATED BUS LAYOUTS)
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import addition as add
+import numpy as np
+import time
+
+'''
+@brief Average time of f(), in seconds.
+'''
+def measure(f, repetitions: int) -> float:
+    t0 = time.perf_counter()
+    for n in range(repetitions):
+        f()
+    return (time.perf_counter() - t0) / repetitions
+
+'''
+@brief Split, one addition per channel, merge.
+'''
+def channel_pipeline(layout: pl.BusLayout, negotiation: bool) -> pl.Pipeline:
+    pipeline = pl.Pipeline()
+    pipeline.create_bus('input', pl.BusFormat.Triple)
+    pipeline.create_bus('output', pl.BusFormat.Triple)
+    for c in ('c0', 'c1', 'c2'):
+        pipeline.create_bus(c, pl.BusFormat.Channel)
+        pipeline.create_bus(c + '_add', pl.BusFormat.Channel)
+
+    pipeline.insert_pipe('my_split', sm.SplitPipe(), ['input'], ['c0','c1','c2'])
+    for c in ('c0', 'c1', 'c2'):
+        my_add = add.AdditionPipe()
+        my_add.set_param('value', 10)
+        pipeline.insert_pipe('my_add_' + c, my_add, [c], [c + '_add'])
+    pipeline.insert_pipe('my_merge', sm.MergePipe(), ['c0_add','c1_add','c2_add'], ['output'])
+
+    pipeline.set_bus_layout('input', layout)
+    pipeline.set_bus_layout('output', layout)
+    pipeline.set_layout_negotiation(negotiation)
+    pipeline.set_buffer_pool(True)
+    return pipeline
+
+if __name__ == '__main__':
+    height, width = (4000, 3000)
+    in_data = np.array(np.random.rand(height, width, 3)*255, np.uint8)
+
+    for name, layout, negotiation in (('interleaved', None, False), ('planar', pl.BusLayout.Planar, False), ('negotiated', None, True)):
+        pipeline = channel_pipeline(layout, negotiation)
+        pipeline.run(in_data)
+        report = pipeline.get_layout_report()
+        result = str(round(measure(lambda: pipeline.run(in_data), 5) * 1000, 2)) + ' ms'
+        print(name + ': ' + result + ' (' + str(report['conversions_per_frame']) + ' conversions, ' + str(report['hidden_per_frame']) + ' hidden conversions per frame)')
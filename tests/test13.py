@@ -0,0 +1,108 @@
+'''
+TEST SCRIPT FOR AUTOMATIC SCHEDULING (NO MANUAL LAYERS)
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import addition as add
+import numpy as np
+import random as rd
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('c0', pl.BusFormat.Channel)
+my_pipeline.create_bus('c1', pl.BusFormat.Channel)
+my_pipeline.create_bus('c2', pl.BusFormat.Channel)
+my_pipeline.create_bus('c0_add', pl.BusFormat.Channel)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#pipes
+my_split = sm.SplitPipe()
+my_add = add.AdditionPipe()
+my_merge = sm.MergePipe()
+
+#build (inserted out of order and without layers)
+my_pipeline.insert_pipe('my_merge', my_merge, ['c0_add','c1','c2'], ['output'])
+my_pipeline.insert_pipe('my_add', my_add, ['c0'], ['c0_add'])
+my_pipeline.insert_pipe('my_split', my_split, ['input'], ['c0','c1','c2'])
+
+'''
+@brief Return True if building the plan of the pipeline raises a fault.
+'''
+def build_fails(pipeline: pl.Pipeline) -> bool:
+    try:
+        pipeline.build_plan()
+    except Exception as e:
+        print(e)
+        return True
+    return False
+
+#test
+if __name__ == '__main__':
+    #plan
+    plan = my_pipeline.get_plan()
+    print(plan)
+    if plan == [['my_split'], ['my_add'], ['my_merge']] and my_pipeline.input_buses == ['input'] and my_pipeline.output_buses == ['output']:
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    #faults detected at build time
+    cycle = pl.Pipeline()
+    cycle.create_bus('a', pl.BusFormat.Channel)
+    cycle.create_bus('b', pl.BusFormat.Channel)
+    cycle.insert_pipe('p0', pl.BypassPipe(), ['a'], ['b'])
+    cycle.insert_pipe('p1', pl.BypassPipe(), ['b'], ['a'])
+
+    double = pl.Pipeline()
+    double.create_bus('a', pl.BusFormat.Channel)
+    double.create_bus('b', pl.BusFormat.Channel)
+    double.insert_pipe('p0', pl.BypassPipe(), ['a'], ['b'])
+    double.insert_pipe('p1', pl.BypassPipe(), ['a'], ['b'])
+
+    unconnected = pl.Pipeline()
+    unconnected.create_bus('a', pl.BusFormat.Channel)
+    unconnected.create_bus('b', pl.BusFormat.Channel)
+    unconnected.create_bus('c', pl.BusFormat.Channel)
+    unconnected.insert_pipe('p0', pl.BypassPipe(), ['a'], ['b'])
+
+    undefined = pl.Pipeline()
+    undefined.create_bus('a', pl.BusFormat.Channel)
+    undefined.insert_pipe('p0', pl.BypassPipe(), ['a'], ['b'])
+
+    for faulty in (cycle, double, unconnected, undefined):
+        if build_fails(faulty):
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+
+    #processing
+    for n in range(100):
+        print('TEST ' + str(n))
+
+        in_data = np.array(np.random.rand(rd.randint(1,500),rd.randint(1,500), 3)*255, np.uint8)
+        addv = rd.randint(0,255)
+        my_add.set_param('value', addv)
+
+        expected_out = np.copy(in_data)
+        expected_out[:,:,0] = np.clip(in_data[:,:,0].astype(np.int64) + addv, 0, 255)
+
+        my_pipeline.buses['input'].set_data(in_data)
+        my_pipeline.process()
+        out_data = my_pipeline.buses['output'].get_data()
+
+        if (out_data == expected_out).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+        my_pipeline.reset_buses()
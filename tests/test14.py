@@ -0,0 +1,63 @@
+'''
+TEST SCRIPT FOR THREAD-POOL PROCESSING OF INDEPENDENT PIPES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import product as prod
+import numpy as np
+import random as rd
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+for ch in ('c0', 'c1', 'c2'):
+    my_pipeline.create_bus(ch, pl.BusFormat.Channel)
+    my_pipeline.create_bus(ch + '_prod', pl.BusFormat.Channel)
+
+#pipes
+my_split = sm.SplitPipe()
+my_merge = sm.MergePipe()
+my_prods = [prod.ProductPipe() for ch in (0,1,2)]
+
+#build
+my_pipeline.insert_pipe('my_split', my_split, ['input'], ['c0','c1','c2'])
+for ch in (0,1,2):
+    my_pipeline.insert_pipe('my_prod' + str(ch), my_prods[ch], ['c' + str(ch)], ['c' + str(ch) + '_prod'])
+my_pipeline.insert_pipe('my_merge', my_merge, ['c0_prod','c1_prod','c2_prod'], ['output'])
+
+my_pipeline.set_max_workers(4)
+
+#test
+if __name__ == '__main__':
+    for n in range(100):
+        print('TEST ' + str(n))
+
+        in_data = np.array(np.random.rand(rd.randint(1,500),rd.randint(1,500), 3)*255, np.uint8)
+        expected_out = np.zeros(in_data.shape, np.uint8)
+        for ch in (0,1,2):
+            pv = float(rd.randint(0,4))
+            my_prods[ch].set_param('value', pv)
+            expected_out[:,:,ch] = np.clip((in_data[:,:,ch].astype(np.float64) - 127)*pv + 127, 0, 255)
+
+        my_pipeline.buses['input'].set_data(in_data)
+        my_pipeline.process()
+        out_data = my_pipeline.buses['output'].get_data()
+
+        if (out_data == expected_out).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+        my_pipeline.reset_buses()
+
+    my_pipeline.set_max_workers(None)
@@ -0,0 +1,66 @@
+'''
+TEST SCRIPT FOR BATCH MAP IN WORKER PROCESSES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import addition as add
+import numpy as np
+import random as rd
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('c0', pl.BusFormat.Channel)
+my_pipeline.create_bus('c1', pl.BusFormat.Channel)
+my_pipeline.create_bus('c2', pl.BusFormat.Channel)
+my_pipeline.create_bus('c1_add', pl.BusFormat.Channel)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#pipes
+my_split = sm.SplitPipe()
+my_add = add.AdditionPipe()
+my_merge = sm.MergePipe()
+
+#params
+my_add.set_param('value', 50)
+
+#build
+my_pipeline.insert_pipe('my_split', my_split, ['input'], ['c0','c1','c2'])
+my_pipeline.insert_pipe('my_add', my_add, ['c1'], ['c1_add'])
+my_pipeline.insert_pipe('my_merge', my_merge, ['c0','c1_add','c2'], ['output'])
+
+#test
+if __name__ == '__main__':
+    images = [np.array(np.random.rand(rd.randint(1,300),rd.randint(1,300), 3)*255, np.uint8) for n in range(40)]
+    expected = [my_pipeline.run(img)['output'] for img in images]
+
+    #ordered results
+    results = list(my_pipeline.map(images, workers=3))
+    for n in range(len(images)):
+        print('TEST ' + str(n))
+        if results[n]['output'].shape == expected[n].shape and (results[n]['output'] == expected[n]).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+    #results as completed
+    indexes = []
+    for index, result in my_pipeline.map(images, workers=3, ordered=False):
+        indexes.append(index)
+        if not (result['output'] == expected[index]).all():
+            print('FAILURE')
+            break
+
+    if sorted(indexes) == list(range(len(images))):
+        print('SUCCESS')
+    else:
+        print('FAILURE')
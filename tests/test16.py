@@ -0,0 +1,68 @@
+'''
+TEST SCRIPT FOR STREAM PROCESSING WITH STAGE PIPELINING
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import fork_blend as fb
+import product as prod
+import addition as add
+import numpy as np
+import random as rd
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('f0', pl.BusFormat.Triple)
+my_pipeline.create_bus('f1', pl.BusFormat.Triple)
+my_pipeline.create_bus('f0_add', pl.BusFormat.Triple)
+my_pipeline.create_bus('f1_prod', pl.BusFormat.Triple)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#pipes
+my_fork = fb.TripleForkPipe()
+my_add = add.AdditionPipe()
+my_prod = prod.ProductPipe()
+my_blend = fb.TripleBlendPipe()
+
+#params
+my_add.set_param('value', 30)
+my_prod.set_param('value', 2.0)
+my_blend.set_param('weights', [1, 3])
+
+#build
+my_pipeline.insert_pipe('my_fork', my_fork, ['input'], ['f0','f1'])
+my_pipeline.insert_pipe('my_add', my_add, ['f0'], ['f0_add'])
+my_pipeline.insert_pipe('my_prod', my_prod, ['f1'], ['f1_prod'])
+my_pipeline.insert_pipe('my_blend', my_blend, ['f0_add','f1_prod'], ['output'])
+
+#test
+if __name__ == '__main__':
+    frames = [np.array(np.random.rand(rd.randint(1,300),rd.randint(1,300), 3)*255, np.uint8) for n in range(60)]
+    expected = [my_pipeline.run(frame)['output'] for frame in frames]
+
+    n = 0
+    for result in my_pipeline.stream(iter(frames), queue_size=2):
+        print('TEST ' + str(n))
+        if result['output'].shape == expected[n].shape and (result['output'] == expected[n]).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+        n += 1
+
+    if n == len(frames):
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    #stopping the consumer early must not hang
+    for result in my_pipeline.stream(iter(frames)):
+        break
+    print('SUCCESS')
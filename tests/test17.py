@@ -0,0 +1,92 @@
+'''
+TEST SCRIPT FOR ASYNCIO PROCESSING
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import product as prod
+import numpy as np
+import random as rd
+import asyncio
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+for ch in ('c0', 'c1', 'c2'):
+    my_pipeline.create_bus(ch, pl.BusFormat.Channel)
+    my_pipeline.create_bus(ch + '_prod', pl.BusFormat.Channel)
+
+#pipes
+my_split = sm.SplitPipe()
+my_merge = sm.MergePipe()
+my_prods = [prod.ProductPipe() for ch in (0,1,2)]
+
+#params
+for ch in (0,1,2):
+    my_prods[ch].set_param('value', float(ch + 1))
+
+#build
+my_pipeline.insert_pipe('my_split', my_split, ['input'], ['c0','c1','c2'])
+for ch in (0,1,2):
+    my_pipeline.insert_pipe('my_prod' + str(ch), my_prods[ch], ['c' + str(ch)], ['c' + str(ch) + '_prod'])
+my_pipeline.insert_pipe('my_merge', my_merge, ['c0_prod','c1_prod','c2_prod'], ['output'])
+
+'''
+@brief Pipe whose callback always fails.
+'''
+class FailingPipe(pl.Pipe):
+    def __init__(self):
+        super(FailingPipe, self).__init__([pl.BusFormat.Triple], [pl.BusFormat.Triple])
+
+    def callback(self, input: list) -> list:
+        raise ValueError('failing pipe')
+
+'''
+@brief Run all the requests at the same time on the same pipeline.
+'''
+async def process_all(images: list) -> list:
+    return await asyncio.gather(*[my_pipeline.process_async(img) for img in images])
+
+#test
+if __name__ == '__main__':
+    images = [np.array(np.random.rand(rd.randint(1,300),rd.randint(1,300), 3)*255, np.uint8) for n in range(50)]
+    expected = [my_pipeline.run(img)['output'] for img in images]
+    results = asyncio.run(process_all(images))
+
+    for n in range(len(images)):
+        print('TEST ' + str(n))
+        if results[n]['output'].shape == expected[n].shape and (results[n]['output'] == expected[n]).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+    #a failing pipe gives the pooled buffers of the call back
+    failing_pipeline = pl.Pipeline()
+    for bus_name in ('input', 'multiplied', 'output'):
+        failing_pipeline.create_bus(bus_name, pl.BusFormat.Triple)
+    failing_pipeline.insert_pipe('my_prod', prod.ProductPipe(), ['input'], ['multiplied'])
+    failing_pipeline.insert_pipe('my_failing', FailingPipe(), ['multiplied'], ['output'])
+    failing_pipeline.set_buffer_pool(True)
+
+    counts = []
+    for n in range(5):
+        try:
+            asyncio.run(failing_pipeline.process_async(images[0]))
+            print('FAILURE')
+        except ValueError:
+            pool = failing_pipeline.buffer_pool
+            counts.append((len(pool.in_use), pool.allocations))
+    if counts == [(0, 1)] * 5:
+        print('SUCCESS')
+    else:
+        print(counts)
+        print('FAILURE')
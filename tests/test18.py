@@ -0,0 +1,75 @@
+'''
+TEST SCRIPT FOR COMPILED PIPELINES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import fork_blend as fb
+import numpy as np
+import random as rd
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('c0', pl.BusFormat.Channel)
+my_pipeline.create_bus('c1', pl.BusFormat.Channel)
+my_pipeline.create_bus('c2', pl.BusFormat.Channel)
+my_pipeline.create_bus('f0', pl.BusFormat.Channel)
+my_pipeline.create_bus('f1', pl.BusFormat.Channel)
+my_pipeline.create_bus('blend', pl.BusFormat.Channel)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#pipes
+my_split = sm.SplitPipe()
+my_fork = fb.ChannelForkPipe()
+my_blend = fb.ChannelBlendPipe()
+my_merge = sm.MergePipe()
+
+#build
+my_pipeline.insert_pipe('my_split', my_split, ['input'], ['c0','c1','c2'])
+my_pipeline.insert_pipe('my_fork', my_fork, ['c0'], ['f0','f1'])
+my_pipeline.insert_pipe('my_blend', my_blend, ['f0','f1'], ['blend'])
+my_pipeline.insert_pipe('my_merge', my_merge, ['blend','c1','c2'], ['output'])
+
+#test
+if __name__ == '__main__':
+    images = [np.array(np.random.rand(rd.randint(1,64),rd.randint(1,64), 3)*255, np.uint8) for n in range(100)]
+    expected = [my_pipeline.run(img)['output'] for img in images]
+
+    for debug in (False, True):
+        my_pipeline.compile(debug)
+
+        for n in range(len(images)):
+            print('TEST ' + str(n))
+            out_data = my_pipeline.run(images[n])['output']
+            if out_data.shape == expected[n].shape and (out_data == expected[n]).all():
+                print('SUCCESS')
+            else:
+                print('FAILURE')
+                break
+
+    #the compiled pipeline must follow graph changes
+    my_pipeline.create_bus('c2_copy', pl.BusFormat.Channel)
+    my_pipeline.insert_pipe('my_bypass', pl.BypassPipe(), ['c2'], ['c2_copy'])
+    outputs = my_pipeline.run(images[0])
+    if (outputs['c2_copy'] == images[0][:,:,2]).all():
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    #format changes are caught when the plan is rebuilt
+    my_pipeline.decompile()
+    my_fork.set_param('number_of_outputs', 3)
+    try:
+        my_pipeline.run(images[0])
+        print('FAILURE')
+    except Exception as e:
+        print(e)
+        print('SUCCESS')
@@ -0,0 +1,65 @@
+'''
+TEST SCRIPT FOR ZERO-COPY BUSES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import numpy as np
+import random as rd
+
+'''
+@brief A pipe that inverts its input in place.
+'''
+class InvertPipe(pl.Pipe):
+    mutates_input = True
+
+    def __init__(self):
+        super(InvertPipe, self).__init__([pl.BusFormat.Universal], [pl.BusFormat.Universal])
+
+    def callback(self, input: list) -> list:
+        np.subtract(255, input[0], out=input[0])
+        return input
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('bypass', pl.BusFormat.Triple)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#build
+my_pipeline.insert_pipe('my_bypass', pl.BypassPipe(), ['input'], ['bypass'])
+my_pipeline.insert_pipe('my_invert', InvertPipe(), ['bypass'], ['output'])
+
+#test
+if __name__ == '__main__':
+    for n in range(100):
+        print('TEST ' + str(n))
+
+        in_data = np.array(np.random.rand(rd.randint(1,500),rd.randint(1,500), 3)*255, np.uint8)
+        in_copy = np.copy(in_data)
+
+        my_pipeline.buses['input'].set_data(in_data)
+        my_pipeline.process()
+
+        bypass_data = my_pipeline.buses['bypass'].get_data()
+        out_data = my_pipeline.buses['output'].get_data()
+
+        #uint8 data is shared (not copied) and read-only
+        shared = np.shares_memory(bypass_data, in_data) and not bypass_data.flags.writeable and in_data.flags.writeable
+
+        #the mutating pipe received a copy
+        untouched = (in_data == in_copy).all() and (out_data == 255 - in_copy).all()
+
+        if shared and untouched:
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+        my_pipeline.reset_buses()
@@ -0,0 +1,62 @@
+'''
+TEST SCRIPT FOR FLOAT32 INTERMEDIATE BUSES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import product as prod
+import numpy as np
+import random as rd
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('halved', pl.BusFormat.Triple, np.float32)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#pipes
+my_half = prod.ProductPipe()
+my_double = prod.ProductPipe()
+
+#params
+my_half.set_param('value', 0.5)
+my_double.set_param('value', 2.0)
+
+#build
+my_pipeline.insert_pipe('my_half', my_half, ['input'], ['halved'])
+my_pipeline.insert_pipe('my_double', my_double, ['halved'], ['output'])
+
+#test
+if __name__ == '__main__':
+    for n in range(100):
+        print('TEST ' + str(n))
+
+        in_data = np.array(np.random.rand(rd.randint(1,500),rd.randint(1,500), 3)*255, np.uint8)
+
+        my_pipeline.buses['input'].set_data(in_data)
+        my_pipeline.process()
+        halved = my_pipeline.buses['halved'].get_data()
+        out_data = my_pipeline.buses['output'].get_data()
+
+        #without quantization between the two products, the output is the input
+        if halved.dtype == np.float32 and out_data.dtype == np.uint8 and (out_data == in_data).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+        my_pipeline.reset_buses()
+
+    #unsupported bus data type
+    try:
+        my_pipeline.create_bus('wrong', pl.BusFormat.Triple, np.float64)
+        print('FAILURE')
+    except Exception as e:
+        print(e)
+        print('SUCCESS')
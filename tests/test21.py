@@ -0,0 +1,75 @@
+'''
+TEST SCRIPT FOR THE BUFFER POOL
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import fork_blend as fb
+import addition as add
+import product as prod
+import numpy as np
+import random as rd
+
+'''
+@brief Build the test pipeline.
+'''
+def build_pipeline() -> pl.Pipeline:
+    my_pipeline = pl.Pipeline()
+
+    #buses
+    my_pipeline.create_bus('input', pl.BusFormat.Triple)
+    for bus_name in ('c0', 'c1', 'c2', 'c0_add', 'c1_prod', 'f0', 'f1', 'blend'):
+        my_pipeline.create_bus(bus_name, pl.BusFormat.Channel)
+    my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+    #pipes
+    my_add = add.AdditionPipe()
+    my_add.set_param('value', 40)
+    my_prod = prod.ProductPipe()
+    my_prod.set_param('value', 1.5)
+    my_blend = fb.ChannelBlendPipe()
+    my_blend.set_param('weights', [1, 2])
+
+    #build
+    my_pipeline.insert_pipe('my_split', sm.SplitPipe(), ['input'], ['c0','c1','c2'])
+    my_pipeline.insert_pipe('my_add', my_add, ['c0'], ['c0_add'])
+    my_pipeline.insert_pipe('my_prod', my_prod, ['c1'], ['c1_prod'])
+    my_pipeline.insert_pipe('my_fork', fb.ChannelForkPipe(), ['c2'], ['f0','f1'])
+    my_pipeline.insert_pipe('my_blend', my_blend, ['f0','f1'], ['blend'])
+    my_pipeline.insert_pipe('my_merge', sm.MergePipe(), ['c0_add','c1_prod','blend'], ['output'])
+    return my_pipeline
+
+reference_pipeline = build_pipeline()
+pooled_pipeline = build_pipeline()
+pooled_pipeline.set_buffer_pool(True)
+
+#test
+if __name__ == '__main__':
+    shape = (rd.randint(1,500), rd.randint(1,500), 3)
+    allocations = None
+
+    for n in range(100):
+        print('TEST ' + str(n))
+
+        in_data = np.array(np.random.rand(*shape)*255, np.uint8)
+        expected_out = reference_pipeline.run(in_data)['output']
+        out_data = pooled_pipeline.run(in_data)['output']
+
+        if not (out_data == expected_out).all():
+            print('FAILURE')
+            break
+
+        #after the first frame, the pool does not allocate anymore
+        if allocations != None and pooled_pipeline.buffer_pool.allocations != allocations:
+            print('FAILURE')
+            break
+
+        allocations = pooled_pipeline.buffer_pool.allocations
+        print('SUCCESS')
+
+    print('allocations: ' + str(pooled_pipeline.buffer_pool.allocations) + ', reuses: ' + str(pooled_pipeline.buffer_pool.reuses))
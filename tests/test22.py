@@ -0,0 +1,81 @@
+'''
+TEST SCRIPT FOR EARLY RELEASE OF BUSES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import fork_blend as fb
+import addition as add
+import product as prod
+import numpy as np
+import random as rd
+
+'''
+@brief Build the test pipeline: a chain of forks and blends.
+'''
+def build_pipeline() -> pl.Pipeline:
+    my_pipeline = pl.Pipeline()
+    my_pipeline.create_bus('input', pl.BusFormat.Triple)
+    previous = 'input'
+
+    for n in range(4):
+        for bus_name in ('f0', 'f1', 'add', 'prod', 'blend'):
+            my_pipeline.create_bus(bus_name + str(n), pl.BusFormat.Triple)
+
+        my_add = add.AdditionPipe()
+        my_add.set_param('value', 10)
+        my_prod = prod.ProductPipe()
+        my_prod.set_param('value', 1.2)
+
+        my_pipeline.insert_pipe('fork' + str(n), fb.TripleForkPipe(), [previous], ['f0' + str(n), 'f1' + str(n)])
+        my_pipeline.insert_pipe('add' + str(n), my_add, ['f0' + str(n)], ['add' + str(n)])
+        my_pipeline.insert_pipe('prod' + str(n), my_prod, ['f1' + str(n)], ['prod' + str(n)])
+        my_pipeline.insert_pipe('blend' + str(n), fb.TripleBlendPipe(), ['add' + str(n), 'prod' + str(n)], ['blend' + str(n)])
+        previous = 'blend' + str(n)
+
+    my_pipeline.create_bus('output', pl.BusFormat.Triple)
+    my_pipeline.insert_pipe('bypass', pl.BypassPipe(), [previous], ['output'])
+    my_pipeline.mark_output_bus('blend1')
+    return my_pipeline
+
+reference_pipeline = build_pipeline()
+releasing_pipeline = build_pipeline()
+releasing_pipeline.set_early_release(True)
+
+#test
+if __name__ == '__main__':
+    for pooled in (False, True):
+        releasing_pipeline.set_buffer_pool(pooled)
+
+        for n in range(50):
+            print('TEST ' + str(n))
+
+            in_data = np.array(np.random.rand(rd.randint(1,300),rd.randint(1,300), 3)*255, np.uint8)
+            expected = reference_pipeline.run(in_data)
+            outputs = releasing_pipeline.run(in_data)
+            report = releasing_pipeline.memory_report
+
+            same = set(outputs) == set(['output', 'blend1']) and (outputs['output'] == expected['output']).all() and (outputs['blend1'] == expected['blend1']).all()
+            if same and report['actual_peak_bytes'] < report['total_bytes'] and report['theoretical_peak_bytes'] < report['total_bytes']:
+                print('SUCCESS')
+            else:
+                print(report)
+                print('FAILURE')
+                break
+
+        print(report)
+
+    #released data can not be read
+    releasing_pipeline.buses['input'].set_data(in_data)
+    releasing_pipeline.process()
+    try:
+        releasing_pipeline.buses['add0'].get_data()
+        print('FAILURE')
+    except Exception as e:
+        print(e)
+        print('SUCCESS')
+    releasing_pipeline.reset_buses()
@@ -0,0 +1,76 @@
+'''
+TEST SCRIPT FOR FUSION OF ELEMENTWISE PIPES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import addition as add
+import product as prod
+import hadamard as hd
+import numpy as np
+import random as rd
+
+'''
+@brief Build the test pipeline: addition -> product -> hadamard.
+'''
+def build_pipeline() -> pl.Pipeline:
+    my_pipeline = pl.Pipeline()
+
+    #buses
+    for bus_name in ('input', 'mask', 'added', 'multiplied', 'output'):
+        my_pipeline.create_bus(bus_name, pl.BusFormat.Channel)
+
+    #pipes
+    my_add = add.AdditionPipe()
+    my_prod = prod.ProductPipe()
+    my_had = hd.ChannelHadamardPipe()
+    my_had.set_param('clipping', True)
+
+    #build
+    my_pipeline.insert_pipe('my_add', my_add, ['input'], ['added'])
+    my_pipeline.insert_pipe('my_prod', my_prod, ['added'], ['multiplied'])
+    my_pipeline.insert_pipe('my_had', my_had, ['multiplied', 'mask'], ['output'])
+    return my_pipeline
+
+reference_pipeline = build_pipeline()
+fused_pipeline = build_pipeline()
+fused_pipeline.compile()
+
+#test
+if __name__ == '__main__':
+    chains = fused_pipeline.find_fusion_chains()
+    print(chains)
+    if chains == [['my_add', 'my_prod', 'my_had']]:
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    for n in range(100):
+        print('TEST ' + str(n))
+
+        addv = rd.randint(-50, 50)
+        pv = rd.random() * 2
+        for my_pipeline in (reference_pipeline, fused_pipeline):
+            my_pipeline.pipes['my_add'].set_param('value', addv)
+            my_pipeline.pipes['my_prod'].set_param('value', pv)
+
+        inputs = {
+            'input': np.array(np.random.rand(rd.randint(1,500),rd.randint(1,500))*255, np.uint8),
+            'mask': np.array(np.random.rand(rd.randint(1,500),rd.randint(1,500))*255, np.uint8)
+        }
+
+        expected_out = reference_pipeline.run(inputs)['output']
+        out_data = fused_pipeline.run(inputs)['output']
+
+        #documented tolerance: 1 per fused bus, times the gain of the pipes after it
+        tolerance = pv + 1
+        diference = np.abs(expected_out.astype(np.float64) - out_data.astype(np.float64))
+        if out_data.dtype == np.uint8 and (diference <= tolerance).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
@@ -0,0 +1,70 @@
+'''
+TEST SCRIPT FOR LOOKUP TABLES OF POINTWISE PIPES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import addition as add
+import product as prod
+import numpy as np
+import random as rd
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('added', pl.BusFormat.Triple)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#pipes
+my_add = add.AdditionPipe()
+my_prod = prod.ProductPipe()
+
+#build
+my_pipeline.insert_pipe('my_add', my_add, ['input'], ['added'])
+my_pipeline.insert_pipe('my_prod', my_prod, ['added'], ['output'])
+
+#test
+if __name__ == '__main__':
+    for fused in (False, True):
+        if fused:
+            my_pipeline.compile()
+
+        for n in range(100):
+            print('TEST ' + str(n))
+
+            addv = rd.randint(-255, 255)
+            pv = rd.random() * 4
+            my_add.set_param('value', addv)
+            my_prod.set_param('value', pv)
+
+            in_data = np.array(np.random.rand(rd.randint(1,500),rd.randint(1,500), 3)*255, np.uint8)
+
+            #expected output, computed by the float path of the pipes
+            if fused:
+                work = my_prod.elementwise_step(my_add.elementwise_step(in_data.astype(np.float32), []), [])
+            else:
+                work = my_prod.callback([my_add.callback([in_data])[0].astype(np.uint8)])[0]
+            expected_out = np.array(work, np.uint8)
+
+            out_data = my_pipeline.run(in_data)['output']
+
+            if (out_data == expected_out).all():
+                print('SUCCESS')
+            else:
+                print('FAILURE')
+                break
+
+    #the lookup table is rebuilt only after a parameter change
+    lut = my_add.get_lut(np.uint8)
+    same = my_add.get_lut(np.uint8) is lut
+    my_add.set_param('value', 1)
+    if same and my_add.get_lut(np.uint8) is not lut:
+        print('SUCCESS')
+    else:
+        print('FAILURE')
@@ -0,0 +1,143 @@
+'''
+TEST SCRIPT FOR BATCHED BUSES (N x H x W x C)
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import addition as add
+import product as prod
+import hadamard as hd
+import fork_blend as fb
+import numpy as np
+import random as rd
+
+'''
+@brief Third-party pipe without batch support: its callback only understands H x W images.
+'''
+class InvertPipe(pl.Pipe):
+    def __init__(self):
+        super(InvertPipe, self).__init__([pl.BusFormat.Channel], [pl.BusFormat.Channel])
+        self.calls = 0
+
+    def callback(self, input: list) -> list:
+        self.calls += 1
+        data = input[0]
+        return [255 - data[:,:]]
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('mask', pl.BusFormat.Triple)
+for ch in ('c0', 'c1', 'c2'):
+    my_pipeline.create_bus(ch, pl.BusFormat.Channel)
+    my_pipeline.create_bus(ch + '_out', pl.BusFormat.Channel)
+my_pipeline.create_bus('merged', pl.BusFormat.Triple)
+my_pipeline.create_bus('masked', pl.BusFormat.Triple)
+my_pipeline.create_bus('f0', pl.BusFormat.Triple)
+my_pipeline.create_bus('f1', pl.BusFormat.Triple)
+my_pipeline.create_bus('f1_add', pl.BusFormat.Triple)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#pipes
+my_split = sm.SplitPipe()
+my_add0 = add.AdditionPipe()
+my_prod = prod.ProductPipe()
+my_invert = InvertPipe()
+my_merge = sm.MergePipe()
+my_hadamard = hd.TripleHadamardPipe()
+my_fork = fb.TripleForkPipe()
+my_add1 = add.AdditionPipe()
+my_blend = fb.TripleBlendPipe()
+
+#params
+my_add0.set_param('value', 40)
+my_prod.set_param('value', 1.5)
+my_add1.set_param('value', -25)
+my_blend.set_param('weights', [2, 1])
+
+#build
+my_pipeline.insert_pipe('my_split', my_split, ['input'], ['c0','c1','c2'])
+my_pipeline.insert_pipe('my_add0', my_add0, ['c0'], ['c0_out'])
+my_pipeline.insert_pipe('my_prod', my_prod, ['c1'], ['c1_out'])
+my_pipeline.insert_pipe('my_invert', my_invert, ['c2'], ['c2_out'])
+my_pipeline.insert_pipe('my_merge', my_merge, ['c0_out','c1_out','c2_out'], ['merged'])
+my_pipeline.insert_pipe('my_hadamard', my_hadamard, ['merged','mask'], ['masked'])
+my_pipeline.insert_pipe('my_fork', my_fork, ['masked'], ['f0','f1'])
+my_pipeline.insert_pipe('my_add1', my_add1, ['f1'], ['f1_add'])
+my_pipeline.insert_pipe('my_blend', my_blend, ['f0','f1_add'], ['output'])
+
+'''
+@brief Check a batch result against the results of the images processed one by one.
+'''
+def check(result, expected) -> bool:
+    return result.shape == (len(expected),) + expected[0].shape and all([(result[n] == expected[n]).all() for n in range(len(expected))])
+
+#test
+if __name__ == '__main__':
+    for n in range(10):
+        print('TEST ' + str(n))
+
+        size = (rd.randint(1,64), rd.randint(1,64))
+        images = [np.array(np.random.rand(size[0], size[1], 3)*255, np.uint8) for i in range(rd.randint(1,16))]
+        mask_size = (rd.randint(1,64), rd.randint(1,64))
+        masks = [np.array(np.random.rand(mask_size[0], mask_size[1], 3)*254 + 1, np.uint8) for img in images]
+        expected = [my_pipeline.run({'input': images[i], 'mask': masks[i]})['output'] for i in range(len(images))]
+
+        #one mask per image
+        results = []
+        my_invert.calls = 0
+        results.append(my_pipeline.run_batch({'input': images, 'mask': masks})['output'])
+        per_image_calls = my_invert.calls
+
+        #same result with buffer pool, early release, thread pool and compiled pipeline
+        my_pipeline.set_buffer_pool(True)
+        my_pipeline.set_early_release(True)
+        results.append(my_pipeline.run_batch({'input': np.stack(images), 'mask': masks})['output'])
+        my_pipeline.set_early_release(False)
+        my_pipeline.set_max_workers(3)
+        results.append(my_pipeline.run_batch({'input': images, 'mask': masks})['output'])
+        my_pipeline.set_max_workers(None)
+        my_pipeline.compile()
+        results.append(my_pipeline.run_batch({'input': images, 'mask': masks})['output'])
+        my_pipeline.decompile()
+        my_pipeline.set_buffer_pool(False)
+
+        if all([check(result, expected) for result in results]) and per_image_calls == len(images):
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+        #one mask for the whole batch
+        expected = [my_pipeline.run({'input': img, 'mask': masks[0]})['output'] for img in images]
+        my_pipeline.buses['mask'].set_data(masks[0])
+        result = my_pipeline.run_batch({'input': images})['output']
+
+        if check(result, expected):
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+    #batches of different sizes
+    try:
+        my_pipeline.run_batch({'input': images + images, 'mask': masks})
+        print('FAILURE')
+    except Exception as e:
+        print(e)
+        print('SUCCESS')
+
+    #empty batch
+    try:
+        my_pipeline.run_batch({'input': [], 'mask': []})
+        print('FAILURE')
+    except Exception as e:
+        print(e)
+        print('SUCCESS')
@@ -0,0 +1,119 @@
+'''
+TEST SCRIPT FOR TILED PROCESSING
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import addition as add
+import hadamard as hd
+import numpy as np
+import cv2 as cv
+import random as rd
+import tempfile
+import os
+
+'''
+@brief 3x3 box blur: each output pixel depends on the pixels around it.
+'''
+class BlurPipe(pl.Pipe):
+    def __init__(self):
+        super(BlurPipe, self).__init__([pl.BusFormat.Channel], [pl.BusFormat.Channel])
+
+    def footprint(self):
+        return 1
+
+    def callback(self, input: list) -> list:
+        return [cv.blur(np.ascontiguousarray(input[0]), (3,3), borderType=cv.BORDER_REFLECT)]
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('mask', pl.BusFormat.Triple)
+my_pipeline.create_bus('c0', pl.BusFormat.Channel)
+my_pipeline.create_bus('c1', pl.BusFormat.Channel)
+my_pipeline.create_bus('c2', pl.BusFormat.Channel)
+my_pipeline.create_bus('c0_blur', pl.BusFormat.Channel)
+my_pipeline.create_bus('c0_blur2', pl.BusFormat.Channel)
+my_pipeline.create_bus('c1_add', pl.BusFormat.Channel)
+my_pipeline.create_bus('merged', pl.BusFormat.Triple)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#pipes
+my_split = sm.SplitPipe()
+my_blur0 = BlurPipe()
+my_blur1 = BlurPipe()
+my_add = add.AdditionPipe()
+my_merge = sm.MergePipe()
+my_hadamard = hd.TripleHadamardPipe()
+
+#params
+my_add.set_param('value', 60)
+my_hadamard.set_param('normalize_mask', False)
+
+#build
+my_pipeline.insert_pipe('my_split', my_split, ['input'], ['c0','c1','c2'])
+my_pipeline.insert_pipe('my_blur0', my_blur0, ['c0'], ['c0_blur'])
+my_pipeline.insert_pipe('my_blur1', my_blur1, ['c0_blur'], ['c0_blur2'])
+my_pipeline.insert_pipe('my_add', my_add, ['c1'], ['c1_add'])
+my_pipeline.insert_pipe('my_merge', my_merge, ['c0_blur2','c1_add','c2'], ['merged'])
+my_pipeline.insert_pipe('my_hadamard', my_hadamard, ['merged','mask'], ['output'])
+
+#test
+if __name__ == '__main__':
+    #two blurs in a row need two pixels of context
+    if my_pipeline.get_halo() == 2:
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    for n in range(20):
+        print('TEST ' + str(n))
+
+        shape = (rd.randint(1,300), rd.randint(1,300), 3)
+        in_data = np.array(np.random.rand(*shape)*255, np.uint8)
+        mask = np.array(np.random.rand(*shape)*2, np.float32)
+        expected = my_pipeline.run({'input': in_data, 'mask': mask})['output']
+
+        tile_size = (rd.randint(1,100), rd.randint(1,100))
+        result = my_pipeline.process_tiled({'input': in_data, 'mask': mask}, tile_size)['output']
+        result_parallel = my_pipeline.process_tiled({'input': in_data, 'mask': mask}, tile_size, workers=4)['output']
+
+        if (result == expected).all() and (result_parallel == expected).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+    #memory-mapped input and output files
+    with tempfile.TemporaryDirectory() as directory:
+        in_data = np.array(np.random.rand(500, 400, 3)*255, np.uint8)
+        mask = np.array(np.random.rand(500, 400, 3)*2, np.float32)
+        expected = my_pipeline.run({'input': in_data, 'mask': mask})['output']
+
+        in_file = np.memmap(os.path.join(directory, 'input.raw'), np.uint8, 'w+', shape=in_data.shape)
+        in_file[...] = in_data
+        out_file = np.memmap(os.path.join(directory, 'output.raw'), np.uint8, 'w+', shape=in_data.shape)
+        result = my_pipeline.process_tiled({'input': in_file, 'mask': mask}, 64, out={'output': out_file}, workers=2)['output']
+        out_file.flush()
+
+        if result is out_file and (np.fromfile(os.path.join(directory, 'output.raw'), np.uint8).reshape(in_data.shape) == expected).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+        del in_file, out_file, result
+
+    #the normalization of the mask depends on the whole mask
+    my_hadamard.set_param('normalize_mask', True)
+    try:
+        my_pipeline.process_tiled({'input': in_data, 'mask': mask}, 64)
+        print('FAILURE')
+    except Exception as e:
+        print(e)
+        print('SUCCESS')
@@ -0,0 +1,98 @@
+'''
+TEST SCRIPT FOR BUSES STORED IN MEMORY-MAPPED FILES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import addition as add
+import numpy as np
+import random as rd
+import tempfile
+import os
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('c0', pl.BusFormat.Channel)
+my_pipeline.create_bus('c1', pl.BusFormat.Channel)
+my_pipeline.create_bus('c2', pl.BusFormat.Channel)
+my_pipeline.create_bus('c1_add', pl.BusFormat.Channel)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#pipes
+my_split = sm.SplitPipe()
+my_add = add.AdditionPipe()
+my_merge = sm.MergePipe()
+
+#build
+my_pipeline.insert_pipe('my_split', my_split, ['input'], ['c0','c1','c2'])
+my_pipeline.insert_pipe('my_add', my_add, ['c1'], ['c1_add'])
+my_pipeline.insert_pipe('my_merge', my_merge, ['c0','c1_add','c2'], ['output'])
+
+'''
+@brief Read a planar (channels x height x width) raw file as a height x width x channels image.
+'''
+def read_planar(filename: str, shape: tuple):
+    return np.moveaxis(np.fromfile(filename, np.uint8).reshape((shape[2], shape[0], shape[1])), 0, -1)
+
+#test
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        in_name = os.path.join(directory, 'input.raw')
+        out_name = os.path.join(directory, 'output.raw')
+        add_name = os.path.join(directory, 'c1_add.raw')
+
+        for n in range(20):
+            print('TEST ' + str(n))
+
+            shape = (rd.randint(1,300), rd.randint(1,300), 3)
+            in_data = np.array(np.random.rand(*shape)*255, np.uint8)
+            np.moveaxis(in_data, -1, 0).tofile(in_name) #planar dump
+            my_add.set_param('value', rd.randint(0,255))
+            expected = my_pipeline.run(in_data)
+
+            #input read from the planar file, output and an intermediate bus written to files
+            my_pipeline.set_buffer_pool(n % 2 == 0)
+            my_pipeline.set_bus_file('output', out_name, planar=True)
+            my_pipeline.set_bus_file('c1_add', add_name)
+
+            in_file = pl.open_raw_image(in_name, shape, planar=True)
+            my_pipeline.set_inputs(in_file)
+            no_input_copy = pl.base_array(my_pipeline.buses['input'].get_data()) is pl.base_array(in_file)
+            my_pipeline.process()
+            in_files = isinstance(pl.base_array(my_pipeline.buses['output'].get_data()), np.memmap) and isinstance(pl.base_array(my_pipeline.buses['c1_add'].get_data()), np.memmap)
+            result = my_pipeline.get_outputs()['output']
+            same_result = (result == expected['output']).all()
+            my_pipeline.reset_buses()
+
+            in_file_ok = (read_planar(out_name, shape) == expected['output']).all() and (np.fromfile(add_name, np.uint8).reshape(shape[:2]) == expected['output'][:,:,1]).all()
+
+            #tiled processing writes the whole image into the file
+            os.remove(out_name)
+            tiled = my_pipeline.process_tiled(in_file, rd.randint(1,100), workers=2)['output']
+            tiled_ok = isinstance(tiled, np.memmap) and (read_planar(out_name, shape) == expected['output']).all()
+
+            del in_file, result, tiled
+            my_pipeline.set_bus_file('output', None)
+            my_pipeline.set_bus_file('c1_add', None)
+            my_pipeline.set_buffer_pool(False)
+
+            if no_input_copy and in_files and same_result and in_file_ok and tiled_ok:
+                print('SUCCESS')
+            else:
+                print('FAILURE')
+                break
+
+        #back to the memory
+        result = my_pipeline.run(in_data)['output']
+        if not isinstance(pl.base_array(result), np.memmap) and (result == expected['output']).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
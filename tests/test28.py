@@ -0,0 +1,117 @@
+'''
+TEST SCRIPT FOR PER-PIPE RESULT CACHES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import product as prod
+import addition as add
+import numpy as np
+import random as rd
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('c0', pl.BusFormat.Channel)
+my_pipeline.create_bus('c1', pl.BusFormat.Channel)
+my_pipeline.create_bus('c2', pl.BusFormat.Channel)
+my_pipeline.create_bus('c0_prod', pl.BusFormat.Channel)
+my_pipeline.create_bus('merged', pl.BusFormat.Triple)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#pipes
+my_split = sm.SplitPipe()
+my_prod = prod.ProductPipe()
+my_merge = sm.MergePipe()
+my_add = add.AdditionPipe()
+
+#params
+my_prod.set_param('value', 1.7)
+
+#build
+my_pipeline.insert_pipe('my_split', my_split, ['input'], ['c0','c1','c2'])
+my_pipeline.insert_pipe('my_prod', my_prod, ['c0'], ['c0_prod'])
+my_pipeline.insert_pipe('my_merge', my_merge, ['c0_prod','c1','c2'], ['merged'])
+my_pipeline.insert_pipe('my_add', my_add, ['merged'], ['output'])
+
+'''
+@brief Expected output, computed without the pipeline.
+'''
+def expected_output(in_data, pv: float, av: int):
+    out_data = in_data.astype(np.float64)
+    out_data[:,:,0] = np.array(np.clip((out_data[:,:,0] - 127)*pv + 127, 0, 255), np.uint8)
+    return np.array(np.clip(out_data + av, 0, 255), np.uint8)
+
+#test
+if __name__ == '__main__':
+    for pipe in (my_split, my_prod, my_merge):
+        pipe.enable_cache(64*1024*1024)
+
+    #the operator tweaks the last parameter: everything upstream comes from the caches
+    in_data = np.array(np.random.rand(300, 200, 3)*255, np.uint8)
+    for n in range(20):
+        print('TEST ' + str(n))
+        av = rd.randint(-100, 100)
+        my_add.set_param('value', av)
+        if n == 10:
+            my_pipeline.compile()
+
+        if (my_pipeline.run(in_data)['output'] == expected_output(in_data, 1.7, av)).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+
+    stats = my_pipeline.get_cache_stats()
+    print(stats)
+    if all([stats[p]['hits'] == 19 and stats[p]['misses'] == 1 and stats[p]['entries'] == 1 for p in stats]) and my_add.get_cache_stats() == None:
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    #a new argument misses, and the old one still hits
+    my_prod.set_param('value', 0.5)
+    result0 = my_pipeline.run(in_data)['output']
+    my_prod.set_param('value', 1.7)
+    result1 = my_pipeline.run(in_data)['output']
+    stats = my_prod.get_cache_stats()
+    if stats['misses'] == 2 and stats['hits'] == 20 and (result0 == expected_output(in_data, 0.5, av)).all() and (result1 == expected_output(in_data, 1.7, av)).all():
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    #the results are kept within the budget, least recently used first out
+    my_pipeline.decompile()
+    my_pipeline.set_buffer_pool(True)
+    my_merge.enable_cache(3 * in_data.nbytes)
+    images = [np.array(np.random.rand(300, 200, 3)*255, np.uint8) for n in range(4)]
+    results = [my_pipeline.run(img)['output'] for img in images]
+    stats = my_merge.get_cache_stats()
+    if stats['entries'] == 3 and stats['bytes'] <= 3 * in_data.nbytes and stats['misses'] == 4:
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    #images[0] was evicted, images[3] was not, and the pool does not change the kept results
+    for img, result in ((images[3], results[3]), (images[0], results[0]), (images[3], results[3])):
+        if not (my_pipeline.run(img)['output'] == result).all():
+            print('FAILURE')
+    stats = my_merge.get_cache_stats()
+    if stats['misses'] == 5 and stats['hits'] == 2:
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    #batches are kept apart from single images
+    my_pipeline.run_batch([images[1], images[2]])
+    batch = my_pipeline.run_batch([images[1], images[2]])['output']
+    if (batch[0] == results[1]).all() and (batch[1] == results[2]).all() and my_merge.get_cache_stats()['hits'] == 3:
+        print('SUCCESS')
+    else:
+        print('FAILURE')
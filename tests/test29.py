@@ -0,0 +1,176 @@
+'''
+TEST SCRIPT FOR INCREMENTAL PROCESSING
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import addition as add
+import product as prod
+import hadamard as hd
+import numpy as np
+import random as rd
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('mask', pl.BusFormat.Triple)
+my_pipeline.create_bus('c0', pl.BusFormat.Channel)
+my_pipeline.create_bus('c1', pl.BusFormat.Channel)
+my_pipeline.create_bus('c2', pl.BusFormat.Channel)
+my_pipeline.create_bus('c0_add', pl.BusFormat.Channel)
+my_pipeline.create_bus('c1_prod', pl.BusFormat.Channel)
+my_pipeline.create_bus('merged', pl.BusFormat.Triple)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#pipes
+my_split = sm.SplitPipe()
+my_add = add.AdditionPipe()
+my_prod = prod.ProductPipe()
+my_merge = sm.MergePipe()
+my_hadamard = hd.TripleHadamardPipe()
+
+#build
+my_pipeline.insert_pipe('my_split', my_split, ['input'], ['c0','c1','c2'])
+my_pipeline.insert_pipe('my_add', my_add, ['c0'], ['c0_add'])
+my_pipeline.insert_pipe('my_prod', my_prod, ['c1'], ['c1_prod'])
+my_pipeline.insert_pipe('my_merge', my_merge, ['c0_add','c1_prod','c2'], ['merged'])
+my_pipeline.insert_pipe('my_hadamard', my_hadamard, ['merged','mask'], ['output'])
+
+'''
+@brief Get the data object of every bus, to find out which buses were recomputed.
+'''
+def bus_data() -> dict:
+    return {bus_name: my_pipeline.buses[bus_name].data for bus_name in my_pipeline.buses}
+
+'''
+@brief Names of the buses whose data object changed.
+'''
+def changed_buses(before: dict) -> set:
+    after = bus_data()
+    return set([bus_name for bus_name in before if after[bus_name] is not before[bus_name]])
+
+#reference pipeline, processed from scratch
+reference = pl.Pipeline()
+for bus_name in my_pipeline.buses:
+    reference.create_bus(bus_name, my_pipeline.buses[bus_name].format)
+ref_add = add.AdditionPipe()
+ref_prod = prod.ProductPipe()
+reference.insert_pipe('my_split', sm.SplitPipe(), ['input'], ['c0','c1','c2'])
+reference.insert_pipe('my_add', ref_add, ['c0'], ['c0_add'])
+reference.insert_pipe('my_prod', ref_prod, ['c1'], ['c1_prod'])
+reference.insert_pipe('my_merge', sm.MergePipe(), ['c0_add','c1_prod','c2'], ['merged'])
+reference.insert_pipe('my_hadamard', hd.TripleHadamardPipe(), ['merged','mask'], ['output'])
+
+#test
+if __name__ == '__main__':
+    in_data = np.array(np.random.rand(200, 300, 3)*255, np.uint8)
+    mask = np.array(np.random.rand(20, 30, 3)*255, np.uint8)
+
+    my_pipeline.set_incremental(True)
+    my_pipeline.set_inputs({'input': in_data, 'mask': mask})
+    my_pipeline.process()
+
+    for n in range(60):
+        print('TEST ' + str(n))
+        if n == 20:
+            my_pipeline.compile()
+        if n == 40:
+            my_pipeline.decompile()
+            my_pipeline.set_max_workers(3)
+
+        before = bus_data()
+        change = rd.randint(0, 3)
+        if change == 0:
+            av = rd.randint(-100, 100)
+            my_add.set_param('value', av)
+            ref_add.set_param('value', av)
+            expected_changes = {'c0_add', 'merged', 'output'}
+        elif change == 1:
+            pv = rd.random()*3
+            my_prod.set_param('value', pv)
+            ref_prod.set_param('value', pv)
+            expected_changes = {'c1_prod', 'merged', 'output'}
+        elif change == 2:
+            mask = np.array(np.random.rand(20, 30, 3)*255, np.uint8)
+            my_pipeline.set_inputs({'mask': mask})
+            expected_changes = {'mask', 'output'}
+        else:
+            expected_changes = set() #nothing changed, nothing is processed
+
+        my_pipeline.process()
+        expected = reference.run({'input': in_data, 'mask': mask})['output']
+
+        if changed_buses(before) == expected_changes and (my_pipeline.get_outputs()['output'] == expected).all():
+            print('SUCCESS')
+        else:
+            print(change, changed_buses(before))
+            print('FAILURE')
+            break
+
+    my_pipeline.set_max_workers(None)
+
+    #a new image on the main input recomputes everything
+    before = bus_data()
+    in_data = np.array(np.random.rand(100, 100, 3)*255, np.uint8)
+    my_pipeline.set_inputs({'input': in_data})
+    my_pipeline.process()
+    expected = reference.run({'input': in_data, 'mask': mask})['output']
+    if changed_buses(before) == set(my_pipeline.buses) - {'mask'} and (my_pipeline.get_outputs()['output'] == expected).all():
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    #stale pipes in the middle and at the end of a fused chain
+    chain = pl.Pipeline()
+    ref_chain = pl.Pipeline()
+    for pipeline in (chain, ref_chain):
+        for bus_name in ('input', 'mask', 'a', 'p', 'output'):
+            pipeline.create_bus(bus_name, pl.BusFormat.Triple)
+        pipeline.insert_pipe('my_add', add.AdditionPipe(), ['input'], ['a'])
+        pipeline.insert_pipe('my_prod', prod.ProductPipe(), ['a'], ['p'])
+        pipeline.insert_pipe('my_hadamard', hd.TripleHadamardPipe(), ['p', 'mask'], ['output'])
+
+    chain.compile()
+    chain.set_incremental(True)
+    chain.set_inputs({'input': in_data, 'mask': mask})
+    chain.process()
+    if chain.find_fusion_chains() == [['my_add', 'my_prod', 'my_hadamard']]:
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    for n in range(20):
+        print('TEST ' + str(n))
+        if n == 10:
+            chain.set_max_workers(3)
+
+        change = rd.randint(0, 2)
+        if change == 0:
+            pv = rd.random()*3
+            chain.pipes['my_prod'].set_param('value', pv)
+            ref_chain.pipes['my_prod'].set_param('value', pv)
+        elif change == 1:
+            mask = np.array(np.random.rand(20, 30, 3)*255, np.uint8)
+            chain.set_inputs({'mask': mask})
+        else:
+            av = rd.randint(-100, 100)
+            chain.pipes['my_add'].set_param('value', av)
+            ref_chain.pipes['my_add'].set_param('value', av)
+
+        chain.process()
+        expected = ref_chain.run({'input': in_data, 'mask': mask})['output']
+        if (np.abs(chain.get_outputs()['output'].astype(np.int64) - expected) <= 1).all():
+            print('SUCCESS')
+        else:
+            print(change)
+            print('FAILURE')
+            break
+
+    chain.set_max_workers(None)
@@ -0,0 +1,120 @@
+'''
+TEST SCRIPT FOR LAZY EVALUATION OF REQUESTED OUTPUT BUSES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import fork_blend as fb
+import addition as add
+import product as prod
+import numpy as np
+import random as rd
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+for name in ('f0', 'f1', 'f2', 'f0_add', 'final', 'preview', 'debug'):
+    my_pipeline.create_bus(name, pl.BusFormat.Triple)
+my_pipeline.create_bus('c0', pl.BusFormat.Channel)
+my_pipeline.create_bus('c1', pl.BusFormat.Channel)
+my_pipeline.create_bus('c2', pl.BusFormat.Channel)
+
+#pipes
+my_fork = fb.TripleForkPipe()
+my_fork.set_param('number_of_outputs', 3)
+my_add = add.AdditionPipe()
+my_prod0 = prod.ProductPipe()
+my_prod1 = prod.ProductPipe()
+my_split = sm.SplitPipe()
+my_merge = sm.MergePipe()
+
+#params
+my_add.set_param('value', 70)
+my_prod0.set_param('value', 1.5)
+my_prod1.set_param('value', 0.5)
+
+#build
+my_pipeline.insert_pipe('my_fork', my_fork, ['input'], ['f0','f1','f2'])
+my_pipeline.insert_pipe('my_add', my_add, ['f0'], ['f0_add'])
+my_pipeline.insert_pipe('my_prod0', my_prod0, ['f0_add'], ['final'])
+my_pipeline.insert_pipe('my_prod1', my_prod1, ['f1'], ['preview'])
+my_pipeline.insert_pipe('my_split', my_split, ['f2'], ['c0','c1','c2'])
+my_pipeline.insert_pipe('my_merge', my_merge, ['c2','c1','c0'], ['debug'])
+
+#record the pipes that run
+processed = []
+process_pipe = my_pipeline.process_pipe
+def recording_process_pipe(pipe_name: str, buses: dict = None):
+    processed.append(pipe_name)
+    process_pipe(pipe_name, buses)
+my_pipeline.process_pipe = recording_process_pipe
+
+#test
+if __name__ == '__main__':
+    for n in range(40):
+        print('TEST ' + str(n))
+        if n == 10:
+            my_pipeline.compile()
+        if n == 20:
+            my_pipeline.decompile()
+            my_pipeline.set_max_workers(3)
+        if n == 30:
+            my_pipeline.set_max_workers(None)
+            my_pipeline.set_incremental(True)
+
+        in_data = np.array(np.random.rand(rd.randint(1,300), rd.randint(1,300), 3)*255, np.uint8)
+        f0 = np.clip(in_data.astype(np.float64) + 70, 0, 255).astype(np.uint8)
+        final = np.clip((f0.astype(np.float64) - 127)*1.5 + 127, 0, 255).astype(np.uint8)
+        preview = np.clip((in_data.astype(np.float64) - 127)*0.5 + 127, 0, 255).astype(np.uint8)
+
+        processed.clear()
+        my_pipeline.set_inputs(in_data)
+        result = my_pipeline.get_output('final')
+        run_final = sorted(processed)
+
+        processed.clear()
+        my_pipeline.process(outputs=['preview', 'final'])
+        run_preview = sorted(processed)
+
+        processed.clear()
+        debug = my_pipeline.get_output('debug')
+        run_debug = sorted(processed)
+
+        ok = (result == final).all() and (my_pipeline.buses['preview'].get_data() == preview).all() and (debug == in_data[:,:,::-1]).all()
+        ok = ok and run_final == ['my_add', 'my_fork', 'my_prod0'] and run_preview == ['my_prod1'] and run_debug == ['my_merge', 'my_split']
+        if ok:
+            print('SUCCESS')
+        else:
+            print(run_final, run_preview, run_debug)
+            print('FAILURE')
+            break
+
+        if not my_pipeline.incremental:
+            my_pipeline.reset_buses()
+
+    #incremental: a parameter change only recomputes the requested branch, the rest stays stale
+    processed.clear()
+    my_add.set_param('value', 10)
+    my_prod1.set_param('value', 2.0)
+    result = my_pipeline.get_output('final')
+    run_final = sorted(processed)
+    processed.clear()
+    my_pipeline.get_output('final')
+    run_again = sorted(processed)
+    processed.clear()
+    my_pipeline.process()
+    run_rest = sorted(processed)
+
+    final = np.clip((np.clip(in_data.astype(np.float64) + 10, 0, 255).astype(np.uint8).astype(np.float64) - 127)*1.5 + 127, 0, 255).astype(np.uint8)
+    if run_final == ['my_add', 'my_prod0'] and run_again == [] and run_rest == ['my_prod1'] and (result == final).all():
+        print('SUCCESS')
+    else:
+        print(run_final, run_again, run_rest)
+        print('FAILURE')
@@ -0,0 +1,100 @@
+'''
+TEST SCRIPT FOR MERGING OF COMMON PIPES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import product as prod
+import numpy as np
+import random as rd
+
+'''
+@brief Build a graph with two copies of the same fragment and one different pipe.
+'''
+def build_pipeline() -> pl.Pipeline:
+    pipeline = pl.Pipeline()
+    pipeline.create_bus('input', pl.BusFormat.Triple)
+    for fragment in ('a', 'b'):
+        for ch in ('c0', 'c1', 'c2', 'c0_prod'):
+            pipeline.create_bus(ch + fragment, pl.BusFormat.Channel)
+        pipeline.create_bus('out' + fragment, pl.BusFormat.Triple)
+
+        my_prod = prod.ProductPipe()
+        my_prod.set_param('value', 1.5)
+        pipeline.insert_pipe('my_split' + fragment, sm.SplitPipe(), ['input'], ['c0' + fragment, 'c1' + fragment, 'c2' + fragment])
+        pipeline.insert_pipe('my_prod' + fragment, my_prod, ['c0' + fragment], ['c0_prod' + fragment])
+        pipeline.insert_pipe('my_merge' + fragment, sm.MergePipe(), ['c0_prod' + fragment, 'c1' + fragment, 'c2' + fragment], ['out' + fragment])
+
+    pipeline.create_bus('c0_prod2', pl.BusFormat.Channel)
+    my_prod = prod.ProductPipe()
+    my_prod.set_param('value', 2.0)
+    pipeline.insert_pipe('my_prod2', my_prod, ['c0a'], ['c0_prod2'])
+    return pipeline
+
+my_pipeline = build_pipeline()
+reference = build_pipeline()
+
+#test
+if __name__ == '__main__':
+    report = my_pipeline.merge_common_pipes()
+    print(report)
+    merged = dict([(entry['pipe'], entry['merged_into']) for entry in report])
+    if merged == {'my_splitb': 'my_splita', 'my_prodb': 'my_proda', 'my_mergeb': 'my_mergea'} and report[2]['buses'] == {'outb': 'outa'}:
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    for n in range(40):
+        print('TEST ' + str(n))
+        if n == 10:
+            my_pipeline.set_buffer_pool(True)
+            my_pipeline.set_early_release(True)
+        if n == 20:
+            my_pipeline.set_early_release(False)
+            my_pipeline.compile()
+        if n == 30:
+            my_pipeline.decompile()
+            my_pipeline.set_max_workers(3)
+
+        in_data = np.array(np.random.rand(rd.randint(1,300), rd.randint(1,300), 3)*255, np.uint8)
+        expected = reference.run(in_data)
+
+        my_pipeline.set_inputs(in_data)
+        my_pipeline.process()
+        outputs = my_pipeline.get_outputs()
+        shared = np.shares_memory(outputs['outa'], outputs['outb'])
+        same = all([(outputs[b] == expected[b]).all() for b in expected])
+        my_pipeline.reset_buses()
+
+        if same and shared:
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+    my_pipeline.set_max_workers(None)
+    my_pipeline.set_buffer_pool(False)
+
+    #pipes whose arguments become different are not merged anymore
+    my_pipeline.pipes['my_prodb'].set_param('value', 2.0)
+    reference.pipes['my_prodb'].set_param('value', 2.0)
+    merged = dict([(entry['pipe'], entry['merged_into']) for entry in my_pipeline.get_merge_report()])
+    in_data = np.array(np.random.rand(100, 100, 3)*255, np.uint8)
+    outputs = my_pipeline.run(in_data)
+    expected = reference.run(in_data)
+    if merged == {'my_splitb': 'my_splita', 'my_prod2': 'my_prodb'} and all([(outputs[b] == expected[b]).all() for b in expected]):
+        print('SUCCESS')
+    else:
+        print(merged)
+        print('FAILURE')
+
+    #disabled
+    if my_pipeline.merge_common_pipes(False) == []:
+        print('SUCCESS')
+    else:
+        print('FAILURE')
@@ -0,0 +1,87 @@
+'''
+TEST SCRIPT FOR COPY-FREE FORK PIPES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import fork_blend as fb
+import addition as add
+import numpy as np
+import random as rd
+
+'''
+@brief Pipe that changes its input in place.
+'''
+class InvertInPlacePipe(pl.Pipe):
+    mutates_input = True
+
+    def __init__(self):
+        super(InvertInPlacePipe, self).__init__([pl.BusFormat.Triple], [pl.BusFormat.Triple])
+
+    def callback(self, input: list) -> list:
+        data = input[0]
+        np.subtract(255, data, out=data)
+        return [data]
+
+n_outs = 8
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('added', pl.BusFormat.Triple)
+my_pipeline.create_bus('inverted', pl.BusFormat.Triple)
+for n in range(n_outs):
+    my_pipeline.create_bus('f' + str(n), pl.BusFormat.Triple)
+
+#pipes
+my_add = add.AdditionPipe()
+my_fork = fb.TripleForkPipe()
+my_fork.set_param('number_of_outputs', n_outs)
+
+#params
+my_add.set_param('value', 10)
+
+#build
+my_pipeline.insert_pipe('my_add', my_add, ['input'], ['added'])
+my_pipeline.insert_pipe('my_fork', my_fork, ['added'], ['f' + str(n) for n in range(n_outs)])
+my_pipeline.insert_pipe('my_invert', InvertInPlacePipe(), ['f0'], ['inverted'])
+
+#test
+if __name__ == '__main__':
+    for n in range(30):
+        print('TEST ' + str(n))
+        if n == 10:
+            my_pipeline.set_buffer_pool(True)
+        if n == 20:
+            my_pipeline.set_early_release(True)
+
+        in_data = np.array(np.random.rand(rd.randint(1,300), rd.randint(1,300), 3)*255, np.uint8)
+        added = np.array(np.clip(in_data.astype(np.int64) + 10, 0, 255), np.uint8)
+
+        my_pipeline.set_inputs(in_data)
+        my_pipeline.process()
+        outputs = my_pipeline.get_outputs()
+
+        #the outputs of the fork are one read-only buffer, the pipe that changes its input got a copy
+        forked = [outputs['f' + str(i)] for i in range(1, n_outs)]
+        shared = all([np.shares_memory(data, forked[0]) and not data.flags.writeable for data in forked])
+        values = all([(data == added).all() for data in forked]) and (outputs['inverted'] == 255 - added).all()
+        copied = not np.shares_memory(outputs['inverted'], forked[0])
+
+        #the fork does not add memory
+        report = my_pipeline.memory_report
+        no_growth = report == None or report['actual_peak_bytes'] <= 3 * in_data.nbytes
+        my_pipeline.reset_buses()
+
+        if shared and values and copied and no_growth:
+            print('SUCCESS')
+        else:
+            print(shared, values, copied, report)
+            print('FAILURE')
+            break
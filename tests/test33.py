@@ -0,0 +1,124 @@
+'''
+TEST SCRIPT FOR BLEND PIPES (IN PLACE AND FIXED-POINT ACCUMULATION)
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import fork_blend as fb
+import numpy as np
+import random as rd
+
+n_ins = 16
+
+'''
+@brief Pipeline with a single blend of n inputs.
+'''
+def blend_pipeline(n: int) -> pl.Pipeline:
+    pipeline = pl.Pipeline()
+    for i in range(n):
+        pipeline.create_bus('in' + str(i), pl.BusFormat.Triple)
+    pipeline.create_bus('output', pl.BusFormat.Triple)
+    blend = fb.TripleBlendPipe()
+    blend.set_param('number_of_inputs', n)
+    pipeline.insert_pipe('my_blend', blend, ['in' + str(i) for i in range(n)], ['output'])
+    return pipeline
+
+'''
+@brief Weighted sum computed in float64.
+'''
+def reference_blend(in_data: list, weights: list) -> np.ndarray:
+    acc = sum([in_data[i].astype(np.float64) * weights[i] for i in range(len(in_data))])
+    return acc / sum(weights)
+
+#test
+if __name__ == '__main__':
+    for n in range(40):
+        print('TEST ' + str(n))
+        n_inputs = 2 if n % 2 == 0 else n_ins
+        my_pipeline = blend_pipeline(n_inputs)
+        my_blend = my_pipeline.pipes['my_blend']
+        if n >= 20:
+            my_pipeline.set_buffer_pool(True)
+
+        fixed_point = n % 4 >= 2
+        weights = [rd.randint(1, 10) for i in range(n_inputs)]
+        my_blend.set_param('weights', weights)
+        my_blend.set_param('fixed_point', fixed_point)
+
+        shape = (rd.randint(1,300), rd.randint(1,300), 3)
+        in_data = [np.array(np.random.rand(*shape)*255, np.uint8) for i in range(n_inputs)]
+        output = my_pipeline.run(dict([('in' + str(i), in_data[i]) for i in range(n_inputs)]))['output']
+        expected = reference_blend(in_data, weights)
+
+        #float32 results are truncated by the bus, fixed-point results are rounded
+        if fixed_point:
+            ok = (np.abs(output - expected) <= 1).all()
+        else:
+            ok = (np.abs(output - np.floor(expected)) <= 1).all()
+
+        if ok:
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+    #weights that are exact in 8 bits use a uint16 accumulator, and give exact results
+    my_pipeline = blend_pipeline(4)
+    my_blend = my_pipeline.pipes['my_blend']
+    my_blend.set_param('weights', [1, 1, 1, 1])
+    my_blend.set_param('fixed_point', True)
+    in_data = [np.array(np.random.rand(100, 100, 3)*255, np.uint8) for i in range(4)]
+    output = my_pipeline.run(dict([('in' + str(i), in_data[i]) for i in range(4)]))['output']
+    expected = np.floor(reference_blend(in_data, [1, 1, 1, 1]) + 0.5)
+    if my_blend.fixed_weights[0] == np.uint16 and (output == expected).all():
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    #negative weights fall back to float32
+    my_blend.set_param('weights', [2, 2, -1, 1])
+    output = my_pipeline.run(dict([('in' + str(i), in_data[i]) for i in range(4)]))['output']
+    expected = reference_blend(in_data, [2, 2, -1, 1])
+    valid = (expected >= 0) & (expected < 255) #the conversion of values out of range is not defined
+    if my_blend.fixed_weights == None and (np.abs(output - np.floor(expected))[valid] <= 1).all():
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    #batches
+    my_blend.set_param('weights', [1, 2, 3, 4])
+    for fixed_point in (False, True):
+        my_blend.set_param('fixed_point', fixed_point)
+        batch = [np.array(np.random.rand(5, 40, 60, 3)*255, np.uint8) for i in range(4)]
+        output = my_pipeline.run_batch(dict([('in' + str(i), batch[i]) for i in range(4)]))['output']
+        expected = reference_blend(batch, [1, 2, 3, 4])
+        if output.shape == (5, 40, 60, 3) and (np.abs(output - expected) <= 1).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+
+    #images of many row strips, channel images and float32 data
+    for fixed_point in (False, True):
+        my_blend.set_param('fixed_point', fixed_point)
+        in_data = [np.array(np.random.rand(700, 500, 3)*255, np.uint8) for i in range(4)]
+        output = my_pipeline.run(dict([('in' + str(i), in_data[i]) for i in range(4)]))['output']
+        expected = reference_blend(in_data, [1, 2, 3, 4])
+        if len(fb.row_strips(output.shape, False)) > 1 and (np.abs(output - expected) <= 1).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+
+    my_channel_blend = fb.ChannelBlendPipe()
+    my_channel_blend.set_param('number_of_inputs', 3)
+    my_channel_blend.set_param('weights', [1, 2, 3])
+    in_data = [np.array(np.random.rand(900, 400), np.float32) for i in range(3)]
+    output = my_channel_blend.callback(in_data)[0]
+    expected = reference_blend(in_data, [1, 2, 3])
+    if output.dtype == np.float32 and (np.abs(output - expected) <= 1e-5).all():
+        print('SUCCESS')
+    else:
+        print('FAILURE')
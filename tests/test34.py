@@ -0,0 +1,141 @@
+'''
+TEST SCRIPT FOR THE PREPARED MASKS CACHE OF HADAMARD PIPES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import hadamard as hd
+import numpy as np
+import random as rd
+import cv2 as cv
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('mask', pl.BusFormat.Triple)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#pipes
+my_had = hd.TripleHadamardPipe()
+
+#build
+my_pipeline.insert_pipe('my_had', my_had, ['input', 'mask'], ['output'])
+
+interpolations = {'nearest': cv.INTER_NEAREST, 'linear': cv.INTER_LINEAR, 'area': cv.INTER_AREA, 'cubic': cv.INTER_CUBIC, 'lanczos': cv.INTER_LANCZOS4}
+
+'''
+@brief Hadamard product computed without the pipe.
+'''
+def expected_output(in_data, mask, interpolation: str, uniform: bool) -> np.ndarray:
+    mask_rs = cv.resize(mask, (in_data.shape[1], in_data.shape[0]), interpolation=interpolations[interpolation]).astype(np.float32)
+    if uniform:
+        mask_rs = mask_rs / np.max(mask_rs)
+    else:
+        mask_rs = mask_rs / np.max(mask_rs, axis=(0,1))
+    return (in_data.astype(np.float32) * mask_rs).astype(np.uint8)
+
+#test
+if __name__ == '__main__':
+    in_shape = (200, 300, 3)
+    mask = np.array(np.random.rand(20, 30, 3)*255 + 1, np.uint8)
+
+    for n in range(40):
+        print('TEST ' + str(n))
+        if n == 20:
+            my_pipeline.compile()
+
+        #the arguments change every 5 frames, 6 different combinations are used
+        interpolation = list(interpolations)[(n // 5) % len(interpolations)]
+        uniform = (n // 10) % 2 == 0
+        my_had.set_param('interpolation', interpolation)
+        my_had.set_param('uniform_normalization', uniform)
+
+        in_data = np.array(np.random.rand(*in_shape)*255, np.uint8)
+        output = my_pipeline.run({'input': in_data, 'mask': mask})['output']
+        expected = expected_output(in_data, mask, interpolation, uniform)
+
+        if (np.abs(output.astype(np.int64) - expected) <= 1).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+    stats = my_had.get_mask_cache_stats()
+    if stats['misses'] == 6 and stats['hits'] == 34:
+        print('SUCCESS')
+    else:
+        print(stats)
+        print('FAILURE')
+
+    #a mask with other content is prepared again, the cached masks are not changed by the product
+    other_mask = np.array(np.random.rand(20, 30, 3)*255 + 1, np.uint8)
+    in_data = np.array(np.random.rand(*in_shape)*255, np.uint8)
+    output = my_pipeline.run({'input': in_data, 'mask': other_mask})['output']
+    again = my_pipeline.run({'input': in_data, 'mask': mask})['output']
+    expected_other = expected_output(in_data, other_mask, interpolation, uniform)
+    expected_again = expected_output(in_data, mask, interpolation, uniform)
+    stats = my_had.get_mask_cache_stats()
+    if (np.abs(output.astype(np.int64) - expected_other) <= 1).all() and (np.abs(again.astype(np.int64) - expected_again) <= 1).all() and stats['misses'] == 7:
+        print('SUCCESS')
+    else:
+        print(stats)
+        print('FAILURE')
+
+    #invalid interpolation
+    try:
+        my_had.set_param('interpolation', 'bilinear')
+        print('FAILURE')
+    except Exception as e:
+        print(e)
+        print('SUCCESS' if my_had.get_param('interpolation') == interpolation else 'FAILURE')
+
+    #the mask is hashed only when it changes
+    hashes = [0]
+    blake2b = hd.hashlib.blake2b
+    def counting_blake2b(*args, **kwargs):
+        hashes[0] += 1
+        return blake2b(*args, **kwargs)
+    hd.hashlib.blake2b = counting_blake2b
+
+    #a read-only mask, set again on every frame
+    readonly_mask = np.array(mask)
+    readonly_mask.flags.writeable = False
+    for n in range(5):
+        in_data = np.array(np.random.rand(*in_shape)*255, np.uint8)
+        output = my_pipeline.run({'input': in_data, 'mask': readonly_mask})['output']
+        if not (np.abs(output.astype(np.int64) - expected_output(in_data, mask, interpolation, uniform)) <= 1).all():
+            print('FAILURE')
+    print('SUCCESS' if hashes[0] == 1 else 'FAILURE')
+
+    #incremental mode keeps the same mask bus array
+    my_pipeline.set_incremental(True)
+    my_pipeline.set_inputs({'input': in_data, 'mask': other_mask})
+    my_pipeline.process()
+    for n in range(5):
+        in_data = np.array(np.random.rand(*in_shape)*255, np.uint8)
+        my_pipeline.buses['input'].reset()
+        my_pipeline.set_inputs({'input': in_data})
+        my_pipeline.process()
+        if not (np.abs(my_pipeline.get_outputs()['output'].astype(np.int64) - expected_output(in_data, other_mask, interpolation, uniform)) <= 1).all():
+            print('FAILURE')
+    print('SUCCESS' if hashes[0] == 2 else 'FAILURE')
+    my_pipeline.set_incremental(False)
+    my_pipeline.reset_buses()
+
+    #a writable mask changed in place is hashed, and prepared again
+    writable_mask = np.array(mask)
+    my_pipeline.run({'input': in_data, 'mask': writable_mask})
+    writable_mask[...] = other_mask
+    output = my_pipeline.run({'input': in_data, 'mask': writable_mask})['output']
+    if hashes[0] == 4 and (np.abs(output.astype(np.int64) - expected_output(in_data, other_mask, interpolation, uniform)) <= 1).all():
+        print('SUCCESS')
+    else:
+        print(hashes)
+        print('FAILURE')
+    hd.hashlib.blake2b = blake2b
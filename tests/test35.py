@@ -0,0 +1,122 @@
+'''
+TEST SCRIPT FOR PLANAR BUS LAYOUT
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import addition as add
+import product as prod
+import numpy as np
+import random as rd
+
+'''
+@brief Build the per-channel graph: split, one pipe per channel, merge.
+'''
+def build_pipeline() -> pl.Pipeline:
+    pipeline = pl.Pipeline()
+    pipeline.create_bus('input', pl.BusFormat.Triple)
+    for name in ('c0', 'c1', 'c2', 'c0_add', 'c1_prod', 'c2_add'):
+        pipeline.create_bus(name, pl.BusFormat.Channel)
+    pipeline.create_bus('output', pl.BusFormat.Triple)
+
+    my_add0 = add.AdditionPipe()
+    my_add0.set_param('value', 30)
+    my_prod = prod.ProductPipe()
+    my_prod.set_param('value', 1.5)
+    my_add2 = add.AdditionPipe()
+    my_add2.set_param('value', -20)
+
+    pipeline.insert_pipe('my_split', sm.SplitPipe(), ['input'], ['c0','c1','c2'])
+    pipeline.insert_pipe('my_add0', my_add0, ['c0'], ['c0_add'])
+    pipeline.insert_pipe('my_prod', my_prod, ['c1'], ['c1_prod'])
+    pipeline.insert_pipe('my_add2', my_add2, ['c2'], ['c2_add'])
+    pipeline.insert_pipe('my_merge', sm.MergePipe(), ['c0_add','c1_prod','c2_add'], ['output'])
+    return pipeline
+
+my_pipeline = build_pipeline()
+my_pipeline.set_bus_layout('input', pl.BusLayout.Planar)
+my_pipeline.set_bus_layout('output', pl.BusLayout.Planar)
+reference = build_pipeline()
+
+#test
+if __name__ == '__main__':
+    for n in range(50):
+        print('TEST ' + str(n))
+        if n == 10:
+            my_pipeline.set_buffer_pool(True)
+        if n == 20:
+            my_pipeline.compile()
+        if n == 30:
+            my_pipeline.decompile()
+            my_pipeline.set_max_workers(3)
+        if n == 40:
+            my_pipeline.set_max_workers(None)
+            my_pipeline.set_bus_layout('output', pl.BusLayout.Interleaved)
+
+        in_data = np.array(np.random.rand(rd.randint(1,300), rd.randint(1,300), 3)*255, np.uint8)
+        expected = reference.run(in_data)['output']
+
+        my_pipeline.set_inputs(in_data)
+        my_pipeline.process()
+        buses = my_pipeline.buses
+        output = buses['output'].get_data()
+
+        #the channels are contiguous views of the planar input, the output has the layout of its bus
+        views = all([buses[c].get_data().flags.c_contiguous and np.shares_memory(buses[c].get_data(), buses['input'].get_data()) for c in ('c0','c1','c2')])
+        layout = pl.get_layout(output) == buses['output'].layout
+        same = (output == expected).all()
+        my_pipeline.reset_buses()
+
+        if views and layout and same:
+            print('SUCCESS')
+        else:
+            print(views, layout, same)
+            print('FAILURE')
+            break
+
+    #batches and tiles
+    my_pipeline.set_bus_layout('output', pl.BusLayout.Planar)
+    batch = np.array(np.random.rand(4, 50, 60, 3)*255, np.uint8)
+    output = my_pipeline.run_batch(batch)['output']
+    expected = reference.run_batch(batch)['output']
+    if pl.get_layout(output) == pl.BusLayout.Planar and (output == expected).all():
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    in_data = np.array(np.random.rand(200, 300, 3)*255, np.uint8)
+    output = my_pipeline.process_tiled(in_data, 64)['output']
+    expected = reference.run(in_data)['output']
+    if pl.get_layout(output) == pl.BusLayout.Planar and (output == expected).all():
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    #conversions keep the values
+    for layout in (pl.BusLayout.Planar, pl.BusLayout.Interleaved):
+        for dtype in (np.uint8, np.uint16, np.float16, np.float32):
+            data = np.array(np.random.rand(30, 40, 3)*255, dtype)
+            converted = pl.convert_layout(pl.convert_layout(data, pl.BusLayout.Planar), layout)
+            print('SUCCESS' if pl.get_layout(converted) == layout and (converted == data).all() else 'FAILURE')
+
+    #invalid layout
+    try:
+        my_pipeline.set_bus_layout('output', 'planar')
+        print('FAILURE')
+    except Exception as e:
+        print(e)
+        print('SUCCESS')
+
+    #images of one row or one column, whose planar arrays look contiguous to NumPy
+    my_pipeline.set_bus_layout('output', pl.BusLayout.Planar)
+    for shape in ((1, 1, 3), (1, 7, 3), (7, 1, 3)):
+        in_data = np.array(np.random.rand(*shape)*255, np.uint8)
+        if (my_pipeline.run(in_data)['output'] == reference.run(in_data)['output']).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
@@ -0,0 +1,139 @@
+'''
+TEST SCRIPT FOR LAYOUT NEGOTIATION BETWEEN PIPES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import split_merge as sm
+import addition as add
+import hadamard as hd
+import numpy as np
+import random as rd
+import os
+
+'''
+@brief Pipe that needs interleaved inputs aligned to 64 bytes.
+'''
+class AlignedPipe(pl.BypassPipe):
+    input_layout = pl.BusLayout.Interleaved
+    input_alignment = 64
+
+    def __init__(self):
+        super(AlignedPipe, self).__init__()
+        self.aligned = []
+
+    def callback(self, input: list) -> list:
+        self.aligned.append(input[0].ctypes.data % 64 == 0 and input[0].flags.c_contiguous)
+        return [input[0]]
+
+'''
+@brief Split, one addition per channel, merge, hadamard product with a mask.
+'''
+def build_pipeline() -> pl.Pipeline:
+    pipeline = pl.Pipeline()
+    for name in ('input', 'mask', 'merged', 'output'):
+        pipeline.create_bus(name, pl.BusFormat.Triple)
+    for c in ('c0', 'c1', 'c2'):
+        pipeline.create_bus(c, pl.BusFormat.Channel)
+        pipeline.create_bus(c + '_add', pl.BusFormat.Channel)
+
+    pipeline.insert_pipe('my_split', sm.SplitPipe(), ['input'], ['c0','c1','c2'])
+    for c in ('c0', 'c1', 'c2'):
+        my_add = add.AdditionPipe()
+        my_add.set_param('value', 10)
+        pipeline.insert_pipe('my_add_' + c, my_add, [c], [c + '_add'])
+    pipeline.insert_pipe('my_merge', sm.MergePipe(), ['c0_add','c1_add','c2_add'], ['merged'])
+    pipeline.insert_pipe('my_hadamard', hd.TripleHadamardPipe(), ['merged', 'mask'], ['output'])
+    return pipeline
+
+my_pipeline = build_pipeline()
+reference = build_pipeline()
+reference.set_layout_negotiation(False)
+
+#test
+if __name__ == '__main__':
+    for n in range(40):
+        print('TEST ' + str(n))
+        if n == 10:
+            my_pipeline.set_buffer_pool(True)
+        if n == 20:
+            my_pipeline.compile()
+        if n == 30:
+            my_pipeline.decompile()
+            my_pipeline.set_max_workers(3)
+
+        in_data = np.array(np.random.rand(rd.randint(1,300), rd.randint(1,300), 3)*255, np.uint8)
+        mask = np.array(np.random.rand(20, 30, 3)*255 + 1, np.uint8)
+        expected = reference.run({'input': in_data, 'mask': mask})['output']
+        output = my_pipeline.run({'input': in_data, 'mask': mask})['output']
+
+        if (output == expected).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+    my_pipeline.set_max_workers(None)
+
+    #the input is not converted (the split gets interleaved data), the additions get contiguous channels
+    report = my_pipeline.get_layout_report()
+    ref_report = reference.get_layout_report()
+    converted = [bus_name for bus_name in report['buses'] if report['buses'][bus_name]['conversions'] > 0]
+    if converted == ['c0', 'c1', 'c2'] and report['buses']['input']['requirement'] == (None, False, 0) and report['conversions_per_frame'] == 3 and report['pipes']['my_split']['hidden_conversions'] == 40 and report['hidden_per_frame'] == 1:
+        print('SUCCESS')
+    else:
+        print(report)
+        print('FAILURE')
+
+    #without negotiation, the additions get strided channels and the split gets interleaved data
+    if ref_report['conversions_per_frame'] == 0 and ref_report['hidden_per_frame'] == 4:
+        print('SUCCESS')
+    else:
+        print(ref_report)
+        print('FAILURE')
+
+    #the layout wanted by most readers wins, and the alignment is kept
+    pipeline = pl.Pipeline()
+    for name in ('input', 'inner', 'a0', 'a1'):
+        pipeline.create_bus(name, pl.BusFormat.Triple)
+    for c in ('c0', 'c1', 'c2'):
+        pipeline.create_bus(c, pl.BusFormat.Channel)
+    aligned = [AlignedPipe(), AlignedPipe()]
+    pipeline.insert_pipe('my_bypass', pl.BypassPipe(), ['input'], ['inner'])
+    pipeline.insert_pipe('my_split', sm.SplitPipe(), ['inner'], ['c0','c1','c2'])
+    pipeline.insert_pipe('my_aligned0', aligned[0], ['inner'], ['a0'])
+    pipeline.insert_pipe('my_aligned1', aligned[1], ['inner'], ['a1'])
+
+    for n in range(5):
+        in_data = np.array(np.random.rand(50, 60, 3)*255, np.uint8)[:, ::-1] #strided input
+        outputs = pipeline.run(in_data)
+        if (outputs['c0'] == in_data[...,0]).all() and (outputs['a0'] == in_data).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+
+    report = pipeline.get_layout_report()
+    if all(aligned[0].aligned + aligned[1].aligned) and report['buses']['inner']['requirement'] == (pl.BusLayout.Interleaved, False, 64) and report['pipes']['my_split']['hidden_conversions'] == 5 and report['buses']['inner']['conversions'] == 5:
+        print('SUCCESS')
+    else:
+        print(report)
+        print('FAILURE')
+
+    #data backed by a np.memmap is not converted, the pipes read the file without copies
+    filename = 'test36_input.raw'
+    mapped = np.memmap(filename, np.uint8, 'w+', shape=(50, 60, 3))
+    mapped[...] = np.random.rand(50, 60, 3)*255
+    aligned[0].aligned.clear()
+    outputs = pipeline.run(mapped[:, ::-1])
+    report = pipeline.get_layout_report()
+    if np.shares_memory(outputs['a0'], mapped) and np.shares_memory(outputs['c0'], mapped) and aligned[0].aligned == [False] and report['buses']['inner']['conversions'] == 5 and report['pipes']['my_aligned0']['hidden_conversions'] == 1:
+        print('SUCCESS')
+    else:
+        print(report)
+        print('FAILURE')
+    del mapped, outputs
+    os.remove(filename)
@@ -0,0 +1,66 @@
+'''
+TEST SCRIPT FOR FUSED CHAINS WITH EARLY RELEASE OF BUSES
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import addition as add
+import product as prod
+import hadamard as hd
+import numpy as np
+import random as rd
+
+'''
+@brief Build the test pipeline: addition -> product (fused as a lookup table) and addition -> product -> hadamard (fused with a side input).
+'''
+def build_pipeline() -> pl.Pipeline:
+    pipeline = pl.Pipeline()
+    for bus_name in ('input', 'mask', 'added', 'multiplied', 'added2', 'multiplied2', 'output'):
+        pipeline.create_bus(bus_name, pl.BusFormat.Triple)
+
+    for suffix in ('', '2'):
+        my_add = add.AdditionPipe()
+        my_add.set_param('value', 20)
+        my_prod = prod.ProductPipe()
+        my_prod.set_param('value', 1.2)
+        pipeline.insert_pipe('my_add' + suffix, my_add, ['input'], ['added' + suffix])
+        pipeline.insert_pipe('my_prod' + suffix, my_prod, ['added' + suffix], ['multiplied' + suffix])
+
+    pipeline.insert_pipe('my_had', hd.TripleHadamardPipe(), ['multiplied2', 'mask'], ['output'])
+    return pipeline
+
+my_pipeline = build_pipeline()
+reference = build_pipeline()
+
+#test
+if __name__ == '__main__':
+    my_pipeline.compile()
+    my_pipeline.set_early_release(True)
+    print(my_pipeline.find_fusion_chains())
+
+    for n in range(20):
+        print('TEST ' + str(n))
+        if n == 10:
+            my_pipeline.set_max_workers(3)
+
+        in_data = np.array(np.random.rand(rd.randint(1,300), rd.randint(1,300), 3)*255, np.uint8)
+        mask = np.array(np.random.rand(20, 30, 3)*255 + 1, np.uint8)
+        inputs = {'input': in_data, 'mask': mask}
+        outputs = my_pipeline.run(inputs)
+        expected = reference.run(inputs)
+        released = my_pipeline.buses['input'].data is None and my_pipeline.buses['mask'].data is None
+
+        #the fused chain skips the quantization between its pipes
+        same = all([(np.abs(outputs[b].astype(np.int64) - expected[b]) <= 1).all() for b in expected])
+        if same and released:
+            print('SUCCESS')
+        else:
+            print(same, released)
+            print('FAILURE')
+            break
+
+    my_pipeline.set_max_workers(None)
@@ -0,0 +1,100 @@
+'''
+TEST SCRIPT FOR LAZY EVALUATION OF BUSES INSIDE FUSED CHAINS
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import addition as add
+import product as prod
+import numpy as np
+import random as rd
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+for bus_name in ('input', 'added', 'output'):
+    my_pipeline.create_bus(bus_name, pl.BusFormat.Triple)
+
+#pipes
+my_add = add.AdditionPipe()
+my_add.set_param('value', 40)
+my_prod = prod.ProductPipe()
+my_prod.set_param('value', 1.5)
+
+#build
+my_pipeline.insert_pipe('my_add', my_add, ['input'], ['added'])
+my_pipeline.insert_pipe('my_prod', my_prod, ['added'], ['output'])
+
+#test
+if __name__ == '__main__':
+    my_pipeline.compile()
+    if my_pipeline.find_fusion_chains() == [['my_add', 'my_prod']]:
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    for n in range(30):
+        print('TEST ' + str(n))
+        if n == 10:
+            my_pipeline.set_max_workers(3)
+        if n == 20:
+            my_pipeline.set_max_workers(None)
+            my_pipeline.set_incremental(True)
+
+        in_data = np.array(np.random.rand(rd.randint(1,300), rd.randint(1,300), 3)*255, np.uint8)
+        added = np.clip(in_data.astype(np.float64) + 40, 0, 255).astype(np.uint8)
+        output = np.clip((added.astype(np.float64) - 127)*1.5 + 127, 0, 255).astype(np.uint8)
+
+        #a bus inside the chain first, then the output of the chain
+        my_pipeline.set_inputs(in_data)
+        first = my_pipeline.get_output('added')
+        second = my_pipeline.get_output('output')
+        ok = (first == added).all() and (np.abs(second.astype(np.int64) - output) <= 1).all()
+        if not my_pipeline.incremental:
+            my_pipeline.reset_buses()
+
+        #the output of the chain first (fused), then a bus inside the chain
+        my_pipeline.set_inputs(in_data)
+        first = my_pipeline.get_output('output')
+        second = my_pipeline.get_output('added')
+        ok = ok and (np.abs(first.astype(np.int64) - output) <= 1).all() and (second == added).all()
+        if not my_pipeline.incremental:
+            my_pipeline.reset_buses()
+
+        if ok:
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+            break
+
+    #staged requests with early release of buses
+    my_pipeline.set_incremental(False)
+    my_pipeline.reset_buses()
+    my_pipeline.set_early_release(True)
+    for n in range(10):
+        print('TEST ' + str(n))
+        if n == 5:
+            my_pipeline.decompile()
+
+        in_data = np.array(np.random.rand(rd.randint(1,300), rd.randint(1,300), 3)*255, np.uint8)
+        added = np.clip(in_data.astype(np.float64) + 40, 0, 255).astype(np.uint8)
+        output = np.clip((added.astype(np.float64) - 127)*1.5 + 127, 0, 255).astype(np.uint8)
+
+        my_pipeline.set_inputs(in_data)
+        first = my_pipeline.get_output('added')
+        second = my_pipeline.get_output('output')
+        released = my_pipeline.buses['input'].data is None and my_pipeline.buses['added'].data is None
+        report = my_pipeline.memory_report
+        my_pipeline.reset_buses()
+
+        if (first == added).all() and (np.abs(second.astype(np.int64) - output) <= 1).all() and released and report['actual_peak_bytes'] == 2 * in_data.nbytes:
+            print('SUCCESS')
+        else:
+            print(report)
+            print('FAILURE')
+            break
@@ -0,0 +1,78 @@
+'''
+TEST SCRIPT FOR RESULT CACHES OF PIPES WITH ARRAY PARAMS
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import numpy as np
+
+'''
+@brief Pipe that maps its input through a tone curve of any length.
+'''
+class CurvePipe(pl.Pipe):
+    def __init__(self):
+        super(CurvePipe, self).__init__([pl.BusFormat.Universal], [pl.BusFormat.Universal], {'curve':np.ndarray})
+
+    def callback(self, input: list) -> list:
+        curve = self.get_param('curve')
+        index = (input[0].astype(np.int64) * (len(curve) - 1)) // 255
+        return [np.array(np.clip(curve[index], 0, 255), np.uint8)]
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+my_pipeline.create_bus('input', pl.BusFormat.Triple)
+my_pipeline.create_bus('output', pl.BusFormat.Triple)
+
+#pipes
+my_curve = CurvePipe()
+curve = np.linspace(0, 255, 2000)
+my_curve.set_param('curve', curve)
+my_curve.enable_cache(64*1024*1024)
+
+#build
+my_pipeline.insert_pipe('my_curve', my_curve, ['input'], ['output'])
+
+#test
+if __name__ == '__main__':
+    in_data = np.array(np.random.rand(100, 120, 3)*255, np.uint8)
+    in_data[0, 0] = 128 #index 1003 of the curve, hidden by the truncated repr of the array
+
+    results = []
+    for n in range(10):
+        print('TEST ' + str(n))
+        changed = np.array(curve)
+        changed[1003] = n
+        my_curve.set_param('curve', changed)
+        results.append(my_pipeline.run(in_data)['output'])
+        if (results[-1][0, 0] == n).all():
+            print('SUCCESS')
+        else:
+            print('FAILURE')
+
+    #equal curves still hit, even in new arrays
+    changed = np.array(curve)
+    changed[1003] = 3
+    my_curve.set_param('curve', changed)
+    output = my_pipeline.run(in_data)['output']
+    stats = my_curve.get_cache_stats()
+    if stats['misses'] == 10 and stats['hits'] == 1 and (output == results[3]).all():
+        print('SUCCESS')
+    else:
+        print(stats)
+        print('FAILURE')
+
+    #the data type and the shape of the arrays are part of the key
+    keys = []
+    for value in (np.zeros(2000), np.zeros(2000, np.float32), np.zeros((2, 1000)), np.zeros(2000, np.uint8), np.zeros(2000)):
+        my_curve.set_param('curve', value)
+        keys.append(my_curve.cache_key([in_data], [my_pipeline.buses['output']], False))
+    if len(set(keys)) == 4 and keys[0] == keys[-1]:
+        print('SUCCESS')
+    else:
+        print('FAILURE')
@@ -0,0 +1,66 @@
+'''
+TEST SCRIPT FOR MERGING OF COMMON PIPES WITH ARRAY PARAMS
+By Filipe Chagas
+'''
+
+import sys
+sys.path.append('../src')
+sys.path.append('../src/plugins')
+
+import pipeline as pl
+import numpy as np
+
+'''
+@brief Pipe that maps its input through a tone curve of any length.
+'''
+class CurvePipe(pl.Pipe):
+    def __init__(self):
+        super(CurvePipe, self).__init__([pl.BusFormat.Universal], [pl.BusFormat.Universal], {'curve':np.ndarray})
+
+    def callback(self, input: list) -> list:
+        curve = self.get_param('curve')
+        index = (input[0].astype(np.int64) * (len(curve) - 1)) // 255
+        return [np.array(np.clip(curve[index], 0, 255), np.uint8)]
+
+#pipeline
+my_pipeline = pl.Pipeline()
+
+#buses
+for bus_name in ('input', 'out0', 'out1', 'out2'):
+    my_pipeline.create_bus(bus_name, pl.BusFormat.Triple)
+
+#pipes: the curves differ only in the middle, where the repr of the arrays is truncated
+curves = [np.linspace(0, 255, 2000) for n in range(3)]
+curves[1][1003] = 0
+my_curves = [CurvePipe() for n in range(3)]
+for n in range(3):
+    my_curves[n].set_param('curve', curves[n])
+
+#build
+for n in range(3):
+    my_pipeline.insert_pipe('my_curve' + str(n), my_curves[n], ['input'], ['out' + str(n)])
+
+#test
+if __name__ == '__main__':
+    in_data = np.array(np.random.rand(100, 120, 3)*255, np.uint8)
+    in_data[0, 0] = 128 #index 1003 of the curves
+    report = my_pipeline.merge_common_pipes()
+    outputs = my_pipeline.run(in_data)
+    if [(entry['pipe'], entry['merged_into']) for entry in report] == [('my_curve2', 'my_curve0')]:
+        print('SUCCESS')
+    else:
+        print(report)
+        print('FAILURE')
+
+    if (outputs['out1'][0, 0] == 0).all() and (outputs['out0'][0, 0] != 0).all() and (outputs['out2'] == outputs['out0']).all():
+        print('SUCCESS')
+    else:
+        print('FAILURE')
+
+    #equal arrays of another data type are not merged
+    my_curves[2].set_param('curve', curves[2].astype(np.float32))
+    my_pipeline.run(in_data)
+    if my_pipeline.get_merge_report() == []:
+        print('SUCCESS')
+    else:
+        print('FAILURE')